@@ -1,12 +1,8 @@
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow import keras
-from sklearn.preprocessing import LabelEncoder
 import random
 import json
-import os
 from datetime import datetime, timedelta
+from generation_profile import GenerationProfile
 
 
 data = {
@@ -27,94 +23,9 @@ teacher_subject_sections = {}
 teacher_sections_taught = {}
 teacher_lecture_limits = {}
 
-subject_encoder = None
-teacher_encoder = None
-
-def _initialize_encoders():
-    """Initialize encoders lazily when needed"""
-    global subject_encoder, teacher_encoder
-    if subject_encoder is None or teacher_encoder is None:
-        subject_encoder = LabelEncoder()
-        teacher_encoder = LabelEncoder()
-        subject_encoder.fit(data["subjects"])
-        teacher_encoder.fit(data["teachers"])
-        print(f"Initialized encoders: {len(data['subjects'])} subjects, {len(data['teachers'])} teachers")
-    return subject_encoder, teacher_encoder
-
-def _reinitialize_encoders():
-    """Reinitialize encoders with current teacher list"""
-    global subject_encoder, teacher_encoder
-    subject_encoder = LabelEncoder()
-    teacher_encoder = LabelEncoder()
-    subject_encoder.fit(data["subjects"])
-    teacher_encoder.fit(data["teachers"])
-    print(f"Reinitialized encoders: {len(data['subjects'])} subjects, {len(data['teachers'])} teachers")
-    return subject_encoder, teacher_encoder
-
-model_path = "timetable_model.h5"
-model = None
-
-def _load_or_create_model():
-    """Lazy-load or create model when needed with actual data"""
-    global model
-
-    if model is not None:
-        return model
-
-    if os.path.exists(model_path):
-        model = keras.models.load_model(model_path)
-        print(f"Loaded existing model from {model_path}")
-    else:
-
-        if not data["teachers"] or len(data["teachers"]) == 0:
-            raise ValueError("Cannot create model: No teachers available. Please add teachers first.")
-
-        if not data["subjects"] or len(data["subjects"]) == 0:
-            raise ValueError("Cannot create model: No subjects available. Please add subjects first.")
-
-        if not data["sections"] or len(data["sections"]) == 0:
-            raise ValueError("Cannot create model: No sections available. Please add sections first.")
+ML_MODULES = ("tensorflow", "keras", "sklearn", "pandas")
 
-        print("Training new model with current data...")
-        X_train, y_subjects_train, y_teachers_train = [], [], []
-        for _ in range(5000):
-            section = random.choice(data["sections"])
-            day = random.choice(data["days"])
-            time_slot = random.choice(data["time_slots"])
-            subject = random.choice(data["subjects"])
-
-
-            if subject in subject_teacher_mapping and len(subject_teacher_mapping[subject]) > 0:
-                teacher = random.choice(subject_teacher_mapping[subject])
-            else:
-                teacher = random.choice(data["teachers"])
-
-            X_train.append([data["sections"].index(section), data["time_slots"].index(time_slot)])
-            subj_enc, teach_enc = _initialize_encoders()
-            y_subjects_train.append(subj_enc.transform([subject])[0])
-            y_teachers_train.append(teach_enc.transform([teacher])[0])
-
-        X_train = np.array(X_train)
-        y_subjects_train = np.array(y_subjects_train)
-        y_teachers_train = np.array(y_teachers_train)
-
-        inputs = keras.Input(shape=(2,))
-        x = keras.layers.Dense(16, activation='relu')(inputs)
-        x = keras.layers.Dense(32, activation='relu')(x)
-        x = keras.layers.Dense(16, activation='relu')(x)
-        subject_output = keras.layers.Dense(len(data["subjects"]), activation='softmax', name='subject_output')(x)
-        teacher_output = keras.layers.Dense(len(data["teachers"]), activation='softmax', name='teacher_output')(x)
-        model = keras.Model(inputs=inputs, outputs=[subject_output, teacher_output])
-
-        model.compile(optimizer='adam',
-                      loss={'subject_output': 'sparse_categorical_crossentropy', 'teacher_output': 'sparse_categorical_crossentropy'},
-                      metrics={'subject_output': 'accuracy', 'teacher_output': 'accuracy'})
-        model.fit(X_train, {'subject_output': y_subjects_train, 'teacher_output': y_teachers_train},
-                  epochs=10, batch_size=32, verbose=1)
-        model.save(model_path)
-        print(f"Model trained and saved to {model_path}")
-
-    return model
+LEARNED_CANDIDATE_TRIES = 4
 
 def is_teacher_available_at_slot(teacher, day, time_slot, teacher_preferences):
     """Check if teacher is available based on their preferences"""
@@ -207,6 +118,120 @@ def is_room_available(room_number, day, time_slot, room_assignments):
         return True
     return False
 
+class OccupancyIndex:
+    """Incrementally maintained teacher and section occupancy for O(1) conflict checks"""
+
+    def __init__(self, sections, days, time_slots=None, teachers=None):
+        self.time_slots = list(time_slots or data["time_slots"])
+        self.days = list(days)
+        self.slot_index = {ts: i for i, ts in enumerate(self.time_slots)}
+        self.day_index = {day: i for i, day in enumerate(self.days)}
+        self.section_index = {}
+        self.teacher_index = {}
+
+        shape = (len(self.days), len(self.time_slots))
+        self.section_busy = np.zeros((max(len(sections), 1),) + shape, dtype=bool)
+        self.teacher_busy = np.zeros((max(len(teachers or []), 1),) + shape, dtype=bool)
+        self.teacher_daily = np.zeros((self.teacher_busy.shape[0], len(self.days)), dtype=np.int32)
+        self.teacher_weekly = np.zeros(self.teacher_busy.shape[0], dtype=np.int32)
+
+        for section in sections:
+            self._section_id(section)
+        for teacher in teachers or []:
+            self._teacher_id(teacher)
+
+    @classmethod
+    def from_timetable(cls, timetable, days=None, time_slots=None):
+        """Build an index from an existing timetable dict"""
+        if days is None:
+            days = []
+            for section_days in timetable.values():
+                for day in section_days:
+                    if day not in days:
+                        days.append(day)
+        index = cls(list(timetable.keys()), days, time_slots)
+        for section, section_days in timetable.items():
+            for day, slots in section_days.items():
+                for time_slot, content in slots.items():
+                    if content.get("subject") == "Lunch":
+                        continue
+                    index.place(section, day, time_slot, content.get("teacher"))
+        return index
+
+    def _section_id(self, section):
+        if section not in self.section_index:
+            idx = len(self.section_index)
+            if idx >= self.section_busy.shape[0]:
+                self.section_busy = np.concatenate([self.section_busy, np.zeros_like(self.section_busy)])
+            self.section_index[section] = idx
+        return self.section_index[section]
+
+    def _teacher_id(self, teacher):
+        if teacher not in self.teacher_index:
+            idx = len(self.teacher_index)
+            if idx >= self.teacher_busy.shape[0]:
+                self.teacher_busy = np.concatenate([self.teacher_busy, np.zeros_like(self.teacher_busy)])
+                self.teacher_daily = np.concatenate([self.teacher_daily, np.zeros_like(self.teacher_daily)])
+                self.teacher_weekly = np.concatenate([self.teacher_weekly, np.zeros_like(self.teacher_weekly)])
+            self.teacher_index[teacher] = idx
+        return self.teacher_index[teacher]
+
+    def place(self, section, day, time_slot, teacher=None):
+        """Record a lecture occupying (section, day, time_slot) and, if given, the teacher"""
+        d = self.day_index[day]
+        s = self.slot_index[time_slot]
+        self.section_busy[self._section_id(section), d, s] = True
+        if teacher:
+            t = self._teacher_id(teacher)
+            self.teacher_busy[t, d, s] = True
+            self.teacher_daily[t, d] += 1
+            self.teacher_weekly[t] += 1
+
+    def remove(self, section, day, time_slot, teacher=None):
+        """Undo a previous place() call"""
+        d = self.day_index[day]
+        s = self.slot_index[time_slot]
+        self.section_busy[self._section_id(section), d, s] = False
+        if teacher:
+            t = self._teacher_id(teacher)
+            self.teacher_busy[t, d, s] = False
+            self.teacher_daily[t, d] -= 1
+            self.teacher_weekly[t] -= 1
+
+    def is_section_busy(self, section, day, time_slot):
+        idx = self.section_index.get(section)
+        if idx is None or day not in self.day_index:
+            return False
+        return bool(self.section_busy[idx, self.day_index[day], self.slot_index[time_slot]])
+
+    def is_teacher_busy(self, teacher, day, time_slot):
+        idx = self.teacher_index.get(teacher)
+        if idx is None or day not in self.day_index:
+            return False
+        return bool(self.teacher_busy[idx, self.day_index[day], self.slot_index[time_slot]])
+
+    def daily_count(self, teacher, day):
+        idx = self.teacher_index.get(teacher)
+        if idx is None or day not in self.day_index:
+            return 0
+        return int(self.teacher_daily[idx, self.day_index[day]])
+
+    def weekly_count(self, teacher):
+        idx = self.teacher_index.get(teacher)
+        if idx is None:
+            return 0
+        return int(self.teacher_weekly[idx])
+
+    def section_filled(self, section, time_slots=None):
+        """Number of occupied slots for a section, optionally restricted to some time slots"""
+        idx = self.section_index.get(section)
+        if idx is None:
+            return 0
+        if time_slots is None:
+            return int(self.section_busy[idx].sum())
+        columns = [self.slot_index[ts] for ts in time_slots]
+        return int(self.section_busy[idx][:, columns].sum())
+
 def get_teacher_daily_lecture_count(timetable, teacher, day):
     """Count how many lectures a teacher has on a specific day"""
     count = 0
@@ -227,10 +252,14 @@ def get_teacher_weekly_lecture_count(timetable, teacher):
                     count += 1
     return count
 
-def check_lecture_limits(timetable, teacher, day, is_two_hour=False):
+def check_lecture_limits(timetable, teacher, day, is_two_hour=False, occupancy=None):
     """Check if assigning this lecture violates lecture limits"""
-    daily_count = get_teacher_daily_lecture_count(timetable, teacher, day)
-    weekly_count = get_teacher_weekly_lecture_count(timetable, teacher)
+    if occupancy is not None:
+        daily_count = occupancy.daily_count(teacher, day)
+        weekly_count = occupancy.weekly_count(teacher)
+    else:
+        daily_count = get_teacher_daily_lecture_count(timetable, teacher, day)
+        weekly_count = get_teacher_weekly_lecture_count(timetable, teacher)
 
     max_daily = 5 if weekly_count < 15 and daily_count < 4 else 4
     if daily_count + (2 if is_two_hour else 1) > max_daily:
@@ -242,7 +271,14 @@ def check_lecture_limits(timetable, teacher, day, is_two_hour=False):
 
     return True
 
-def check_slot_conflict(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=None, teacher_lecture_limits=None, teacher_availability=None, teacher_preferences=None):
+def check_slot_conflict(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=None, teacher_lecture_limits=None, teacher_availability=None, teacher_preferences=None, occupancy=None):
+    return conflict_reason(
+        timetable, section, day, time_slot, teacher, subject, is_two_hour, teacher_subject_sections,
+        teacher_lecture_limits, teacher_availability, teacher_preferences, occupancy
+    ) is None
+
+def conflict_reason(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=None, teacher_lecture_limits=None, teacher_availability=None, teacher_preferences=None, occupancy=None):
+    """Why teacher cannot take this slot ("availability", "preference", "limit", "section", "teacher_clash", "subject_rule"), or None if they can"""
     if teacher_subject_sections is None:
         teacher_subject_sections = {}
     if teacher_lecture_limits is None:
@@ -253,87 +289,49 @@ def check_slot_conflict(timetable, section, day, time_slot, teacher, subject, is
         teacher_preferences = {}
 
     if teacher in teacher_availability and not teacher_availability.get(teacher, True):
-        return False
+        return "availability"
 
 
     if not is_teacher_available_at_slot(teacher, day, time_slot, teacher_preferences):
-        return False
+        return "preference"
 
+    if occupancy is None:
+        occupancy = OccupancyIndex.from_timetable(timetable)
 
-    if not check_lecture_limits(timetable, teacher, day, is_two_hour):
-        return False
+    if not check_lecture_limits(timetable, teacher, day, is_two_hour, occupancy):
+        return "limit"
 
-    slot_index = data["time_slots"].index(time_slot)
+    slot_index = occupancy.slot_index[time_slot]
     if section not in timetable or day not in timetable[section]:
-        return True
+        return None
 
     if teacher in teacher_subject_sections and subject in teacher_subject_sections[teacher]:
         if section not in teacher_subject_sections[teacher][subject]:
-            return False
-
-    for ts in timetable[section][day]:
-        ts_index = data["time_slots"].index(ts)
-        if ts == time_slot or (is_two_hour and slot_index + 1 < len(data["time_slots"]) and ts == data["time_slots"][slot_index + 1]):
-            if timetable[section][day][ts]["teacher"] == teacher:
-                return False
+            return "section"
 
-    if subject == "XCS-401" and is_two_hour:
-        return False
-
-    if is_two_hour and slot_index + 1 < len(data["time_slots"]):
-        next_slot = data["time_slots"][slot_index + 1]
-        if next_slot in timetable[section][day] and timetable[section][day][next_slot]["teacher"] == teacher:
-            return False
-        if slot_index > 0:
-            prev_slot = data["time_slots"][slot_index - 1]
-            if prev_slot in timetable[section][day] and timetable[section][day][prev_slot]["subject"] == "XCS-401":
-                return False
-
-    for sec in timetable:
-        if sec != section and day in timetable[sec]:
-            for ts in timetable[sec][day]:
-                ts_index = data["time_slots"].index(ts)
-                if ts == time_slot or (is_two_hour and slot_index + 1 < len(data["time_slots"]) and ts == data["time_slots"][slot_index + 1]):
-                    if timetable[sec][day][ts]["teacher"] == teacher:
-                        if teacher in teacher_subject_sections and subject in teacher_subject_sections[teacher]:
-                            if sec in teacher_subject_sections[teacher][subject]:
-                                return False
-    return True
-
-def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_sections_taught=None, teacher_lecture_limits=None, teacher_availability=None, teacher_preferences=None, classrooms=None, course="BTech", semester=4):
-    from backend_api import SessionLocal, ElectiveEnrollment, SubjectDependency
-
-
-    if not data["teachers"] or len(data["teachers"]) == 0:
-        raise ValueError("No teachers available in the system. Please add teachers through the Teacher Management UI.")
-
-    if not teacher_subject_sections:
-        teacher_subject_sections = {}
-    if not teacher_sections_taught:
-        teacher_sections_taught = {}
-    if not teacher_lecture_limits:
-        teacher_lecture_limits = {}
-    if not teacher_availability:
-        teacher_availability = {teacher: True for teacher in data["teachers"]}
-    if not teacher_preferences:
-        teacher_preferences = {}
-    if not classrooms:
-        classrooms = []
+    next_slot = None
+    if is_two_hour and slot_index + 1 < len(occupancy.time_slots):
+        next_slot = occupancy.time_slots[slot_index + 1]
 
 
-    from backend_api import get_subjects_for_semester, get_sections_for_course
-    subjects = get_subjects_for_semester(course, semester)
-    sections = get_sections_for_course(course)
+    if occupancy.is_teacher_busy(teacher, day, time_slot):
+        return "teacher_clash"
+    if next_slot and occupancy.is_teacher_busy(teacher, day, next_slot):
+        return "teacher_clash"
 
-    if not subjects:
-        print(f"Warning: No subjects found for {course} semester {semester}")
-        subjects = data["subjects"]
+    if subject == "XCS-401" and is_two_hour:
+        return "subject_rule"
 
-    if not sections:
-        print(f"Warning: No sections found for {course}")
-        sections = data["sections"]
+    if next_slot and slot_index > 0:
+        prev_slot = occupancy.time_slots[slot_index - 1]
+        if prev_slot in timetable[section][day] and timetable[section][day][prev_slot]["subject"] == "XCS-401":
+            return "subject_rule"
 
+    return None
 
+def load_subject_dependencies():
+    """Active subject dependencies keyed by subject code"""
+    from backend_api import SessionLocal, SubjectDependency
     db = SessionLocal()
     subject_dependencies = {}
     try:
@@ -351,10 +349,52 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
         print(f"Loaded {len(deps)} subject dependencies")
     finally:
         db.close()
+    return subject_dependencies
 
-    timetable = {}
-    room_assignments = {}
+def load_elective_groups():
+    """Elective enrollment totals and subjects keyed by elective group"""
+    from backend_api import SessionLocal, ElectiveEnrollment
+    elective_groups_data = {}
+    db = SessionLocal()
+    try:
+
+        elective_enrollments = db.query(ElectiveEnrollment).all()
+
+
+        for enrollment in elective_enrollments:
+            group_id = enrollment.elective_group_id
+            if group_id not in elective_groups_data:
+                elective_groups_data[group_id] = {"total_students": 0, "subjects": []}
+            elective_groups_data[group_id]["total_students"] += enrollment.enrolled_students
+            if enrollment.subject_code not in elective_groups_data[group_id]["subjects"]:
+                elective_groups_data[group_id]["subjects"].append(enrollment.subject_code)
+    finally:
+        db.close()
+    return elective_groups_data
+
+MORNING_SLOTS = ["8:00-9:00", "9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00"]
+AFTERNOON_SLOTS = ["14:00-15:00", "15:00-16:00"]
+LUNCH_SLOT = "13:00-14:00"
+
+def get_course_subjects_and_sections(course, semester, subjects=None, sections=None):
+    """Subjects and sections to schedule, falling back to the module defaults"""
+    from backend_api import get_subjects_for_semester, get_sections_for_course
+    if subjects is None:
+        subjects = get_subjects_for_semester(course, semester)
+    if sections is None:
+        sections = get_sections_for_course(course)
 
+    if not subjects:
+        print(f"Warning: No subjects found for {course} semester {semester}")
+        subjects = data["subjects"]
+
+    if not sections:
+        print(f"Warning: No sections found for {course}")
+        sections = data["sections"]
+    return subjects, sections
+
+def get_week_days(start_date=None):
+    """Names of the six teaching days starting at start_date, skipping Sunday"""
     if start_date:
         start = datetime.strptime(start_date, "%Y-%m-%d")
     else:
@@ -366,23 +406,14 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
         if current_date.weekday() != 6:
             days.append(current_date.strftime("%A"))
         current_date += timedelta(days=1)
+    return days
 
+def is_lab_subject(subject):
+    return subject.startswith("PCS") or "lab" in subject.lower() or "practical" in subject.lower()
 
-
-    lunch_slot = "13:00-14:00"
-
-
-    elective_days = random.sample([d for d in days if d not in ["Saturday"]], 2)
-
-
-    elective_time_pairs = [
-        ("11:00-12:00", "12:00-13:00"),
-        ("14:00-15:00", "15:00-16:00")
-    ]
-    selected_elective_slots = random.choice(elective_time_pairs)
-
-
-    lab_subjects = [s for s in subjects if s.startswith("PCS") or "lab" in s.lower() or "practical" in s.lower()]
+def classify_subjects(subjects, sections):
+    """Split subjects into labs, core theory subjects and section-exclusive subjects"""
+    lab_subjects = [s for s in subjects if is_lab_subject(s)]
 
 
     core_subjects_all = [s for s in subjects if s not in lab_subjects and s != "Elective" and s != "Project"]
@@ -399,36 +430,10 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
 
 
     exclusive_subjects = {k: v for k, v in exclusive_subjects.items() if v and k in sections}
+    return lab_subjects, core_subjects_all, exclusive_subjects
 
-    morning_slots = ["8:00-9:00", "9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00"]
-    afternoon_slots = ["14:00-15:00", "15:00-16:00"]
-    lunch_slot = "13:00-14:00"
-
-    for section in sections:
-        timetable[section] = {day: {} for day in days}
-
-
-
-
-    elective_groups_data = {}
-    db = SessionLocal()
-    try:
-
-        elective_enrollments = db.query(ElectiveEnrollment).all()
-
-
-        for enrollment in elective_enrollments:
-            group_id = enrollment.elective_group_id
-            if group_id not in elective_groups_data:
-                elective_groups_data[group_id] = {"total_students": 0, "subjects": []}
-            elective_groups_data[group_id]["total_students"] += enrollment.enrolled_students
-            if enrollment.subject_code not in elective_groups_data[group_id]["subjects"]:
-                elective_groups_data[group_id]["subjects"].append(enrollment.subject_code)
-    finally:
-        db.close()
-
-
-
+def place_elective_blocks(timetable, sections, elective_days, selected_elective_slots, elective_groups_data, room_assignments, occupancy):
+    """Reserve the shared elective block in every section"""
     lt_counter = 1
     max_cr_capacity = 60
 
@@ -472,6 +477,7 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                                 "elective_subjects": group_data["subjects"],
                                 "total_students": total_students
                             }
+                            occupancy.place(section, elective_day, slot_pair)
 
                             if allocated_rooms[0] and allocated_rooms[0] not in room_assignments:
                                 room_assignments[allocated_rooms[0]] = {}
@@ -480,7 +486,160 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                             if allocated_rooms[0]:
                                 room_assignments[allocated_rooms[0]][elective_day][slot_pair] = section
 
+def update_sections_taught(timetable, sections, teacher_sections_taught):
+    """Recompute teacher_sections_taught from what was actually scheduled"""
+    sections_by_teacher = {}
     for section in sections:
+        for day_slots in timetable[section].values():
+            for slot in day_slots.values():
+                if slot["teacher"] != "respective teacher":
+                    sections_by_teacher.setdefault(slot["teacher"], set()).add(section)
+
+    for teacher in list(teacher_sections_taught.keys()):
+        current_sections = sections_by_teacher.get(teacher, set())
+        if current_sections:
+            teacher_sections_taught[teacher] = list(current_sections)
+        else:
+            del teacher_sections_taught[teacher]
+
+def place_lecture(timetable, section, day, time_slot, subject, teacher, classrooms, room_assignments, occupancy, teacher_sections_taught, profile):
+    """Put a one-hour lecture into the timetable with the first free lecture room"""
+    room = None
+    if classrooms:
+        for classroom in classrooms:
+            if classroom["room_type"] == "lecture" and is_room_available(classroom["room_number"], day, time_slot, room_assignments):
+                room = classroom["room_number"]
+
+                if room not in room_assignments:
+                    room_assignments[room] = {}
+                if day not in room_assignments[room]:
+                    room_assignments[room][day] = {}
+                room_assignments[room][day][time_slot] = section
+                break
+        if room is None:
+            profile.count("placed_without_room")
+
+    timetable[section][day][time_slot] = {"subject": subject, "teacher": teacher, "room": room}
+    occupancy.place(section, day, time_slot, teacher)
+    if teacher not in teacher_sections_taught:
+        teacher_sections_taught[teacher] = []
+    if section not in teacher_sections_taught[teacher]:
+        teacher_sections_taught[teacher].append(section)
+
+def first_ranked_candidate(ranked, allowed_subjects, phase, profile, timetable, section, day, time_slot, **constraints):
+    """Best-scored (subject, teacher) pair that fits the slot, trying at most LEARNED_CANDIDATE_TRIES"""
+    tries = 0
+    for subject, teacher in ranked:
+        if subject not in allowed_subjects:
+            continue
+        reason = conflict_reason(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, **constraints)
+        profile.attempt(phase, reason)
+        if reason is None:
+            return subject, teacher
+        tries += 1
+        if tries >= LEARNED_CANDIDATE_TRIES:
+            return None
+    if tries == 0:
+        profile.reject("no_teacher")
+    return None
+
+def get_scheduler(engine="greedy"):
+    """Return the timetable generation function for an engine name"""
+    if engine in (None, "", "greedy"):
+        return generate_timetable
+    if engine == "csp":
+        from csp_solver import solve_timetable
+        return solve_timetable
+    if engine == "learned":
+        return generate_learned_timetable
+    raise ValueError(f"Unknown scheduling engine '{engine}'. Use 'greedy', 'csp' or 'learned'.")
+
+def generate_learned_timetable(*args, **kwargs):
+    """Greedy generation with candidates ranked by the learned scorer (trained on first use)"""
+    from learned_scoring import load_scorer
+    return generate_timetable(*args, scorer=load_scorer(), **kwargs)
+
+def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_sections_taught=None, teacher_lecture_limits=None, teacher_availability=None, teacher_preferences=None, classrooms=None, course="BTech", semester=4, subject_dependencies=None, elective_groups_data=None, subjects=None, sections=None, profile=None, scorer=None):
+    """Greedy timetable generation; phase times and placement counters go to profile if given.
+
+    With a scorer (learned_scoring.CandidateScorer) the morning and afternoon
+    fills try the best-ranked (subject, teacher) candidates instead of a
+    random draw.
+    """
+    if profile is None:
+        profile = GenerationProfile()
+
+    if not data["teachers"] or len(data["teachers"]) == 0:
+        raise ValueError("No teachers available in the system. Please add teachers through the Teacher Management UI.")
+
+    if not teacher_subject_sections:
+        teacher_subject_sections = {}
+    if not teacher_sections_taught:
+        teacher_sections_taught = {}
+    if not teacher_lecture_limits:
+        teacher_lecture_limits = {}
+    if not teacher_availability:
+        teacher_availability = {teacher: True for teacher in data["teachers"]}
+    if not teacher_preferences:
+        teacher_preferences = {}
+    if not classrooms:
+        classrooms = []
+
+
+    subjects, sections = get_course_subjects_and_sections(course, semester, subjects, sections)
+
+
+    profile.mark()
+    if subject_dependencies is None:
+        subject_dependencies = load_subject_dependencies()
+    profile.lap("dependency_load")
+
+    timetable = {}
+    room_assignments = {}
+
+    days = get_week_days(start_date)
+
+
+
+    lunch_slot = "13:00-14:00"
+
+
+    elective_days = random.sample([d for d in days if d not in ["Saturday"]], 2)
+
+
+    elective_time_pairs = [
+        ("11:00-12:00", "12:00-13:00"),
+        ("14:00-15:00", "15:00-16:00")
+    ]
+    selected_elective_slots = random.choice(elective_time_pairs)
+
+
+    lab_subjects, core_subjects_all, exclusive_subjects = classify_subjects(subjects, sections)
+
+    morning_slots = MORNING_SLOTS
+    afternoon_slots = AFTERNOON_SLOTS
+    lunch_slot = LUNCH_SLOT
+
+    for section in sections:
+        timetable[section] = {day: {} for day in days}
+
+    occupancy = OccupancyIndex(sections, days, data["time_slots"], data["teachers"])
+    constraints = dict(teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences, occupancy=occupancy)
+
+
+
+
+    profile.mark()
+    if elective_groups_data is None:
+        elective_groups_data = load_elective_groups()
+    profile.lap("elective_load")
+
+
+    place_elective_blocks(timetable, sections, elective_days, selected_elective_slots, elective_groups_data, room_assignments, occupancy)
+    profile.lap("elective_blocks")
+
+    for section in sections:
+        profile.mark()
         base_subjects = core_subjects_all.copy()
         core_pool = base_subjects + (exclusive_subjects.get(section, []))
 
@@ -515,9 +674,13 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                                         and section in teacher_subject_sections[t][lab_subject]
                                     ]
 
-                            if valid_teachers:
+                            if not valid_teachers:
+                                profile.reject("no_teacher")
+                            else:
                                 teacher = random.choice(valid_teachers)
-                                if check_slot_conflict(timetable, section, day, time_slot, teacher, lab_subject, is_two_hour=True, teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences):
+                                reason = conflict_reason(timetable, section, day, time_slot, teacher, lab_subject, is_two_hour=True, teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences, occupancy=occupancy)
+                                profile.attempt("lab", reason)
+                                if reason is None:
 
                                     room = None
                                     if classrooms:
@@ -532,9 +695,13 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                                                 room_assignments[room][day][time_slot] = section
                                                 room_assignments[room][day][next_slot] = section
                                                 break
+                                        if room is None:
+                                            profile.count("placed_without_room")
 
                                     timetable[section][day][time_slot] = {"subject": lab_subject, "teacher": teacher, "room": room}
                                     timetable[section][day][next_slot] = {"subject": lab_subject, "teacher": teacher, "room": room}
+                                    occupancy.place(section, day, time_slot, teacher)
+                                    occupancy.place(section, day, next_slot, teacher)
                                     occurrences_scheduled += 1
                                     lab_occurrences[lab_subject] += 1
                                     if teacher not in teacher_sections_taught:
@@ -545,6 +712,20 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
 
                 if occurrences_scheduled >= 2:
                     break
+        profile.lap("labs")
+
+        rankings = None
+        if scorer is not None:
+            candidate_pairs = [
+                (subject, teacher) for subject in core_pool for teacher in subject_teacher_mapping.get(subject, [])
+                if teacher_availability.get(teacher, True)
+                and section in teacher_subject_sections.get(teacher, {}).get(subject, [])
+            ]
+            teaching_slots = [ts for ts in data["time_slots"] if ts != lunch_slot]
+            rankings = {day: scorer.rank_day(section, day, teaching_slots, candidate_pairs) for day in days}
+            if candidate_pairs:
+                profile.count("scorer_predict_calls", len(days))
+            profile.lap("scoring")
 
         for day in days:
             for time_slot in morning_slots:
@@ -585,6 +766,12 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                         if not has_unsatisfied_prereq or is_late_in_week:
                             prioritized_subjects.append(subj)
 
+                    if rankings is not None:
+                        chosen = first_ranked_candidate(rankings[day][time_slot], set(prioritized_subjects or theory_subjects), "morning", profile, timetable, section, day, time_slot, **constraints)
+                        if chosen:
+                            place_lecture(timetable, section, day, time_slot, *chosen, classrooms, room_assignments, occupancy, teacher_sections_taught, profile)
+                        continue
+
                     if prioritized_subjects:
                         subject = random.choice(prioritized_subjects)
                     else:
@@ -668,31 +855,18 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                         and section in teacher_subject_sections[t][subject]
                     ]
 
-                    if valid_teachers:
+                    if not valid_teachers:
+                        profile.reject("no_teacher")
+                    else:
                         teacher = random.choice(valid_teachers)
-                        if check_slot_conflict(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences):
-
-                            room = None
-                            if classrooms:
-                                for classroom in classrooms:
-                                    if classroom["room_type"] == "lecture" and is_room_available(classroom["room_number"], day, time_slot, room_assignments):
-                                        room = classroom["room_number"]
-
-                                        if room not in room_assignments:
-                                            room_assignments[room] = {}
-                                        if day not in room_assignments[room]:
-                                            room_assignments[room][day] = {}
-                                        room_assignments[room][day][time_slot] = section
-                                        break
+                        reason = conflict_reason(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences, occupancy=occupancy)
+                        profile.attempt("morning", reason)
+                        if reason is None:
+                            place_lecture(timetable, section, day, time_slot, subject, teacher, classrooms, room_assignments, occupancy, teacher_sections_taught, profile)
 
-                            timetable[section][day][time_slot] = {"subject": subject, "teacher": teacher, "room": room}
-                            if teacher not in teacher_sections_taught:
-                                teacher_sections_taught[teacher] = []
-                            if section not in teacher_sections_taught[teacher]:
-                                teacher_sections_taught[teacher].append(section)
+        profile.lap("morning_fill")
 
-        total_morning_slots = sum(1 for day in days for ts in morning_slots
-                                if ts in timetable[section][day] and timetable[section][day][ts]["subject"] != "Lunch")
+        total_morning_slots = occupancy.section_filled(section, morning_slots)
 
         needs_afternoon = total_morning_slots < 20
 
@@ -702,13 +876,18 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
 
             for day in days:
                 for time_slot in afternoon_slots:
-                    total_slots_filled = sum(1 for d in days for ts in timetable[section][d]
-                                           if ts != lunch_slot and timetable[section][d][ts]["subject"] != "Lunch")
+                    total_slots_filled = occupancy.section_filled(section)
 
                     if total_slots_filled >= 25:
                         break
 
                     if time_slot not in timetable[section][day]:
+                        if rankings is not None:
+                            chosen = first_ranked_candidate(rankings[day][time_slot], set(core_pool), "afternoon", profile, timetable, section, day, time_slot, **constraints)
+                            if chosen:
+                                place_lecture(timetable, section, day, time_slot, *chosen, classrooms, room_assignments, occupancy, teacher_sections_taught, profile)
+                            continue
+
                         subject = random.choice(core_pool)
 
                         valid_teachers = [
@@ -719,51 +898,22 @@ def generate_timetable(start_date=None, teacher_subject_sections=None, teacher_s
                             and section in teacher_subject_sections[t][subject]
                         ]
 
-                        if valid_teachers:
+                        if not valid_teachers:
+                            profile.reject("no_teacher")
+                        else:
                             teacher = random.choice(valid_teachers)
-                            if check_slot_conflict(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences):
-
-                                room = None
-                                if classrooms:
-                                    for classroom in classrooms:
-                                        if classroom["room_type"] == "lecture" and is_room_available(classroom["room_number"], day, time_slot, room_assignments):
-                                            room = classroom["room_number"]
-
-                                            if room not in room_assignments:
-                                                room_assignments[room] = {}
-                                            if day not in room_assignments[room]:
-                                                room_assignments[room][day] = {}
-                                            room_assignments[room][day][time_slot] = section
-                                            break
-
-                                timetable[section][day][time_slot] = {"subject": subject, "teacher": teacher, "room": room}
-                                if teacher not in teacher_sections_taught:
-                                    teacher_sections_taught[teacher] = []
-                                if section not in teacher_sections_taught[teacher]:
-                                    teacher_sections_taught[teacher].append(section)
-
-    for teacher in list(teacher_sections_taught.keys()):
-        current_sections = set()
-        for section in sections:
-            if section in timetable and any(slot["teacher"] == teacher for day in timetable[section].values() for slot in day.values() if slot["teacher"] != "respective teacher"):
-                current_sections.add(section)
-        if current_sections:
-            teacher_sections_taught[teacher] = list(current_sections)
-        else:
-            del teacher_sections_taught[teacher]
+                            reason = conflict_reason(timetable, section, day, time_slot, teacher, subject, is_two_hour=False, teacher_subject_sections=teacher_subject_sections, teacher_lecture_limits=teacher_lecture_limits, teacher_availability=teacher_availability, teacher_preferences=teacher_preferences, occupancy=occupancy)
+                            profile.attempt("afternoon", reason)
+                            if reason is None:
+                                place_lecture(timetable, section, day, time_slot, subject, teacher, classrooms, room_assignments, occupancy, teacher_sections_taught, profile)
 
-    print("Final teacher_sections_taught:", teacher_sections_taught)
-    print("Final teacher_subject_sections:", teacher_subject_sections)
-    print("Final teacher_lecture_limits:", teacher_lecture_limits)
+        profile.lap("afternoon_fill")
 
+    profile.mark()
+    update_sections_taught(timetable, sections, teacher_sections_taught)
+    profile.lap("sections_taught")
 
-    for teacher in data["teachers"]:
-        daily_counts = {}
-        for day in days:
-            daily_counts[day] = get_teacher_daily_lecture_count(timetable, teacher, day)
-        weekly_count = get_teacher_weekly_lecture_count(timetable, teacher)
-        print(f"{teacher}: {weekly_count} total lectures, daily: {daily_counts}")
-
+    print(f"Generated {course} semester {semester} timetable for {len(sections)} sections: {profile.summary()}")
     return timetable
 
 if __name__ == "__main__":
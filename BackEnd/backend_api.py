@@ -1,17 +1,34 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import time
+import_started = time.perf_counter()
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import json
 import asyncio
 from datetime import datetime, timedelta
-from threading import Thread
-import time
-from ai_timetable_model import generate_timetable
-from sqlalchemy import create_engine, Column, String, Text, JSON, Integer, Boolean
+import sys
+from ai_timetable_model import get_scheduler, ML_MODULES
+from compact_timetable import CompactTimetable, load_timetable
+from timetable_analytics import analyze_rooms
+from generation_jobs import generation_jobs, update_task, GenerationQueueFull
+from batch_generation import generate_institute_timetables
+from timetable_search import search_best_timetable, MAX_RESTARTS
+from timetable_repair import repair_timetable
+from timetable_views import TimetableViewCache, filter_timetable
+from timetable_history import record_revision, latest_revision, list_revisions, diff_revisions
+from generation_profile import GenerationProfile, record_profile, recent_profiles, aggregate_profiles
+import metrics
+import bulk_io
+from teacher_state import DirtySet, TrackedMap, TeacherDataWriter
+from storage import DATABASE_URL, JSONValue, JSONDocument, create_storage_engine, storage_settings, optimize_storage
+from change_feed import change_feed, record_event, latest_version, TIMETABLE_STORED, TEACHER_CHANGED, ROOM_CHANGED
+from sqlalchemy import Column, String, Text, Integer, Boolean, Float, Index, event, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, defer
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import uuid
+import copy
 
 
 data = {
@@ -154,33 +171,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    return await metrics.observe_request(request, call_next)
 
-background_tasks = {}
 
-DATABASE_URL = "sqlite:///database.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_storage_engine(DATABASE_URL)
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class Timetable(Base):
     __tablename__ = "timetables"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_timetables_range", "start_date", "end_date"),
+        {'extend_existing': True}
+    )
     date = Column(String, primary_key=True, index=True)
+    start_date = Column(String, nullable=True)
+    end_date = Column(String, nullable=True)
+    course = Column(String, nullable=True)
+    semester = Column(Integer, nullable=True)
+    data = Column(JSONDocument, nullable=False)
+
+class TimetableRevision(Base):
+    __tablename__ = "timetable_revisions"
+    __table_args__ = (
+        Index("ix_timetable_revisions_date_version", "date", "version", unique=True),
+        {'extend_existing': True}
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)
     data = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)
+
+class InstituteTimetable(Base):
+    __tablename__ = "institute_timetables"
+    __table_args__ = (
+        Index("ix_institute_timetables_range", "start_date", "end_date"),
+        {'extend_existing': True}
+    )
+    start_date = Column(String, primary_key=True)
+    end_date = Column(String, nullable=False)
+    combinations = Column(JSONValue, nullable=False)
+    conflicts = Column(JSONValue, nullable=False)
+    data = Column(JSONDocument, nullable=False)
+    created_at = Column(Float, nullable=False)
+
+def timetable_end_date(start_date):
+    """Last day covered by a timetable week starting at start_date"""
+    return (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
 
 class TeacherData(Base):
     __tablename__ = "teacher_data"
     __table_args__ = {'extend_existing': True}
     id = Column(String, primary_key=True, index=True)
-    subject_sections = Column(JSON, nullable=True)
-    sections_taught = Column(JSON, nullable=True)
-    availability = Column(JSON, nullable=True)
+    subject_sections = Column(JSONValue, nullable=True)
+    sections_taught = Column(JSONValue, nullable=True)
+    availability = Column(JSONValue, nullable=True)
     lecture_limit = Column(Integer, nullable=True)
     earliest_time = Column(String, nullable=True)
     latest_time = Column(String, nullable=True)
-    preferred_days = Column(JSON, nullable=True)
-    preferred_slots = Column(JSON, nullable=True)
-    unavailable_days = Column(JSON, nullable=True)
+    preferred_days = Column(JSONValue, nullable=True)
+    preferred_slots = Column(JSONValue, nullable=True)
+    unavailable_days = Column(JSONValue, nullable=True)
 
 class Classroom(Base):
     __tablename__ = "classrooms"
@@ -191,7 +247,7 @@ class Classroom(Base):
     floor = Column(String, nullable=True)
     capacity = Column(Integer, nullable=False)
     room_type = Column(String, nullable=False)
-    subjects = Column(JSON, nullable=True)
+    subjects = Column(JSONValue, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
 
 class Teacher(Base):
@@ -201,13 +257,16 @@ class Teacher(Base):
     name = Column(String, nullable=False)
     email = Column(String, nullable=True)
     phone = Column(String, nullable=True)
-    courses = Column(JSON, nullable=True)
-    course_subjects = Column(JSON, nullable=True)
+    courses = Column(JSONValue, nullable=True)
+    course_subjects = Column(JSONValue, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
 
 class Batch(Base):
     __tablename__ = "batches"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_batches_type_semester_active", "batch_type", "semester", "is_active"),
+        {'extend_existing': True}
+    )
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
     batch_type = Column(String, nullable=False)
@@ -217,7 +276,10 @@ class Batch(Base):
 
 class Section(Base):
     __tablename__ = "sections"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_sections_batch", "batch_id"),
+        {'extend_existing': True}
+    )
     id = Column(String, primary_key=True)
     batch_id = Column(String, nullable=False)
     section_letter = Column(String, nullable=False)
@@ -225,7 +287,10 @@ class Section(Base):
 
 class Subject(Base):
     __tablename__ = "subjects"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_subjects_batch_active", "batch_id", "is_active"),
+        {'extend_existing': True}
+    )
     id = Column(String, primary_key=True)
     batch_id = Column(String, nullable=True)
     section_id = Column(String, nullable=True)
@@ -239,14 +304,20 @@ class Subject(Base):
 
 class ElectiveGroup(Base):
     __tablename__ = "elective_groups"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_elective_groups_batch", "batch_id"),
+        {'extend_existing': True}
+    )
     id = Column(String, primary_key=True)
     batch_id = Column(String, nullable=False)
     name = Column(String, nullable=False)
 
 class ElectiveEnrollment(Base):
     __tablename__ = "elective_enrollments"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_elective_enrollments_group", "elective_group_id"),
+        {'extend_existing': True}
+    )
     id = Column(String, primary_key=True)
     elective_group_id = Column(String, nullable=False)
     subject_code = Column(String, nullable=False)
@@ -254,7 +325,10 @@ class ElectiveEnrollment(Base):
 
 class SubjectDependency(Base):
     __tablename__ = "subject_dependencies"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_subject_dependencies_subject", "subject_code"),
+        {'extend_existing': True}
+    )
     id = Column(String, primary_key=True)
     subject_code = Column(String, nullable=False)
     dependent_subject_code = Column(String, nullable=False)
@@ -264,6 +338,71 @@ class SubjectDependency(Base):
     same_day = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
 
+class GenerationTask(Base):
+    __tablename__ = "generation_tasks"
+    __table_args__ = (
+        Index("ix_generation_tasks_active_key", "active_key", unique=True),
+        {'extend_existing': True}
+    )
+    id = Column(String, primary_key=True)
+    dedup_key = Column(String, nullable=False, index=True)
+    active_key = Column(String, nullable=True)
+    status = Column(String, nullable=False, index=True)
+    progress = Column(Integer, default=0)
+    message = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+
+class SchedulingRevision(Base):
+    __tablename__ = "scheduling_revision"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+
+class ChangeEvent(Base):
+    __tablename__ = "change_events"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=True)
+    created_at = Column(Float, nullable=False, index=True)
+
+SCHEDULING_MODELS = (TeacherData, Classroom, Teacher, Batch, Section, Subject, ElectiveGroup, ElectiveEnrollment, SubjectDependency)
+
+@event.listens_for(SessionLocal, "after_flush")
+def track_scheduling_changes(session, flush_context):
+    """Bump the scheduling revision and record change-feed events in the same transaction as the change"""
+    changed = list(session.new | session.deleted)
+    changed += [obj for obj in session.dirty if session.is_modified(obj)]
+    if any(isinstance(obj, SCHEDULING_MODELS) for obj in changed):
+        increment_scheduling_revision(session.connection())
+
+    dates = sorted({obj.date for obj in changed if isinstance(obj, Timetable)})
+    if dates:
+        record_event(session.connection(), TIMETABLE_STORED, {"dates": dates})
+    teachers = sorted(
+        {obj.id for obj in changed if isinstance(obj, TeacherData)}
+        | {obj.name for obj in changed if isinstance(obj, Teacher)}
+    )
+    if teachers:
+        record_event(session.connection(), TEACHER_CHANGED, {"teachers": teachers})
+    rooms = sorted({obj.room_number for obj in changed if isinstance(obj, Classroom)})
+    if rooms:
+        record_event(session.connection(), ROOM_CHANGED, {"rooms": rooms})
+
+def increment_scheduling_revision(connection):
+    connection.execute(
+        update(SchedulingRevision.__table__)
+        .where(SchedulingRevision.__table__.c.id == 1)
+        .values(revision=SchedulingRevision.__table__.c.revision + 1)
+    )
+
+def get_scheduling_revision(db):
+    row = db.query(SchedulingRevision).filter(SchedulingRevision.id == 1).first()
+    return row.revision if row else 0
+
 class TeacherAvailabilityUpdate(BaseModel):
     teacher_id: str
     available: bool
@@ -366,13 +505,74 @@ class TeacherPreferences(BaseModel):
 
 try:
     Base.metadata.create_all(bind=engine)
+    _db = SessionLocal()
+    if not _db.query(SchedulingRevision).filter(SchedulingRevision.id == 1).first():
+        _db.add(SchedulingRevision(id=1, revision=0))
+        _db.commit()
+    _db.close()
 except Exception as e:
     print(e)
 
-teacher_subject_sections = {}
-teacher_sections_taught = {}
-teacher_availability = {teacher: True for teacher in data["teachers"]}
-teacher_lecture_limits = {}
+teacher_changes = DirtySet()
+teacher_subject_sections = TrackedMap(teacher_changes)
+teacher_sections_taught = TrackedMap(teacher_changes)
+teacher_availability = TrackedMap(teacher_changes, {teacher: True for teacher in data["teachers"]})
+teacher_lecture_limits = TrackedMap(teacher_changes)
+
+TEACHER_DATA_BATCH = 500
+
+def load_teacher_data(db, teacher_names):
+    """TeacherData rows keyed by teacher, fetched with chunked IN queries"""
+    names = list(teacher_names)
+    rows = {}
+    for start in range(0, len(names), TEACHER_DATA_BATCH):
+        chunk = names[start:start + TEACHER_DATA_BATCH]
+        for row in db.query(TeacherData).filter(TeacherData.id.in_(chunk)).all():
+            rows[row.id] = row
+    return rows
+
+def write_teacher_data(db, rows):
+    """Bulk insert or update TeacherData mappings in the caller's transaction, skipping unchanged rows"""
+    existing = load_teacher_data(db, [row["id"] for row in rows])
+    inserts = []
+    updates = []
+    for row in rows:
+        current = existing.get(row["id"])
+        if current is None:
+            inserts.append(row)
+        elif any(getattr(current, key) != value for key, value in row.items()):
+            updates.append(row)
+    if inserts:
+        db.bulk_insert_mappings(TeacherData, inserts)
+    if updates:
+        db.bulk_update_mappings(TeacherData, updates)
+    if inserts or updates:
+        increment_scheduling_revision(db.connection())
+        record_event(db.connection(), TEACHER_CHANGED, {"teachers": sorted(row["id"] for row in inserts + updates)})
+    return len(inserts), len(updates)
+
+def default_teacher_data(teacher_name):
+    return {
+        "id": teacher_name,
+        "subject_sections": {},
+        "sections_taught": [],
+        "availability": True,
+        "lecture_limit": None,
+        "earliest_time": None,
+        "latest_time": None,
+        "preferred_days": [],
+        "preferred_slots": [],
+        "unavailable_days": []
+    }
+
+def teacher_preferences_dict(teacher_data):
+    return {
+        "earliest_time": teacher_data.earliest_time,
+        "latest_time": teacher_data.latest_time,
+        "preferred_days": teacher_data.preferred_days or [],
+        "preferred_slots": teacher_data.preferred_slots or [],
+        "unavailable_days": teacher_data.unavailable_days or []
+    }
 
 def refresh_teacher_cache():
     """Refresh teacher cache from database and sync with ai_timetable_model"""
@@ -391,22 +591,26 @@ def refresh_teacher_cache():
         print(f"Refreshed teacher cache: {len(data['teachers'])} active teachers")
 
 
-        for teacher in data["teachers"]:
-            if teacher not in teacher_availability:
-                teacher_availability[teacher] = True
-            if teacher not in teacher_lecture_limits:
-                teacher_lecture_limits[teacher] = {}
-
-
-        for teacher_name in data["teachers"]:
-            teacher_data = db.query(TeacherData).filter(TeacherData.id == teacher_name).first()
-            if teacher_data:
-                if teacher_data.subject_sections:
-                    teacher_subject_sections[teacher_name] = teacher_data.subject_sections
-                if teacher_data.sections_taught:
-                    teacher_sections_taught[teacher_name] = teacher_data.sections_taught
-                if teacher_data.lecture_limit is not None:
-                    teacher_lecture_limits[teacher_name] = teacher_data.lecture_limit
+        teacher_rows = load_teacher_data(db, data["teachers"])
+        with teacher_changes.untracked():
+            for teacher in data["teachers"]:
+                if teacher not in teacher_availability:
+                    teacher_availability[teacher] = True
+                if teacher not in teacher_lecture_limits:
+                    teacher_lecture_limits[teacher] = {}
+
+
+            for teacher_name in data["teachers"]:
+                teacher_data = teacher_rows.get(teacher_name)
+                if teacher_data:
+                    if teacher_data.subject_sections:
+                        teacher_subject_sections[teacher_name] = teacher_data.subject_sections
+                    if teacher_data.sections_taught:
+                        teacher_sections_taught[teacher_name] = teacher_data.sections_taught
+                    if teacher_data.availability is not None:
+                        teacher_availability[teacher_name] = teacher_data.availability
+                    if teacher_data.lecture_limit is not None:
+                        teacher_lecture_limits[teacher_name] = teacher_data.lecture_limit
     except Exception as e:
         print(f"Error refreshing teacher cache: {e}")
     finally:
@@ -420,24 +624,11 @@ def load_persisted_data():
     db = SessionLocal()
     try:
 
-        for teacher_name in data["teachers"]:
-            teacher_data = db.query(TeacherData).filter(TeacherData.id == teacher_name).first()
-            if not teacher_data:
-
-                new_teacher_data = TeacherData(
-                    id=teacher_name,
-                    subject_sections={},
-                    sections_taught=[],
-                    availability=True,
-                    lecture_limit=None,
-                    earliest_time=None,
-                    latest_time=None,
-                    preferred_days=[],
-                    preferred_slots=[],
-                    unavailable_days=[]
-                )
-                db.add(new_teacher_data)
-                print(f"Initialized TeacherData for: {teacher_name}")
+        teacher_rows = load_teacher_data(db, data["teachers"])
+        missing = [name for name in data["teachers"] if name not in teacher_rows]
+        if missing:
+            write_teacher_data(db, [default_teacher_data(name) for name in missing])
+            print(f"Initialized TeacherData for: {', '.join(missing)}")
 
         db.commit()
     except Exception as e:
@@ -446,27 +637,84 @@ def load_persisted_data():
     finally:
         db.close()
 
-def save_persisted_data():
-    global teacher_subject_sections, teacher_sections_taught, teacher_availability, teacher_lecture_limits
+def teacher_data_row(teacher):
+    lecture_limit = teacher_lecture_limits.get(teacher)
+    return {
+        "id": teacher,
+        "subject_sections": teacher_subject_sections.get(teacher, {}),
+        "sections_taught": teacher_sections_taught.get(teacher, []),
+        "availability": teacher_availability.get(teacher, True),
+        "lecture_limit": lecture_limit if isinstance(lecture_limit, int) else None
+    }
+
+def write_changed_teacher_data(names):
+    """Write the TeacherData rows of the given (changed) active teachers in one transaction"""
+    active = set(data["teachers"])
     db = SessionLocal()
     try:
-        for teacher in data["teachers"]:
-            teacher_data = db.query(TeacherData).filter(TeacherData.id == teacher).first()
-            if not teacher_data:
-                teacher_data = TeacherData(id=teacher)
-            teacher_data.subject_sections = teacher_subject_sections.get(teacher, {})
-            teacher_data.sections_taught = teacher_sections_taught.get(teacher, [])
-            teacher_data.availability = teacher_availability.get(teacher, True)
-            teacher_data.lecture_limit = teacher_lecture_limits.get(teacher, None)
-            db.merge(teacher_data)
+        write_teacher_data(db, [teacher_data_row(teacher) for teacher in sorted(names) if teacher in active])
         db.commit()
-    except Exception as e:
-        print(e)
+    except Exception:
         db.rollback()
+        raise
     finally:
         db.close()
 
-def store_timetable(start_date=None, course="BTech", semester=4):
+teacher_data_writer = TeacherDataWriter(teacher_changes, write_changed_teacher_data)
+
+def save_persisted_data():
+    """Persist the teachers changed since the last save (coalesced when TEACHER_DATA_FLUSH_DELAY is set)"""
+    try:
+        teacher_data_writer.save()
+    except Exception as e:
+        print(e)
+
+def flush_persisted_data():
+    """Write any coalesced teacher changes now, before reading TeacherData back from the database"""
+    try:
+        teacher_data_writer.flush()
+    except Exception as e:
+        print(e)
+
+def load_teacher_preferences(db):
+    """Scheduling preferences for every known teacher"""
+    teacher_rows = load_teacher_data(db, data["teachers"])
+    return {
+        teacher: teacher_preferences_dict(teacher_rows[teacher])
+        for teacher in data["teachers"]
+        if teacher in teacher_rows
+    }
+
+def load_active_classrooms(db):
+    classrooms = []
+    classroom_records = db.query(Classroom).filter(Classroom.is_active == True).all()
+    for classroom in classroom_records:
+        classrooms.append({
+            "id": classroom.id,
+            "room_number": classroom.room_number,
+            "building": classroom.building,
+            "floor": classroom.floor,
+            "capacity": classroom.capacity,
+            "room_type": classroom.room_type,
+            "subjects": classroom.subjects or []
+        })
+    return classrooms
+
+def build_subject_teacher_mapping():
+    """Invert teacher_subject_sections into subject -> teachers"""
+    mapping = {}
+    for teacher_name, subjects_dict in teacher_subject_sections.items():
+        for subject, sections in subjects_dict.items():
+            if subject not in mapping:
+                mapping[subject] = []
+            if teacher_name not in mapping[subject]:
+                mapping[subject].append(teacher_name)
+    return mapping
+
+generation_quality = {}
+generation_profiles = {}
+
+def store_timetable(start_date=None, course="BTech", semester=4, restarts=1, time_budget=None, engine="greedy", capture=None):
     if not start_date or not start_date.strip():
         today = datetime.now()
         start_date = today.strftime("%Y-%m-%d")
@@ -485,65 +733,155 @@ def store_timetable(start_date=None, course="BTech", semester=4):
         semester = 4
 
 
+    scheduler = get_scheduler(engine)
+    profile = GenerationProfile(capture, date=start_date, course=course, semester=semester, engine=engine, restarts=restarts)
     db = SessionLocal()
     try:
-        teacher_preferences = {}
-        for teacher in data["teachers"]:
-            teacher_data = db.query(TeacherData).filter(TeacherData.id == teacher).first()
-            if teacher_data:
-                teacher_preferences[teacher] = {
-                    "earliest_time": teacher_data.earliest_time,
-                    "latest_time": teacher_data.latest_time,
-                    "preferred_days": teacher_data.preferred_days or [],
-                    "preferred_slots": teacher_data.preferred_slots or [],
-                    "unavailable_days": teacher_data.unavailable_days or []
-                }
-
-
-        classrooms = []
-        classroom_records = db.query(Classroom).filter(Classroom.is_active == True).all()
-        for classroom in classroom_records:
-            classrooms.append({
-                "id": classroom.id,
-                "room_number": classroom.room_number,
-                "building": classroom.building,
-                "floor": classroom.floor,
-                "capacity": classroom.capacity,
-                "room_type": classroom.room_type,
-                "subjects": classroom.subjects or []
-            })
-
+        with profile.run():
+            timetable = run_scheduler(profile, scheduler, start_date, course, semester, restarts, time_budget, engine)
+
+            profile.mark()
+            db_timetable, version = save_timetable_version(db, start_date, timetable, course, semester)
+            end_date = db_timetable.end_date
+            timetable_views.get(start_date, end_date, db_timetable.data, data["time_slots"], version).teacher_load(data["teachers"])
+            profile.lap("store")
+
+        generation_profiles[start_date] = profile.to_dict()
+        record_profile(generation_profiles[start_date])
+        print(f"Stored timetable starting {start_date} to {end_date} in {profile.total_seconds:.3f}s")
+        return timetable, start_date
+    finally:
+        db.close()
 
-        import ai_timetable_model
-        ai_timetable_model.subject_teacher_mapping = {}
-        for teacher_name, subjects_dict in teacher_subject_sections.items():
-            for subject, sections in subjects_dict.items():
-                if subject not in ai_timetable_model.subject_teacher_mapping:
-                    ai_timetable_model.subject_teacher_mapping[subject] = []
-                if teacher_name not in ai_timetable_model.subject_teacher_mapping[subject]:
-                    ai_timetable_model.subject_teacher_mapping[subject].append(teacher_name)
-
-        print(f"Built subject_teacher_mapping: {ai_timetable_model.subject_teacher_mapping}")
-
-        timetable = generate_timetable(
-            start_date,
-            teacher_subject_sections,
-            teacher_sections_taught,
-            teacher_lecture_limits,
-            teacher_availability,
-            teacher_preferences,
-            classrooms,
-            course,
-            semester
+def run_scheduler(profile, scheduler, start_date, course, semester, restarts=1, time_budget=None, engine="greedy"):
+    """Run the scheduler (or the seeded restart search) with phase timings recorded on profile"""
+    profile.mark()
+    if restarts and restarts > 1:
+        timetable, quality = search_best_timetable(
+            start_date, course, semester, build_scheduling_snapshot(), data["time_slots"],
+            restarts=restarts, time_budget=time_budget, job_manager=generation_jobs, engine=engine
         )
+        generation_quality[start_date] = quality
+        profile.lap("restart_search")
+        # Restarts ran on snapshots in the pool; record the winner's sections here as a single run would
+        import ai_timetable_model
+        ai_timetable_model.update_sections_taught(timetable, list(timetable), teacher_sections_taught)
+        profile.lap("sections_taught")
+        return timetable
 
-        db_timetable = Timetable(date=start_date, data=json.dumps(timetable))
-        db.merge(db_timetable)
-        db.commit()
+    inputs = get_scheduling_inputs()
+    subjects, sections = snapshot_course_inputs(inputs, course, semester)
 
-        end_date = (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
-        print(f"Stored timetable starting {start_date} to {end_date}: {json.dumps(timetable, indent=4)}")
-        return timetable, start_date
+    import ai_timetable_model
+    ai_timetable_model.subject_teacher_mapping = build_subject_teacher_mapping()
+    profile.lap("input_load")
+
+    timetable = scheduler(
+        start_date,
+        teacher_subject_sections,
+        teacher_sections_taught,
+        teacher_lecture_limits,
+        teacher_availability,
+        inputs["teacher_preferences"],
+        inputs["classrooms"],
+        course,
+        semester,
+        subject_dependencies=inputs["subject_dependencies"],
+        elective_groups_data=inputs["elective_groups_data"],
+        subjects=subjects,
+        sections=sections,
+        profile=profile
+    )
+    generation_quality.pop(start_date, None)
+    return timetable
+
+def save_timetable_version(db, start_date, timetable, course=None, semester=None):
+    """Store a timetable as the new head for start_date and record its revision.
+
+    Commits, and returns (Timetable row, version). Nothing is written when the
+    timetable and its course/semester are unchanged; otherwise the full head
+    document is rewritten alongside the new revision.
+    """
+    entry = db.get(Timetable, start_date)
+    version = record_revision(db, start_date, entry.data if entry else None, timetable, data["time_slots"])
+    if version is None:
+        if (entry.course, entry.semester) != (course, semester):
+            entry.course, entry.semester = course, semester
+            db.commit()
+        return entry, latest_revision(db, start_date)
+
+    document = CompactTimetable.from_dict(timetable, time_slots=data["time_slots"]).to_json()
+    metrics.TIMETABLE_DOCUMENT_BYTES.observe(len(document), kind="head")
+    if entry is None:
+        entry = Timetable(date=start_date, start_date=start_date, end_date=timetable_end_date(start_date))
+        db.add(entry)
+    entry.course = course
+    entry.semester = semester
+    entry.data = document
+    db.commit()
+    return entry, version
+
+def find_timetable_entry(db, date, with_data=True):
+    """Most recent stored timetable whose week covers date, fetched with one indexed range query.
+
+    With with_data=False the document column is deferred until first accessed.
+    """
+    query = db.query(Timetable)
+    if not with_data:
+        query = query.options(defer(Timetable.data))
+    return (
+        query
+        .filter(Timetable.start_date <= date, Timetable.end_date >= date)
+        .order_by(Timetable.start_date.desc())
+        .first()
+    )
+
+def repair_stored_timetable(teacher_id, date=None):
+    """Incrementally repair every stored timetable whose week ends on or after date after one teacher's constraints changed.
+
+    Returns (timetable, report) for the earliest of those weeks, with the report
+    totalled over all of them, or (None, None) when none is stored.
+    """
+    if not date:
+        date = datetime.now().strftime("%Y-%m-%d")
+    db = SessionLocal()
+    try:
+        entries = (
+            db.query(Timetable)
+            .filter(Timetable.end_date >= date)
+            .order_by(Timetable.start_date)
+            .all()
+        )
+        if not entries:
+            return None, None
+        subject_teachers = build_subject_teacher_mapping()
+        preferences = load_teacher_preferences(db)
+        classrooms = load_active_classrooms(db)
+
+        first = None
+        report = {"teacher": teacher_id, "invalidated": 0, "changes": [], "unplaced": [], "weeks": []}
+        for entry in entries:
+            timetable = load_timetable(entry.data, data["time_slots"]).to_dict()
+            timetable, week = repair_timetable(
+                timetable,
+                teacher_id,
+                subject_teachers,
+                teacher_subject_sections,
+                teacher_lecture_limits,
+                teacher_availability,
+                preferences,
+                classrooms,
+                data["time_slots"]
+            )
+            if week["invalidated"]:
+                save_timetable_version(db, entry.date, timetable, entry.course, entry.semester)
+            if first is None:
+                first = timetable
+            report["invalidated"] += week["invalidated"]
+            report["changes"].extend({"date": entry.date, **change} for change in week["changes"])
+            report["unplaced"].extend({"date": entry.date, **cell} for cell in week["unplaced"])
+            report["weeks"].append({"date": entry.date, "end_date": entry.end_date, "invalidated": week["invalidated"]})
+        return first, report
     finally:
         db.close()
 
@@ -557,10 +895,46 @@ async def schedule_timetable_generation():
         timetable, start_date = store_timetable()
         print(f"Timetable generated for starting {start_date}")
 
+startup_report = {}
+
+def ml_modules_loaded():
+    """ML libraries imported so far; empty until a model-backed feature runs"""
+    return [name for name in ML_MODULES if name in sys.modules]
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
+    startup_report["import_seconds"] = round(started - import_started, 4)
     load_persisted_data()
+    startup_report["load_data_seconds"] = round(time.perf_counter() - started, 4)
     asyncio.create_task(schedule_timetable_generation())
+    await change_feed.start()
+    startup_report["startup_seconds"] = round(time.perf_counter() - import_started, 4)
+    startup_report["peak_rss_mb"] = peak_rss_mb()
+    startup_report["ml_modules_loaded"] = ml_modules_loaded()
+    startup_report["storage"] = storage_settings(engine)
+    for phase in ("import", "load_data", "startup"):
+        metrics.STARTUP_SECONDS.set(startup_report[f"{phase}_seconds"], phase=phase)
+    print(
+        f"Startup: {startup_report['startup_seconds']:.2f}s "
+        f"(import {startup_report['import_seconds']:.2f}s, load data {startup_report['load_data_seconds']:.2f}s), "
+        f"peak RSS {startup_report['peak_rss_mb']} MB, ML modules loaded: {', '.join(startup_report['ml_modules_loaded']) or 'none'}"
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    flush_persisted_data()
+    generation_jobs.shutdown()
+    optimize_storage(engine)
+    await change_feed.stop()
 
 @app.get("/")
 def home():
@@ -603,96 +977,128 @@ def validate_combination(course: str, semester: int, section: str):
     return {"valid": is_valid, "message": message, "course": course, "semester": semester, "section": section}
 
 
-def generate_timetable_background(task_id, date, course, semester):
-    """Background task to generate timetable"""
-    global background_tasks
+def snapshot_generation_state():
+    """Picklable copy of the in-memory scheduling state for pool workers"""
+    return {
+        "teachers": list(data["teachers"]),
+        "teacher_subject_sections": copy.deepcopy(teacher_subject_sections),
+        "teacher_sections_taught": copy.deepcopy(teacher_sections_taught),
+        "teacher_availability": dict(teacher_availability),
+        "teacher_lecture_limits": dict(teacher_lecture_limits)
+    }
 
+def restore_generation_state(state):
+    """Install a snapshot taken by snapshot_generation_state in this process"""
+    import ai_timetable_model
+    data["teachers"] = state["teachers"]
+    ai_timetable_model.data["teachers"] = state["teachers"]
+    teacher_subject_sections.clear()
+    teacher_subject_sections.update(state["teacher_subject_sections"])
+    teacher_sections_taught.clear()
+    teacher_sections_taught.update(state["teacher_sections_taught"])
+    teacher_availability.clear()
+    teacher_availability.update(state["teacher_availability"])
+    teacher_lecture_limits.clear()
+    teacher_lecture_limits.update(state["teacher_lecture_limits"])
+
+def generate_timetable_background(task_id, date, course, semester, restarts=1, time_budget=None, engine="greedy", capture=None):
+    """Background task to generate timetable. Returns the generation profile when it succeeds"""
     try:
-        background_tasks[task_id]["status"] = "running"
-        background_tasks[task_id]["progress"] = 10
-        background_tasks[task_id]["message"] = "Starting timetable generation..."
+        update_task(task_id, status="running", progress=10, message="Starting timetable generation...")
 
 
         if not course or not semester:
-            background_tasks[task_id]["status"] = "failed"
-            background_tasks[task_id]["error"] = "Please select a course and semester"
+            update_task(task_id, status="failed", error="Please select a course and semester")
             return
 
         try:
             semester = int(semester)
         except ValueError:
-            background_tasks[task_id]["status"] = "failed"
-            background_tasks[task_id]["error"] = "Invalid semester value"
+            update_task(task_id, status="failed", error="Invalid semester value")
             return
 
 
         if not data["teachers"] or len(data["teachers"]) == 0:
-            background_tasks[task_id]["status"] = "failed"
-            background_tasks[task_id]["error"] = "No teachers available in the system."
+            update_task(task_id, status="failed", error="No teachers available in the system.")
             return
 
-        background_tasks[task_id]["progress"] = 20
-        background_tasks[task_id]["message"] = "Validating course and semester..."
+        update_task(task_id, progress=20, message="Validating course and semester...")
 
 
-        sections = get_sections_for_course(course)
+        subjects, sections = snapshot_course_inputs(get_scheduling_inputs(), course, semester)
         if not sections:
-            background_tasks[task_id]["status"] = "failed"
-            background_tasks[task_id]["error"] = f"Course '{course}' not found"
+            update_task(task_id, status="failed", error=f"Course '{course}' not found")
             return
 
-        subjects = get_subjects_for_semester(course, semester)
         if not subjects:
-            background_tasks[task_id]["status"] = "failed"
-            background_tasks[task_id]["error"] = f"No subjects found for {course} semester {semester}"
+            update_task(task_id, status="failed", error=f"No subjects found for {course} semester {semester}")
             return
 
-        background_tasks[task_id]["progress"] = 30
-        background_tasks[task_id]["message"] = f"Generating timetable for {len(sections)} sections..."
+        update_task(task_id, progress=30, message=f"Generating timetable for {len(sections)} sections...")
 
 
-        timetable, start_date = store_timetable(date, course, semester)
+        timetable, start_date = store_timetable(date, course, semester, restarts, time_budget, engine, capture)
 
         end_date = (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
 
 
-        background_tasks[task_id]["status"] = "completed"
-        background_tasks[task_id]["progress"] = 100
-        background_tasks[task_id]["message"] = "Timetable generated successfully!"
-        background_tasks[task_id]["result"] = {
-            "date": start_date,
-            "end_date": end_date,
-            "timetable": timetable,
-            "course": course,
-            "semester": semester,
-            "sections": sections
-        }
+        update_task(
+            task_id,
+            status="completed",
+            progress=100,
+            message="Timetable generated successfully!",
+            result={
+                "date": start_date,
+                "end_date": end_date,
+                "timetable": timetable,
+                "course": course,
+                "semester": semester,
+                "sections": sections,
+                "quality": generation_quality.get(start_date),
+                "profile": generation_profiles.get(start_date)
+            }
+        )
+        return generation_profiles.get(start_date)
 
     except Exception as e:
-        background_tasks[task_id]["status"] = "failed"
-        background_tasks[task_id]["error"] = str(e)
-        background_tasks[task_id]["message"] = f"Error: {str(e)}"
+        update_task(task_id, status="failed", error=str(e), message=f"Error: {str(e)}")
+
+def learned_scorer_error(engine):
+    """For engine=learned, load (or first train) the scorer up front and map failures as /scorer/train does"""
+    if engine != "learned":
+        return None
+    try:
+        from learned_scoring import load_scorer
+        load_scorer()
+    except ImportError as e:
+        return JSONResponse(status_code=503, content={"error": f"Learned scoring is unavailable: {e}"})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return None
 
 @app.get("/generate")
-def generate(date: str = None, course: str = "", semester: str = "", async_mode: bool = False):
+def generate(date: str = None, course: str = "", semester: str = "", async_mode: bool = False, restarts: int = 1, time_budget: Optional[float] = None, engine: str = "greedy", profile: Optional[str] = None):
     """Generate timetable for specified course and semester"""
+    try:
+        get_scheduler(engine)
+        GenerationProfile(profile)
+    except ValueError as e:
+        return {"error": str(e)}
+    restarts = max(1, min(restarts, MAX_RESTARTS))
 
 
     if async_mode:
-        task_id = str(uuid.uuid4())
-        background_tasks[task_id] = {
-            "status": "pending",
-            "progress": 0,
-            "message": "Initializing...",
-            "result": None,
-            "error": None
-        }
-
-
-        thread = Thread(target=generate_timetable_background, args=(task_id, date, course, semester))
-        thread.daemon = True
-        thread.start()
+        try:
+            task_id, deduplicated = generation_jobs.submit(date, course, semester, snapshot_generation_state(), restarts, time_budget, engine, profile)
+        except GenerationQueueFull as e:
+            return {"error": str(e)}
 
+        if deduplicated:
+            return {
+                "task_id": task_id,
+                "status": "started",
+                "message": "Timetable generation for this course, semester and date is already in progress"
+            }
         return {
             "task_id": task_id,
             "status": "started",
@@ -714,15 +1120,18 @@ def generate(date: str = None, course: str = "", semester: str = "", async_mode:
         return {"error": "No teachers available in the system. Please add teachers through the Teacher Management UI."}
 
 
-    sections = get_sections_for_course(course)
+    subjects, sections = snapshot_course_inputs(get_scheduling_inputs(), course, semester)
     if not sections:
         return {"error": f"Course '{course}' not found"}
 
-    subjects = get_subjects_for_semester(course, semester)
     if not subjects:
         return {"error": f"No subjects found for {course} semester {semester}"}
 
-    timetable, start_date = store_timetable(date, course, semester)
+    unavailable = learned_scorer_error(engine)
+    if unavailable:
+        return unavailable
+
+    timetable, start_date = store_timetable(date, course, semester, restarts, time_budget, engine, profile)
     end_date = (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
     return {
         "date": start_date,
@@ -730,59 +1139,380 @@ def generate(date: str = None, course: str = "", semester: str = "", async_mode:
         "timetable": timetable,
         "course": course,
         "semester": semester,
-        "sections": sections
+        "sections": sections,
+        "quality": generation_quality.get(start_date),
+        "profile": generation_profiles.get(start_date)
+    }
+
+def get_active_course_semesters():
+    """Distinct (course, semester) pairs across active batches"""
+    db = SessionLocal()
+    try:
+        rows = db.query(Batch.batch_type, Batch.semester).filter(Batch.is_active == True).distinct().all()
+        return sorted({(batch_type, semester) for batch_type, semester in rows})
+    finally:
+        db.close()
+
+def load_course_catalog(db):
+    """Subjects per (batch_type, semester) and sections per batch_type for all active batches"""
+    batches = db.query(Batch).filter(Batch.is_active == True).all()
+    batch_ids = [batch.id for batch in batches]
+    subjects_by_batch = {}
+    for subj in db.query(Subject).filter(Subject.batch_id.in_(batch_ids), Subject.is_active == True).all():
+        subjects_by_batch.setdefault(subj.batch_id, []).append(subj.code)
+    sections_by_batch = {}
+    for sec in db.query(Section).filter(Section.batch_id.in_(batch_ids)).all():
+        sections_by_batch.setdefault(sec.batch_id, []).append(sec.section_letter)
+
+    course_subjects = {}
+    course_sections = {}
+    for batch in batches:
+        subjects = course_subjects.setdefault(f"{batch.batch_type}|{batch.semester}", [])
+        for code in subjects_by_batch.get(batch.id, []):
+            if code not in subjects:
+                subjects.append(code)
+        sections = course_sections.setdefault(batch.batch_type, [])
+        for letter in sections_by_batch.get(batch.id, []):
+            if letter not in sections:
+                sections.append(letter)
+    return course_subjects, course_sections
+
+_scheduling_inputs_cache = {"revision": None, "inputs": None}
+
+def get_scheduling_inputs():
+    """Database-backed scheduling inputs, reloaded only when the scheduling revision changes"""
+    import ai_timetable_model
+    db = SessionLocal()
+    try:
+        revision = get_scheduling_revision(db)
+        hit = _scheduling_inputs_cache["revision"] == revision and _scheduling_inputs_cache["inputs"] is not None
+        metrics.cache_lookup("scheduling_inputs", hit)
+        if not hit:
+            course_subjects, course_sections = load_course_catalog(db)
+            _scheduling_inputs_cache["inputs"] = {
+                "revision": revision,
+                "teacher_preferences": load_teacher_preferences(db),
+                "classrooms": load_active_classrooms(db),
+                "subject_dependencies": ai_timetable_model.load_subject_dependencies(),
+                "elective_groups_data": ai_timetable_model.load_elective_groups(),
+                "course_subjects": course_subjects,
+                "course_sections": course_sections
+            }
+            _scheduling_inputs_cache["revision"] = revision
+        return _scheduling_inputs_cache["inputs"]
+    finally:
+        db.close()
+
+def build_scheduling_snapshot():
+    """Read-only copy of every input generate_timetable needs, shared by all pool workers"""
+    return {
+        "state": snapshot_generation_state(),
+        "subject_teacher_mapping": build_subject_teacher_mapping(),
+        **get_scheduling_inputs()
+    }
+
+def snapshot_course_inputs(snapshot, course, semester):
+    """(subjects, sections) for a course and semester from a scheduling snapshot"""
+    normalized_course = normalize_course_name(course)
+    subjects = snapshot["course_subjects"].get(f"{normalized_course}|{semester}", [])
+    sections = snapshot["course_sections"].get(normalized_course, [])
+    return subjects, sections
+
+def save_institute_timetable(db, start_date, combinations, timetable, conflicts):
+    """Store a merged institute run for the week starting start_date, replacing the previous run for that week"""
+    entry = db.get(InstituteTimetable, start_date)
+    if entry is None:
+        entry = InstituteTimetable(start_date=start_date, end_date=timetable_end_date(start_date))
+        db.add(entry)
+    entry.combinations = [{"course": course, "semester": semester} for course, semester in combinations]
+    entry.conflicts = conflicts
+    entry.data = CompactTimetable.from_dict(timetable, time_slots=data["time_slots"]).to_json()
+    entry.created_at = time.time()
+    db.commit()
+    return entry
+
+@app.get("/generate_all")
+def generate_all(date: str = None, engine: str = "greedy"):
+    """Generate timetables for every active course and semester in parallel"""
+    try:
+        get_scheduler(engine)
+    except ValueError as e:
+        return {"error": str(e)}
+    if not data["teachers"]:
+        return {"error": "No teachers available in the system. Please add teachers through the Teacher Management UI."}
+
+    if not date or not date.strip():
+        date = datetime.now().strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "Invalid date, expected YYYY-MM-DD"}
+
+    combinations = get_active_course_semesters()
+    if not combinations:
+        return {"error": "No active batches found"}
+
+    unavailable = learned_scorer_error(engine)
+    if unavailable:
+        return unavailable
+
+    timetable, conflicts = generate_institute_timetables(date, combinations, build_scheduling_snapshot(), generation_jobs, engine=engine)
+
+    db = SessionLocal()
+    try:
+        end_date = save_institute_timetable(db, date, combinations, timetable, conflicts).end_date
+    finally:
+        db.close()
+
+    return {
+        "date": date,
+        "end_date": end_date,
+        "combinations": [{"course": course, "semester": semester} for course, semester in combinations],
+        "timetable": timetable,
+        "teacher_conflicts": conflicts["teacher_conflicts"],
+        "room_conflicts": conflicts["room_conflicts"]
     }
 
+@app.get("/institute_timetable/{date}")
+def get_institute_timetable(date: str):
+    """The stored /generate_all result whose week covers date"""
+    db = SessionLocal()
+    try:
+        entry = (
+            db.query(InstituteTimetable)
+            .filter(InstituteTimetable.start_date <= date, InstituteTimetable.end_date >= date)
+            .order_by(InstituteTimetable.start_date.desc())
+            .first()
+        )
+        if entry is None:
+            return {"error": "No institute timetable covers this date. Run /generate_all first."}
+        return {
+            "date": entry.start_date,
+            "end_date": entry.end_date,
+            "combinations": entry.combinations,
+            "timetable": load_timetable(entry.data, data["time_slots"]).to_dict(),
+            "teacher_conflicts": entry.conflicts["teacher_conflicts"],
+            "room_conflicts": entry.conflicts["room_conflicts"]
+        }
+    finally:
+        db.close()
+
 @app.get("/task/{task_id}")
 def get_task_status(task_id: str):
     """Get status of a background task"""
-    if task_id not in background_tasks:
+    task = generation_jobs.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    return task
 
-    task = background_tasks[task_id]
+@app.post("/scorer/train")
+def train_candidate_scorer(epochs: int = 10):
+    """Retrain the candidate scorer used by engine=learned on every stored timetable"""
+    if epochs < 1:
+        raise HTTPException(status_code=400, detail="epochs must be at least 1")
+    try:
+        from learned_scoring import train_scorer
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Learned scoring is unavailable: {e}")
+    db = SessionLocal()
+    try:
+        return train_scorer(db, data["time_slots"], epochs)
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Learned scoring is unavailable: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        db.close()
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of this process's request, database, cache and generation metrics"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+metrics.GENERATION_QUEUE_DEPTH.set_function(generation_jobs.queue_depth)
+metrics.GENERATION_IN_FLIGHT.set_function(generation_jobs.in_flight)
+metrics.CHANGE_FEED_SUBSCRIBERS.set_function(change_feed.subscriber_count)
+metrics.ML_MODULES_LOADED.set_function(lambda: {(name,): int(name in sys.modules) for name in ML_MODULES})
+
+@app.get("/startup_report")
+def get_startup_report():
+    """How long this worker took to start and whether the ML stack has been loaded"""
+    return {**startup_report, "ml_modules_loaded": ml_modules_loaded()}
+
+@app.get("/generation_metrics")
+def get_generation_metrics(limit: int = 10):
+    """Phase timings and placement counters of recent generations in this API process"""
     return {
-        "task_id": task_id,
-        "status": task["status"],
-        "progress": task["progress"],
-        "message": task["message"],
-        "error": task.get("error"),
-        "result": task.get("result")
+        "aggregate": aggregate_profiles(),
+        "recent": recent_profiles(limit)
     }
 
+timetable_views = TimetableViewCache()
+
+def cached_json_response(etag, body, if_none_match=None):
+    """JSON response carrying an ETag, or 304 when the client already holds that version"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def find_timetable_views(db, date):
+    """Cached views for the stored timetable covering date, or None. The document is only loaded on a cache miss"""
+    db_timetable = find_timetable_entry(db, date, with_data=False)
+    if not db_timetable:
+        return None
+    return timetable_views.get(
+        db_timetable.start_date, db_timetable.end_date, lambda: db_timetable.data, data["time_slots"],
+        latest_revision(db, db_timetable.date)
+    )
+
+def missing_timetable_error(db):
+    latest_timetable = db.query(Timetable).order_by(Timetable.start_date.desc()).first()
+    if latest_timetable:
+        start_date = latest_timetable.start_date
+        end_date = latest_timetable.end_date
+        return {"error": f"Timetable generated for {start_date} to {end_date}. Please type a date between these to view."}
+    return {"error": "No timetable found."}
+
 @app.get("/timetable/{date}")
-def get_timetable(date: str):
+def get_timetable(date: str, if_none_match: Optional[str] = Header(None)):
     db = SessionLocal()
-    all_timetables = db.query(Timetable).order_by(Timetable.date.desc()).all()
-    for db_timetable in all_timetables:
-        start_date = db_timetable.date
-        end_date = (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
-        if start_date <= date <= end_date:
-            db.close()
-            timetable_data = json.loads(db_timetable.data)
+    try:
+        views = find_timetable_views(db, date)
+        if views is None:
+            return missing_timetable_error(db)
+        etag, body = views.full()
+        return cached_json_response(etag, body, if_none_match)
+    finally:
+        db.close()
 
+@app.get("/timetable/{date}/section/{section}")
+def get_section_timetable(date: str, section: str, if_none_match: Optional[str] = Header(None)):
+    """One section's week from the stored timetable covering date"""
+    db = SessionLocal()
+    try:
+        views = find_timetable_views(db, date)
+        if views is None:
+            return missing_timetable_error(db)
+        rendered = views.section(section)
+        if rendered is None:
+            return {"error": f"Section '{section}' not found in the timetable for {views.start_date} to {views.end_date}"}
+        return cached_json_response(*rendered, if_none_match)
+    finally:
+        db.close()
+
+@app.get("/timetable/{date}/teacher/{teacher}")
+def get_teacher_timetable(date: str, teacher: str, if_none_match: Optional[str] = Header(None)):
+    """One teacher's lectures from the stored timetable covering date"""
+    db = SessionLocal()
+    try:
+        views = find_timetable_views(db, date)
+        if views is None:
+            return missing_timetable_error(db)
+        rendered = views.teacher(teacher)
+        if rendered is None:
+            return {"date": views.start_date, "end_date": views.end_date, "teacher": teacher, "lectures": []}
+        return cached_json_response(*rendered, if_none_match)
+    finally:
+        db.close()
+
+@app.get("/teacher_load")
+def get_teacher_load(date: str = None):
+    """Teacher x day x slot lecture counts and weekly totals for the timetable covering date (default today)"""
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    db = SessionLocal()
+    try:
+        views = find_timetable_views(db, date)
+        if views is None:
+            return missing_timetable_error(db)
+        load = views.teacher_load(data["teachers"])
+        preferences = load_teacher_preferences(db)
+        return {
+            "date": views.start_date,
+            "end_date": views.end_date,
+            "version": views.revision,
+            **load,
+            "available": [teacher_availability.get(teacher, True) for teacher in load["teachers"]],
+            "constraints": {
+                teacher: {
+                    "earliest_time": prefs["earliest_time"],
+                    "latest_time": prefs["latest_time"],
+                    "unavailable_days": prefs["unavailable_days"]
+                }
+                for teacher, prefs in preferences.items()
+                if prefs["earliest_time"] or prefs["latest_time"] or prefs["unavailable_days"]
+            }
+        }
+    finally:
+        db.close()
 
-            filtered_timetable = {}
-            for section, days in timetable_data.items():
-                filtered_timetable[section] = {}
-                for day, time_slots in days.items():
-                    filtered_timetable[section][day] = {}
-                    for time_slot, content in time_slots.items():
-                        teacher = content.get("teacher", "")
+@app.get("/timetable/{date}/versions")
+def get_timetable_versions(date: str):
+    """Stored revisions of the timetable covering date"""
+    db = SessionLocal()
+    try:
+        db_timetable = find_timetable_entry(db, date)
+        if not db_timetable:
+            return missing_timetable_error(db)
+        return {
+            "date": db_timetable.start_date,
+            "end_date": db_timetable.end_date,
+            "versions": list_revisions(db, db_timetable.date)
+        }
+    finally:
+        db.close()
 
-                        if teacher and teacher not in ["respective teacher", "Elective Faculty", ""]:
-                            filtered_timetable[section][day][time_slot] = content
+@app.get("/timetable/{date}/diff")
+def get_timetable_diff(date: str, from_version: Optional[int] = Query(None, alias="from"), to_version: Optional[int] = Query(None, alias="to")):
+    """Slot-level changes between two revisions of the timetable covering date (default: previous to latest).
 
-                        elif content.get("subject") == "Lunch":
-                            filtered_timetable[section][day][time_slot] = content
+    Changes are empty when from equals to, or when the default from would precede
+    the first revision (from is then None).
+    """
+    db = SessionLocal()
+    try:
+        db_timetable = find_timetable_entry(db, date, with_data=False)
+        if not db_timetable:
+            return missing_timetable_error(db)
+        latest = latest_revision(db, db_timetable.date)
+        if latest == 0 and (from_version is not None or to_version is not None):
+            return {"error": f"No revisions are stored yet for the timetable starting {db_timetable.start_date}"}
+        if to_version is None:
+            to_version = latest
+        if from_version is None:
+            from_version = to_version - 1 if to_version > 1 else None
+        if latest and not (1 <= to_version <= latest and (from_version is None or 1 <= from_version <= latest)):
+            return {"error": f"Versions must be between 1 and {latest} for the timetable starting {db_timetable.start_date}"}
+        if from_version is None or from_version == to_version:
+            changes = {"set": [], "clear": []}
+        else:
+            changes = diff_revisions(db, db_timetable.date, from_version, to_version, data["time_slots"], view=filter_timetable)
+        if changes is None:
+            return {"error": "Timetable history is incomplete for the requested versions"}
+        return {
+            "date": db_timetable.start_date,
+            "end_date": db_timetable.end_date,
+            "from": from_version,
+            "to": to_version,
+            "changes": changes
+        }
+    finally:
+        db.close()
 
-            return {"date": start_date, "end_date": end_date, "timetable": filtered_timetable}
-    db.close()
-    latest_timetable = db.query(Timetable).order_by(Timetable.date.desc()).first()
-    if latest_timetable:
-        start_date = latest_timetable.date
-        end_date = (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
-        return {"error": f"Timetable generated for {start_date} to {end_date}. Please type a date between these to view."}
-    return {"error": "No timetable found."}
+@app.get("/events")
+async def stream_change_events(request: Request, since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """Server-sent events for stored timetables, teacher changes and room changes"""
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        change_feed.stream(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/events/version")
+def get_change_version():
+    return {"version": latest_version()}
 
 @app.get("/notify")
 def notify_users():
@@ -803,10 +1533,17 @@ def update_teacher_availability(update: TeacherAvailabilityUpdate):
         old_availability = teacher_availability[teacher_id]
         teacher_availability[teacher_id] = available
         save_persisted_data()
-        timetable, start_date = store_timetable()
+        timetable, repair = repair_stored_timetable(teacher_id)
+        if timetable is None:
+            timetable, start_date = store_timetable()
+            return {
+                "message": f"Updated availability for {teacher_id} to {available} and regenerated timetable",
+                "timetable": timetable
+            }
         return {
-            "message": f"Updated availability for {teacher_id} to {available} and regenerated timetable",
-            "timetable": timetable
+            "message": f"Updated availability for {teacher_id} to {available} and repaired {repair['invalidated']} affected lectures",
+            "timetable": timetable,
+            "repair": repair
         }
     raise HTTPException(status_code=404, detail="Teacher not found")
 
@@ -832,12 +1569,14 @@ def assign_teacher_subject_sections(assignment: TeacherSubjectSections):
 
         if subject in teacher_subject_sections[teacher_id]:
             del teacher_subject_sections[teacher_id][subject]
+            teacher_changes.mark(teacher_id)
 
         if subject in subject_teacher_mapping and teacher_id in subject_teacher_mapping[subject]:
             subject_teacher_mapping[subject].remove(teacher_id)
     else:
 
         teacher_subject_sections[teacher_id][subject] = sections
+        teacher_changes.mark(teacher_id)
 
 
         if subject not in subject_teacher_mapping:
@@ -967,17 +1706,19 @@ def sync_teachers():
         data["teachers"] = [teacher.name for teacher in all_teachers]
 
 
+        teacher_rows = load_teacher_data(db, data["teachers"])
         for teacher_name in data["teachers"]:
-            teacher_data = db.query(TeacherData).filter(TeacherData.id == teacher_name).first()
+            teacher_data = teacher_rows.get(teacher_name)
             if teacher_data:
-                if teacher_data.subject_sections:
-                    teacher_subject_sections[teacher_name] = teacher_data.subject_sections
-                if teacher_data.sections_taught:
-                    teacher_sections_taught[teacher_name] = teacher_data.sections_taught
-                if teacher_data.availability is not None:
-                    teacher_availability[teacher_name] = teacher_data.availability
-                if teacher_data.lecture_limit is not None:
-                    teacher_lecture_limits[teacher_name] = teacher_data.lecture_limit
+                with teacher_changes.untracked():
+                    if teacher_data.subject_sections:
+                        teacher_subject_sections[teacher_name] = teacher_data.subject_sections
+                    if teacher_data.sections_taught:
+                        teacher_sections_taught[teacher_name] = teacher_data.sections_taught
+                    if teacher_data.availability is not None:
+                        teacher_availability[teacher_name] = teacher_data.availability
+                    if teacher_data.lecture_limit is not None:
+                        teacher_lecture_limits[teacher_name] = teacher_data.lecture_limit
             else:
 
                 if teacher_name not in teacher_availability:
@@ -1315,17 +2056,12 @@ def get_all_teacher_preferences():
     db = SessionLocal()
     try:
         all_teachers = data["teachers"]
+        teacher_rows = load_teacher_data(db, all_teachers)
         preferences = {}
         for teacher in all_teachers:
-            teacher_data = db.query(TeacherData).filter(TeacherData.id == teacher).first()
+            teacher_data = teacher_rows.get(teacher)
             if teacher_data:
-                preferences[teacher] = {
-                    "earliest_time": teacher_data.earliest_time,
-                    "latest_time": teacher_data.latest_time,
-                    "preferred_days": teacher_data.preferred_days or [],
-                    "preferred_slots": teacher_data.preferred_slots or [],
-                    "unavailable_days": teacher_data.unavailable_days or []
-                }
+                preferences[teacher] = teacher_preferences_dict(teacher_data)
             else:
                 preferences[teacher] = {
                     "earliest_time": None,
@@ -1362,11 +2098,14 @@ def update_teacher_preferences(preferences: TeacherPreferences):
         db.commit()
 
 
-        timetable, start_date = store_timetable()
+        timetable, repair = repair_stored_timetable(preferences.teacher_id)
+        if timetable is None:
+            timetable, start_date = store_timetable()
 
         return {
             "message": f"Updated preferences for {preferences.teacher_id}",
-            "timetable": timetable
+            "timetable": timetable,
+            "repair": repair
         }
     except Exception as e:
         db.rollback()
@@ -1375,41 +2114,43 @@ def update_teacher_preferences(preferences: TeacherPreferences):
         db.close()
 
 
+_room_analytics_cache = {}
+
+def latest_timetable_entry(db):
+    """Most recently starting stored timetable with its document deferred, or None"""
+    return db.query(Timetable).options(defer(Timetable.data)).order_by(Timetable.start_date.desc()).first()
+
+def get_room_analytics(db, timetable_entry):
+    """Room usage, schedules and conflicts for a stored timetable, computed once per revision.
+
+    The entry's document is only loaded on a cache miss.
+    """
+    key = (timetable_entry.date, latest_revision(db, timetable_entry.date))
+    metrics.cache_lookup("room_analytics", key in _room_analytics_cache)
+    if key not in _room_analytics_cache:
+        _room_analytics_cache.clear()
+        compact = load_timetable(timetable_entry.data, data["time_slots"])
+        _room_analytics_cache[key] = analyze_rooms(compact)
+    return _room_analytics_cache[key]
+
 @app.get("/room_utilization")
 def get_room_utilization():
     """Get utilization report for all classrooms"""
     db = SessionLocal()
     try:
 
-        latest_timetable_entry = db.query(Timetable).order_by(Timetable.date.desc()).first()
-        if not latest_timetable_entry:
+        entry = latest_timetable_entry(db)
+        if not entry:
             return {"error": "No timetable found"}
 
-        timetable = json.loads(latest_timetable_entry.data)
+        analytics = get_room_analytics(db, entry)
         classrooms = db.query(Classroom).filter(Classroom.is_active == True).all()
 
         utilization = {}
         total_slots = 48
 
         for classroom in classrooms:
-            used_slots = 0
-            room_schedule = {}
-
-
-            for section, days_data in timetable.items():
-                for day, slots in days_data.items():
-                    for time_slot, content in slots.items():
-                        if content.get("room") == classroom.room_number:
-                            used_slots += 1
-                            if day not in room_schedule:
-                                room_schedule[day] = []
-                            room_schedule[day].append({
-                                "time_slot": time_slot,
-                                "section": section,
-                                "subject": content.get("subject"),
-                                "teacher": content.get("teacher")
-                            })
-
+            used_slots = analytics["used_slots"].get(classroom.room_number, 0)
             utilization[classroom.room_number] = {
                 "room_type": classroom.room_type,
                 "capacity": classroom.capacity,
@@ -1418,7 +2159,7 @@ def get_room_utilization():
                 "used_slots": used_slots,
                 "total_slots": total_slots,
                 "utilization_percentage": round((used_slots / total_slots) * 100, 2),
-                "schedule": room_schedule
+                "schedule": analytics["schedules"].get(classroom.room_number, {})
             }
 
         return utilization
@@ -1430,42 +2171,11 @@ def get_room_conflicts():
     """Detect and return room conflicts in the current timetable"""
     db = SessionLocal()
     try:
-        latest_timetable_entry = db.query(Timetable).order_by(Timetable.date.desc()).first()
-        if not latest_timetable_entry:
+        entry = latest_timetable_entry(db)
+        if not entry:
             return {"conflicts": []}
 
-        timetable = json.loads(latest_timetable_entry.data)
-        conflicts = []
-
-
-        room_assignments = {}
-
-        for section, days_data in timetable.items():
-            for day, slots in days_data.items():
-                for time_slot, content in slots.items():
-                    room = content.get("room")
-                    if room:
-                        key = f"{day}_{time_slot}_{room}"
-                        if key not in room_assignments:
-                            room_assignments[key] = []
-                        room_assignments[key].append({
-                            "section": section,
-                            "subject": content.get("subject"),
-                            "teacher": content.get("teacher")
-                        })
-
-
-        for key, assignments in room_assignments.items():
-            if len(assignments) > 1:
-                parts = key.split("_")
-                conflicts.append({
-                    "day": parts[0],
-                    "time_slot": parts[1],
-                    "room": parts[2],
-                    "conflicting_classes": assignments
-                })
-
-        return {"conflicts": conflicts}
+        return {"conflicts": get_room_analytics(db, entry)["conflicts"]}
     finally:
         db.close()
 
@@ -1668,6 +2378,80 @@ def delete_subject(subject_id: str):
     finally:
         db.close()
 
+def import_bulk_rows(entity, stream, fmt):
+    """Run one bulk import in a single transaction, then refresh the teacher caches once"""
+    flush_persisted_data()
+    db = SessionLocal()
+    try:
+        summary = bulk_io.import_rows(db, entity, stream, fmt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    applied = summary.pop("applied", [])
+    if entity == "teachers":
+        refresh_teacher_cache()
+        for row in applied:
+            if row.availability is not None:
+                teacher_availability[row.name] = row.availability
+            for semesters in row.course_subjects.values():
+                for subjects in semesters.values():
+                    for subject in subjects:
+                        if row.name not in subject_teacher_mapping.setdefault(subject, []):
+                            subject_teacher_mapping[subject].append(row.name)
+    elif entity == "assignments":
+        for row in applied:
+            if row.sections:
+                teacher_subject_sections.setdefault(row.teacher, {})[row.subject] = row.sections
+                if row.teacher not in subject_teacher_mapping.setdefault(row.subject, []):
+                    subject_teacher_mapping[row.subject].append(row.teacher)
+            else:
+                teacher_subject_sections.get(row.teacher, {}).pop(row.subject, None)
+                if row.teacher in subject_teacher_mapping.get(row.subject, []):
+                    subject_teacher_mapping[row.subject].remove(row.teacher)
+    print(f"Bulk imported {summary['rows']} {entity}: {summary['inserted']} inserted, {summary['updated']} updated")
+    return summary
+
+def check_bulk_request(entity, format):
+    if entity not in bulk_io.ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown entity '{entity}'. Use one of: {', '.join(bulk_io.ENTITIES)}")
+    if format not in bulk_io.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Use csv or json")
+
+@app.post("/bulk/{entity}")
+async def bulk_import(entity: str, request: Request, format: str = "csv"):
+    """Validate and upsert CSV or JSON rows of teachers, subjects, sections or assignments in one transaction"""
+    check_bulk_request(entity, format)
+    stream = await bulk_io.spool_body(request)
+    try:
+        return await run_in_threadpool(import_bulk_rows, entity, stream, format)
+    except bulk_io.BulkImportError as e:
+        raise HTTPException(status_code=400, detail={"message": f"Import rejected: {e}", "errors": e.errors})
+    finally:
+        stream.close()
+
+@app.get("/bulk/{entity}")
+def bulk_export(entity: str, format: str = "csv"):
+    """Stream every row of an entity as CSV or NDJSON, in the shape the import accepts"""
+    check_bulk_request(entity, format)
+
+    def rows():
+        flush_persisted_data()
+        db = SessionLocal()
+        try:
+            yield from bulk_io.render_records(entity, bulk_io.export_records(db, entity), format)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        rows(),
+        media_type=bulk_io.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{"csv" if format == "csv" else "ndjson"}"'}
+    )
+
 @app.get("/batches/{batch_id}/elective-groups")
 def get_batch_elective_groups(batch_id: str):
     """Get all elective groups for a batch"""
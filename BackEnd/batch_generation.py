@@ -0,0 +1,181 @@
+"""
+Institute-wide timetable generation.
+
+Every active (course, semester) combination is generated in parallel on the
+generation process pool from one shared snapshot of the scheduling inputs.
+The per-course results are then merged, and teacher or room double bookings
+across courses are resolved at merge time. The merged timetable is stored in
+its own institute_timetables table, so it never replaces the per-course week
+served by /timetable/{date}.
+"""
+import random
+import time
+
+from ai_timetable_model import data as model_data, is_lab_subject
+
+PLACEHOLDER_TEACHERS = ("respective teacher", "Elective Faculty")
+
+
+def batch_section_key(course, semester, section):
+    return f"{course}-S{semester}-{section}"
+
+
+def generate_course_timetable(course, semester, start_date, snapshot, seed=None, engine="greedy", deadline=None):
+    """Process pool entry point: generate one (course, semester) from a snapshot.
+
+    Returns a None timetable without generating when the wall-clock deadline
+    has already passed (a search restart that started too late).
+    """
+    if deadline is not None and time.time() >= deadline:
+        return course, semester, None
+    import backend_api
+    import ai_timetable_model
+
+    backend_api.restore_generation_state(snapshot["state"])
+    ai_timetable_model.subject_teacher_mapping = snapshot["subject_teacher_mapping"]
+    if seed is not None:
+        random.seed(seed)
+
+    state = snapshot["state"]
+    subjects, sections = backend_api.snapshot_course_inputs(snapshot, course, semester)
+    timetable = ai_timetable_model.get_scheduler(engine)(
+        start_date,
+        state["teacher_subject_sections"],
+        state["teacher_sections_taught"],
+        state["teacher_lecture_limits"],
+        state["teacher_availability"],
+        snapshot["teacher_preferences"],
+        snapshot["classrooms"],
+        course,
+        semester,
+        subject_dependencies=snapshot["subject_dependencies"],
+        elective_groups_data=snapshot["elective_groups_data"],
+        subjects=subjects,
+        sections=sections
+    )
+    return course, semester, timetable
+
+
+def lecture_blocks(slots, time_slots):
+    """Group one section-day's cells into units that must be kept or dropped together.
+
+    A run of consecutive slots holding the same lab subject and teacher is one
+    block (a 2-hour lab); every other cell is a block of its own.
+    """
+    ordered = sorted(slots, key=lambda ts: time_slots.index(ts) if ts in time_slots else len(time_slots))
+    blocks = []
+    for time_slot in ordered:
+        content = slots[time_slot]
+        subject = content.get("subject")
+        if blocks and subject and is_lab_subject(subject):
+            previous_slot = blocks[-1][-1]
+            previous = slots[previous_slot]
+            adjacent = (
+                previous_slot in time_slots and time_slot in time_slots
+                and time_slots.index(time_slot) == time_slots.index(previous_slot) + 1
+            )
+            if adjacent and previous.get("subject") == subject and previous.get("teacher") == content.get("teacher"):
+                blocks[-1].append(time_slot)
+                continue
+        blocks.append([time_slot])
+    return blocks
+
+
+def merge_course_timetables(results, classrooms, time_slots=None):
+    """Merge per-course timetables, enforcing teacher and room exclusivity across courses.
+
+    results is a list of (course, semester, timetable). Earlier entries win a
+    clash. A later lecture whose teacher is already busy is dropped; a later
+    lecture whose room is taken is moved to a free room of the same type, or
+    left without a room if none is free. Both hours of a lab block are dropped
+    or moved together.
+    """
+    time_slots = list(time_slots or model_data["time_slots"])
+    room_types = {room["room_number"]: room["room_type"] for room in classrooms}
+    rooms_by_type = {}
+    for room in classrooms:
+        rooms_by_type.setdefault(room["room_type"], []).append(room["room_number"])
+
+    teacher_owner = {}
+    room_owner = {}
+    merged = {}
+    teacher_conflicts = []
+    room_conflicts = []
+
+    for course, semester, timetable in results:
+        owner = (course, semester)
+        for section, days in timetable.items():
+            key = batch_section_key(course, semester, section)
+            merged[key] = {}
+            for day, slots in days.items():
+                merged[key][day] = {}
+                for block in lecture_blocks(slots, time_slots):
+                    contents = [dict(slots[time_slot]) for time_slot in block]
+
+                    teacher = contents[0].get("teacher")
+                    if teacher and teacher not in PLACEHOLDER_TEACHERS:
+                        holders = [teacher_owner.get((teacher, day, time_slot)) for time_slot in block]
+                        clashes = [holder for holder in holders if holder is not None and holder[0] != owner]
+                        if clashes:
+                            for time_slot, content in zip(block, contents):
+                                teacher_conflicts.append({
+                                    "section": key,
+                                    "day": day,
+                                    "time_slot": time_slot,
+                                    "subject": content.get("subject"),
+                                    "teacher": teacher,
+                                    "booked_by": clashes[0][1]
+                                })
+                            continue
+                        for time_slot in block:
+                            teacher_owner[(teacher, day, time_slot)] = (owner, key)
+
+                    room = contents[0].get("room")
+                    if room in room_types:
+                        holders = [room_owner.get((room, day, time_slot)) for time_slot in block]
+                        clashes = [holder for holder in holders if holder is not None and holder[0] != owner]
+                        if clashes:
+                            replacement = next(
+                                (
+                                    r for r in rooms_by_type[room_types[room]]
+                                    if all((r, day, time_slot) not in room_owner for time_slot in block)
+                                ),
+                                None
+                            )
+                            for time_slot in block:
+                                room_conflicts.append({
+                                    "section": key,
+                                    "day": day,
+                                    "time_slot": time_slot,
+                                    "room": room,
+                                    "booked_by": clashes[0][1],
+                                    "reassigned_to": replacement
+                                })
+                            for content in contents:
+                                content["room"] = replacement
+                            room = replacement
+                        if room is not None:
+                            for time_slot in block:
+                                room_owner[(room, day, time_slot)] = (owner, key)
+
+                    for time_slot, content in zip(block, contents):
+                        merged[key][day][time_slot] = content
+
+    return merged, {"teacher_conflicts": teacher_conflicts, "room_conflicts": room_conflicts}
+
+
+def generate_institute_timetables(start_date, combinations, snapshot, job_manager, seed=None, engine="greedy"):
+    """Generate all combinations with one engine on the job manager's pool and merge them"""
+    courses = [course for course, _ in combinations]
+    semesters = [semester for _, semester in combinations]
+    seeds = [None if seed is None else seed + i for i in range(len(combinations))]
+    results = list(job_manager.map(
+        generate_course_timetable,
+        courses,
+        semesters,
+        [start_date] * len(combinations),
+        [snapshot] * len(combinations),
+        seeds,
+        [engine] * len(combinations)
+    ))
+    return merge_course_timetables(results, snapshot["classrooms"])
@@ -0,0 +1,295 @@
+"""
+Generation benchmark on synthetic institutes.
+
+Builds an institute of configurable size (sections, subjects, teachers, rooms,
+elective groups and dependencies) in a temporary SQLite database, runs
+timetable generation once per seed and reports wall time, peak memory, fill
+rate, constraint violations and per-phase timings as JSON, so scheduler
+changes can be compared.
+
+    python benchmark_generation.py --sections 12 --seeds 1 2 3 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+START_DATE = "2025-01-06"
+COURSE = "BTech"
+BATCH_TYPE = "B.Tech"
+SEMESTER = 4
+
+PLACEHOLDERS = ("respective teacher", "Elective Faculty")
+
+
+def section_letters(count):
+    return [chr(65 + i % 26) + ("" if i < 26 else str(i // 26)) for i in range(count)]
+
+
+def build_institute(api, sections=12, subjects=5, labs=2, teachers_per_subject=None, rooms=None, lab_rooms=None,
+                    elective_groups=1, dependencies=2, constrained_share=0.2, seed=0):
+    """Populate the (empty) backend database with a synthetic institute and return its shape"""
+    rng = random.Random(seed)
+    letters = section_letters(sections)
+    teachers_per_subject = teachers_per_subject or max(2, (sections + 2) // 3)
+    rooms = rooms or sections
+    lab_rooms = lab_rooms or max(1, sections // 2)
+
+    subject_codes = [f"TCS-{401 + i}" for i in range(subjects)] + [f"PCS-{401 + i}" for i in range(labs)]
+
+    db = api.SessionLocal()
+    try:
+        db.add(api.Batch(id="bench", name="Benchmark", batch_type=BATCH_TYPE, course="CSE", semester=SEMESTER, is_active=True))
+        for letter in letters:
+            db.add(api.Section(id=f"bench-{letter}", batch_id="bench", section_letter=letter, student_count=60))
+        for code in subject_codes:
+            db.add(api.Subject(id=code, batch_id="bench", code=code, name=code, subject_type="core", is_active=True))
+
+        for i in range(rooms):
+            db.add(api.Classroom(id=f"room-{i}", room_number=f"CR{i + 1}", capacity=60, room_type="lecture", subjects=[], is_active=True))
+        for i in range(lab_rooms):
+            db.add(api.Classroom(id=f"lab-{i}", room_number=f"LAB{i + 1}", capacity=60, room_type="lab", subjects=[], is_active=True))
+
+        for g in range(elective_groups):
+            db.add(api.ElectiveGroup(id=f"EG{g + 1}", batch_id="bench", name=f"Elective Group {g + 1}"))
+            for k in range(2):
+                db.add(api.ElectiveEnrollment(
+                    id=f"EG{g + 1}-{k}", elective_group_id=f"EG{g + 1}",
+                    subject_code=f"ECS-{g + 1}{k}", enrolled_students=rng.randint(30, 90)
+                ))
+
+        theory = [code for code in subject_codes if code.startswith("TCS")]
+        for d in range(min(dependencies, max(0, len(theory) - 1))):
+            first, second = rng.sample(theory, 2)
+            db.add(api.SubjectDependency(
+                id=f"dep-{d}", subject_code=first, dependent_subject_code=second,
+                dependency_type="prerequisite", priority=1, gap_days=0, same_day=False, is_active=True
+            ))
+
+        teacher_rows = []
+        per_teacher = max(1, -(-sections // teachers_per_subject))
+        for code in subject_codes:
+            for k in range(teachers_per_subject):
+                name = f"{code}-T{k + 1}"
+                db.add(api.Teacher(id=name, name=name, is_active=True, courses=[COURSE], course_subjects={COURSE: [code]}))
+                row = api.default_teacher_data(name)
+                row["subject_sections"] = {code: letters[k * per_teacher:(k + 1) * per_teacher] or letters[:per_teacher]}
+                if rng.random() < constrained_share:
+                    if rng.random() < 0.5:
+                        row["unavailable_days"] = [rng.choice(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"])]
+                    else:
+                        row["latest_time"] = "15:00"
+                teacher_rows.append(row)
+        db.commit()
+        api.write_teacher_data(db, teacher_rows)
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "sections": sections,
+        "subjects": len(subject_codes),
+        "labs": labs,
+        "teachers": len(teacher_rows),
+        "rooms": rooms,
+        "lab_rooms": lab_rooms,
+        "elective_groups": elective_groups,
+        "dependencies": dependencies,
+        "constrained_share": constrained_share
+    }
+
+
+def count_violations(timetable, teacher_availability, teacher_preferences):
+    """Hard-constraint violations in a generated timetable, by kind"""
+    from ai_timetable_model import is_teacher_available_at_slot
+
+    violations = {"teacher_clash": 0, "room_clash": 0, "unavailable_teacher": 0, "preference": 0, "daily_limit": 0, "weekly_limit": 0}
+    teacher_slots = {}
+    room_slots = {}
+    daily = {}
+    for section, days in timetable.items():
+        for day, slots in days.items():
+            for time_slot, content in slots.items():
+                teacher = content.get("teacher")
+                room = content.get("room")
+                if isinstance(room, str) and "elective_subjects" not in content:
+                    room_slots.setdefault((room, day, time_slot), []).append(section)
+                if not teacher or teacher in PLACEHOLDERS:
+                    continue
+                teacher_slots.setdefault((teacher, day, time_slot), []).append(section)
+                daily[(teacher, day)] = daily.get((teacher, day), 0) + 1
+                if not teacher_availability.get(teacher, True):
+                    violations["unavailable_teacher"] += 1
+                if not is_teacher_available_at_slot(teacher, day, time_slot, teacher_preferences):
+                    violations["preference"] += 1
+
+    violations["teacher_clash"] = sum(len(s) - 1 for s in teacher_slots.values() if len(s) > 1)
+    violations["room_clash"] = sum(len(s) - 1 for s in room_slots.values() if len(s) > 1)
+    violations["daily_limit"] = sum(1 for count in daily.values() if count > 5)
+    weekly = {}
+    for (teacher, _), count in daily.items():
+        weekly[teacher] = weekly.get(teacher, 0) + count
+    violations["weekly_limit"] = sum(1 for count in weekly.values() if count > 15)
+    return violations
+
+
+def fill_stats(timetable, time_slots):
+    """Filled teaching cells against the teaching cells available (lunch excluded)"""
+    from ai_timetable_model import LUNCH_SLOT
+    teaching_slots = [ts for ts in time_slots if ts != LUNCH_SLOT]
+    capacity = 0
+    filled = 0
+    empty_placeholders = 0
+    for days in timetable.values():
+        for slots in days.values():
+            capacity += len(teaching_slots)
+            for time_slot, content in slots.items():
+                if time_slot == LUNCH_SLOT or content.get("subject") == "Lunch":
+                    continue
+                filled += 1
+                if content.get("teacher") == "respective teacher":
+                    empty_placeholders += 1
+    return {
+        "filled": filled,
+        "capacity": capacity,
+        "fill_rate": round(filled / capacity, 4) if capacity else 0.0,
+        "unstaffed": empty_placeholders
+    }
+
+
+def run_once(api, seed, engine="greedy", trace_memory=True):
+    """Generate one timetable with a fixed seed and measure it"""
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        timetable, _ = api.store_timetable(START_DATE, COURSE, SEMESTER, engine=engine)
+        wall_time = time.perf_counter() - started
+    profile = api.generation_profiles[START_DATE]
+
+    peak_memory_kb = None
+    if trace_memory:
+        random.seed(seed)
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                api.store_timetable(START_DATE, COURSE, SEMESTER, engine=engine)
+            peak_memory_kb = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+
+    db = api.SessionLocal()
+    try:
+        preferences = api.load_teacher_preferences(db)
+    finally:
+        db.close()
+
+    return {
+        "seed": seed,
+        "engine": engine,
+        "wall_time": round(wall_time, 4),
+        "peak_memory_kb": peak_memory_kb,
+        **fill_stats(timetable, api.data["time_slots"]),
+        "violations": count_violations(timetable, api.teacher_availability, preferences),
+        "phases": profile["phases"],
+        "rejections": profile["rejections"]
+    }
+
+
+def summarize(runs):
+    times = [run["wall_time"] for run in runs]
+    fill_rates = [run["fill_rate"] for run in runs]
+    memory = [run["peak_memory_kb"] for run in runs if run["peak_memory_kb"] is not None]
+    return {
+        "runs": len(runs),
+        "wall_time_median": round(statistics.median(times), 4),
+        "wall_time_min": min(times),
+        "wall_time_max": max(times),
+        "fill_rate_mean": round(statistics.mean(fill_rates), 4),
+        "fill_rate_min": min(fill_rates),
+        "peak_memory_kb_max": max(memory) if memory else None,
+        "violations_total": sum(sum(run["violations"].values()) for run in runs)
+    }
+
+
+def run_benchmark(seeds, engine="greedy", trace_memory=True, **institute):
+    """Build a synthetic institute in a temporary directory and benchmark every seed against it"""
+    if "backend_api" in sys.modules:
+        raise RuntimeError("backend_api is already imported against its own database; run the benchmark in a fresh process")
+    workdir = tempfile.mkdtemp(prefix="timetable-bench-")
+    previous_dir = os.getcwd()
+    previous_url = os.environ.get("DATABASE_URL")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    # backend_api opens DATABASE_URL at import; point it at the scratch database, never the shell's
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "database.db")
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import backend_api as api
+            shape = build_institute(api, seed=seeds[0] if seeds else 0, **institute)
+            api.load_persisted_data()
+
+        runs = []
+        for seed in seeds:
+            run = run_once(api, seed, engine, trace_memory)
+            print(json.dumps(run), flush=True)
+            runs.append(run)
+        return {"institute": shape, "engine": engine, "runs": runs, "summary": summarize(runs)}
+    finally:
+        os.chdir(previous_dir)
+        if previous_url is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = previous_url
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark timetable generation on a synthetic institute")
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--subjects", type=int, default=5, help="theory subjects")
+    parser.add_argument("--labs", type=int, default=2, help="lab subjects")
+    parser.add_argument("--teachers-per-subject", type=int, default=None)
+    parser.add_argument("--rooms", type=int, default=None, help="lecture rooms (default: one per section)")
+    parser.add_argument("--lab-rooms", type=int, default=None)
+    parser.add_argument("--elective-groups", type=int, default=1)
+    parser.add_argument("--dependencies", type=int, default=2)
+    parser.add_argument("--constrained-share", type=float, default=0.2, help="share of teachers with day/time restrictions")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--engine", default="greedy")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="write the full report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.seeds,
+        engine=args.engine,
+        trace_memory=not args.no_memory,
+        sections=args.sections,
+        subjects=args.subjects,
+        labs=args.labs,
+        teachers_per_subject=args.teachers_per_subject,
+        rooms=args.rooms,
+        lab_rooms=args.lab_rooms,
+        elective_groups=args.elective_groups,
+        dependencies=args.dependencies,
+        constrained_share=args.constrained_share
+    )
+    print(json.dumps({"institute": report["institute"], "summary": report["summary"]}))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
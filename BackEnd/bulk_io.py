@@ -0,0 +1,428 @@
+"""
+Bulk import and export of teachers, subjects, sections and teacher assignments.
+
+Imports read CSV or JSON (an array, or one object per line) from the request
+body, spooled to disk rather than held in memory; JSON arrays are decoded one
+element at a time from READ_CHUNK-sized reads. Every row is validated,
+existing rows are preloaded with chunked IN queries, and the upsert runs as
+bulk statements in the caller's transaction. Nothing is written when any row
+is invalid. Exports stream rows in the same shapes, so an export can be
+edited and imported back.
+
+CSV list columns (courses, sections) are separated by ';' and course_subjects
+is a JSON object. Within one import the last row for a key wins.
+"""
+import csv
+import io
+import itertools
+import json
+import tempfile
+import uuid
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+FORMATS = ("csv", "json")
+MEDIA_TYPES = {"csv": "text/csv", "json": "application/x-ndjson"}
+LIST_SEPARATOR = ";"
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+EXPORT_BATCH = 500
+MAX_REPORTED_ERRORS = 100
+
+
+class TeacherRow(BaseModel):
+    name: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    courses: List[str] = []
+    course_subjects: Dict[str, Dict[str, List[str]]] = {}
+    is_active: bool = True
+    availability: Optional[bool] = None
+    lecture_limit: Optional[int] = None
+
+
+class SectionRow(BaseModel):
+    batch_id: str
+    section_letter: str
+    student_count: int = 0
+
+
+class SubjectRow(BaseModel):
+    batch_id: Optional[str] = None
+    section_id: Optional[str] = None
+    code: str
+    name: str
+    subject_type: str
+    elective_group_id: Optional[str] = None
+    hours_per_week: int = 2
+    cognitive_difficulty: int = 5
+    is_active: bool = True
+
+
+class AssignmentRow(BaseModel):
+    teacher: str
+    subject: str
+    sections: List[str] = []
+
+
+ENTITIES = {
+    "teachers": {"row": TeacherRow, "lists": ("courses",), "objects": ("course_subjects",)},
+    "sections": {"row": SectionRow, "lists": (), "objects": ()},
+    "subjects": {"row": SubjectRow, "lists": (), "objects": ()},
+    "assignments": {"row": AssignmentRow, "lists": ("sections",), "objects": ()},
+}
+
+TEACHER_COLUMNS = {"name", "email", "phone", "courses", "course_subjects", "is_active"}
+SUBJECT_COLUMNS = set(SubjectRow.model_fields) - {"batch_id", "section_id", "code"}
+
+
+class BulkImportError(ValueError):
+    """Raised with per-row errors when an import is rejected"""
+
+    def __init__(self, errors):
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+        super().__init__(f"{len(errors)} invalid rows")
+
+
+def columns(entity):
+    return list(ENTITIES[entity]["row"].model_fields)
+
+
+async def spool_body(request):
+    """Copy the request body to a spooled temporary file as it arrives"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def iter_records(stream, fmt):
+    """Raw dicts from a binary CSV or JSON stream"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for record in csv.DictReader(text):
+            yield {key.strip(): value for key, value in record.items() if key and value not in (None, "")}
+        return
+
+    head = text.read(1)
+    while head and head.isspace():
+        head = text.read(1)
+    if head == "[":
+        yield from iter_json_array(text)
+    elif head:
+        for line in itertools.chain([head + text.readline()], text):
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_json_array(text, chunk_size=READ_CHUNK):
+    """Elements of a JSON array whose opening '[' was already read, decoded one at a time.
+
+    Only the element being decoded and the current chunk are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+
+    def more():
+        nonlocal buffer, pos
+        chunk = text.read(chunk_size)
+        buffer, pos = buffer[pos:] + chunk, 0
+        return bool(chunk)
+
+    def next_char():
+        """Skip whitespace; the next character, or '' at the end of the stream"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not more():
+                return ""
+
+    separator = "]" if next_char() == "]" else ","
+    if separator == "]":
+        pos += 1
+    while separator == ",":
+        if not next_char():
+            raise ValueError("unterminated JSON array")
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # an element is always followed by ',' or ']', so one ending the buffer may continue in the next chunk
+                if end < len(buffer):
+                    break
+            except json.JSONDecodeError:
+                pass
+            if not more():
+                decoder.raw_decode(buffer, pos)
+                raise ValueError("unterminated JSON array")
+        yield value
+        pos = end
+        separator = next_char()
+        pos += 1
+        if separator not in (",", "]"):
+            raise ValueError(f"expected ',' or ']' in JSON array, found {separator or 'end of input'!r}")
+
+    if next_char():
+        raise ValueError("unexpected data after the JSON array")
+
+
+def _from_csv(entity, record):
+    spec = ENTITIES[entity]
+    for field in spec["lists"]:
+        if isinstance(record.get(field), str):
+            record[field] = [item.strip() for item in record[field].split(LIST_SEPARATOR) if item.strip()]
+    for field in spec["objects"]:
+        if isinstance(record.get(field), str):
+            record[field] = json.loads(record[field])
+    return record
+
+
+def validate_records(entity, records, fmt):
+    """[(row number, row model)] for every record; raises BulkImportError listing the invalid ones"""
+    row_model = ENTITIES[entity]["row"]
+    rows = []
+    errors = []
+    try:
+        for number, record in enumerate(records, start=1):
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("expected an object")
+                rows.append((number, row_model.model_validate(_from_csv(entity, record) if fmt == "csv" else record)))
+            except ValidationError as e:
+                errors.append({"row": number, "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())})
+            except ValueError as e:
+                errors.append({"row": number, "error": str(e)})
+    except (ValueError, csv.Error) as e:
+        errors.append({"row": len(rows) + len(errors) + 1, "error": f"Could not parse {fmt}: {e}"})
+    if errors:
+        raise BulkImportError(errors)
+    return rows
+
+
+def _existing(db, model, column, values):
+    """Rows of model whose column is in values, fetched in chunked IN queries"""
+    from backend_api import TEACHER_DATA_BATCH
+    values = list(values)
+    found = []
+    for start in range(0, len(values), TEACHER_DATA_BATCH):
+        found.extend(db.query(model).filter(column.in_(values[start:start + TEACHER_DATA_BATCH])).all())
+    return found
+
+
+def _changed(current, values):
+    return {key: value for key, value in values.items() if getattr(current, key) != value}
+
+
+def _record_changes(db, teachers=()):
+    """Bulk statements bypass the session flush hook, so bump the revision and feed here"""
+    from backend_api import increment_scheduling_revision, record_event, TEACHER_CHANGED
+    increment_scheduling_revision(db.connection())
+    if teachers:
+        record_event(db.connection(), TEACHER_CHANGED, {"teachers": sorted(teachers)})
+
+
+def import_teachers(db, rows):
+    from backend_api import Teacher, default_teacher_data, load_teacher_data, write_teacher_data
+    rows = {row.name: row for _, row in rows}
+    existing = {teacher.name: teacher for teacher in _existing(db, Teacher, Teacher.name, rows)}
+
+    inserts = []
+    updates = []
+    changed = []
+    for name, row in rows.items():
+        current = existing.get(name)
+        if current is None:
+            inserts.append({"id": str(uuid.uuid4()), **row.model_dump(include=TEACHER_COLUMNS)})
+        else:
+            changes = _changed(current, row.model_dump(include=TEACHER_COLUMNS, exclude_unset=True))
+            if not changes:
+                continue
+            updates.append({"id": current.id, **changes})
+        changed.append(name)
+    if inserts:
+        db.bulk_insert_mappings(Teacher, inserts)
+    if updates:
+        db.bulk_update_mappings(Teacher, updates)
+    if changed:
+        _record_changes(db, changed)
+
+    teacher_rows = load_teacher_data(db, rows)
+    data_rows = []
+    for name, row in rows.items():
+        settings = row.model_dump(include={"availability", "lecture_limit"}, exclude_none=True)
+        if name not in teacher_rows:
+            data_rows.append({**default_teacher_data(name), **settings})
+        elif settings:
+            data_rows.append({"id": name, **settings})
+    write_teacher_data(db, data_rows)
+    return {"inserted": len(inserts), "updated": len(updates), "unchanged": len(rows) - len(inserts) - len(updates), "applied": list(rows.values())}
+
+
+def import_sections(db, rows):
+    from backend_api import Batch, Section
+    batch_ids = {row.batch_id for _, row in rows}
+    known_batches = {batch.id for batch in _existing(db, Batch, Batch.id, batch_ids)}
+    errors = [{"row": number, "error": f"batch_id: unknown batch '{row.batch_id}'"} for number, row in rows if row.batch_id not in known_batches]
+    if errors:
+        raise BulkImportError(errors)
+
+    existing = {(section.batch_id, section.section_letter): section for section in _existing(db, Section, Section.batch_id, batch_ids)}
+    rows = {(row.batch_id, row.section_letter): row for _, row in rows}
+    inserts = []
+    updates = []
+    for key, row in rows.items():
+        current = existing.get(key)
+        if current is None:
+            inserts.append({"id": str(uuid.uuid4()), **row.model_dump()})
+        elif current.student_count != row.student_count:
+            updates.append({"id": current.id, "student_count": row.student_count})
+    if inserts:
+        db.bulk_insert_mappings(Section, inserts)
+    if updates:
+        db.bulk_update_mappings(Section, updates)
+    if inserts or updates:
+        _record_changes(db)
+    return {"inserted": len(inserts), "updated": len(updates), "unchanged": len(rows) - len(inserts) - len(updates)}
+
+
+def import_subjects(db, rows):
+    from backend_api import Batch, Subject
+    batch_ids = {row.batch_id for _, row in rows if row.batch_id}
+    known_batches = {batch.id for batch in _existing(db, Batch, Batch.id, batch_ids)}
+    errors = [{"row": number, "error": f"batch_id: unknown batch '{row.batch_id}'"} for number, row in rows if row.batch_id and row.batch_id not in known_batches]
+    if errors:
+        raise BulkImportError(errors)
+
+    rows = {(row.batch_id, row.section_id, row.code): row for _, row in rows}
+    existing = {
+        (subject.batch_id, subject.section_id, subject.code): subject
+        for subject in _existing(db, Subject, Subject.code, {code for _, _, code in rows})
+    }
+    inserts = []
+    updates = []
+    for key, row in rows.items():
+        current = existing.get(key)
+        if current is None:
+            inserts.append({"id": str(uuid.uuid4()), **row.model_dump()})
+            continue
+        changes = _changed(current, row.model_dump(include=SUBJECT_COLUMNS, exclude_unset=True))
+        if changes:
+            updates.append({"id": current.id, **changes})
+    if inserts:
+        db.bulk_insert_mappings(Subject, inserts)
+    if updates:
+        db.bulk_update_mappings(Subject, updates)
+    if inserts or updates:
+        _record_changes(db)
+    return {"inserted": len(inserts), "updated": len(updates), "unchanged": len(rows) - len(inserts) - len(updates)}
+
+
+def import_assignments(db, rows):
+    """Set (or with no sections, remove) each teacher's sections for a subject"""
+    from backend_api import Teacher, default_teacher_data, load_teacher_data, write_teacher_data
+    teachers = {row.teacher for _, row in rows}
+    known = {teacher.name for teacher in _existing(db, Teacher, Teacher.name, teachers) if teacher.is_active}
+    errors = [{"row": number, "error": f"teacher: unknown or inactive teacher '{row.teacher}'"} for number, row in rows if row.teacher not in known]
+    if errors:
+        raise BulkImportError(errors)
+
+    teacher_rows = load_teacher_data(db, teachers)
+    subject_sections = {
+        teacher: dict(teacher_rows[teacher].subject_sections or {}) if teacher in teacher_rows else {}
+        for teacher in teachers
+    }
+    for _, row in rows:
+        if row.sections:
+            subject_sections[row.teacher][row.subject] = row.sections
+        else:
+            subject_sections[row.teacher].pop(row.subject, None)
+
+    inserted, updated = write_teacher_data(db, [
+        {**default_teacher_data(teacher), "subject_sections": sections} if teacher not in teacher_rows
+        else {"id": teacher, "subject_sections": sections}
+        for teacher, sections in subject_sections.items()
+    ])
+    return {"inserted": inserted, "updated": updated, "unchanged": len(teachers) - inserted - updated, "applied": [row for _, row in rows]}
+
+
+IMPORTERS = {
+    "teachers": import_teachers,
+    "sections": import_sections,
+    "subjects": import_subjects,
+    "assignments": import_assignments,
+}
+
+
+def import_rows(db, entity, stream, fmt):
+    """Validate and upsert every row of stream in db's transaction; the caller commits.
+
+    For teachers and assignments the summary's "applied" list holds the row
+    models so the caller can update its in-memory caches.
+    """
+    rows = validate_records(entity, iter_records(stream, fmt), fmt)
+    summary = IMPORTERS[entity](db, rows) if rows else {"inserted": 0, "updated": 0, "unchanged": 0}
+    return {"entity": entity, "rows": len(rows), **summary}
+
+
+def export_records(db, entity):
+    """Dicts in the import shape, read in batches of EXPORT_BATCH"""
+    from backend_api import Teacher, TeacherData, Section, Subject
+    if entity == "teachers":
+        query = db.query(Teacher, TeacherData).outerjoin(TeacherData, TeacherData.id == Teacher.name).order_by(Teacher.name)
+        for teacher, teacher_data in query.yield_per(EXPORT_BATCH):
+            yield {
+                "name": teacher.name,
+                "email": teacher.email,
+                "phone": teacher.phone,
+                "courses": teacher.courses or [],
+                "course_subjects": teacher.course_subjects or {},
+                "is_active": teacher.is_active,
+                "availability": teacher_data.availability if teacher_data else None,
+                "lecture_limit": teacher_data.lecture_limit if teacher_data else None
+            }
+    elif entity == "sections":
+        for section in db.query(Section).order_by(Section.batch_id, Section.section_letter).yield_per(EXPORT_BATCH):
+            yield {"batch_id": section.batch_id, "section_letter": section.section_letter, "student_count": section.student_count}
+    elif entity == "subjects":
+        for subject in db.query(Subject).order_by(Subject.batch_id, Subject.code).yield_per(EXPORT_BATCH):
+            yield {column: getattr(subject, column) for column in columns("subjects")}
+    elif entity == "assignments":
+        for teacher_data in db.query(TeacherData).order_by(TeacherData.id).yield_per(EXPORT_BATCH):
+            for subject, sections in sorted((teacher_data.subject_sections or {}).items()):
+                yield {"teacher": teacher_data.id, "subject": subject, "sections": sections}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(map(str, value))
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def render_records(entity, records, fmt):
+    """Encode records as CSV or NDJSON in chunks of EXPORT_BATCH rows"""
+    fields = columns(entity)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(fields)
+    for count, record in enumerate(records, start=1):
+        if fmt == "csv":
+            writer.writerow([_csv_value(record.get(field)) for field in fields])
+        else:
+            buffer.write(json.dumps(record) + "\n")
+        if count % EXPORT_BATCH == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,151 @@
+"""
+Timetable change feed.
+
+Changes are recorded as rows in the change_events table, in the same
+transaction as the change itself, so events raised in pool workers or other
+API workers are seen everywhere. The row id is the feed version. Each API
+process runs one poller that reads new rows and fans them out to its
+server-sent-event subscribers.
+"""
+import asyncio
+import json
+import os
+import time
+
+POLL_INTERVAL = float(os.environ.get("CHANGE_FEED_POLL_INTERVAL", "1.0"))
+HEARTBEAT_SECONDS = float(os.environ.get("CHANGE_FEED_HEARTBEAT", "15"))
+EVENT_TTL_SECONDS = int(os.environ.get("CHANGE_EVENT_TTL", "86400"))
+REPLAY_LIMIT = 500
+
+TIMETABLE_STORED = "timetable_stored"
+TEACHER_CHANGED = "teacher_changed"
+ROOM_CHANGED = "room_changed"
+
+
+def record_event(connection, kind, payload):
+    """Insert a change event using an open connection (joins the caller's transaction)"""
+    from backend_api import ChangeEvent
+    connection.execute(
+        ChangeEvent.__table__.insert().values(kind=kind, payload=json.dumps(payload), created_at=time.time())
+    )
+
+
+def format_event(event_id, kind, payload):
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps({'version': event_id, **payload})}\n\n"
+
+
+def fetch_events(after_id, limit=REPLAY_LIMIT):
+    """Events newer than after_id, oldest first"""
+    from backend_api import SessionLocal, ChangeEvent
+    db = SessionLocal()
+    try:
+        rows = db.query(ChangeEvent).filter(ChangeEvent.id > after_id).order_by(ChangeEvent.id).limit(limit).all()
+        return [(row.id, row.kind, json.loads(row.payload or "{}")) for row in rows]
+    finally:
+        db.close()
+
+
+def latest_version():
+    from backend_api import SessionLocal, ChangeEvent
+    db = SessionLocal()
+    try:
+        row = db.query(ChangeEvent).order_by(ChangeEvent.id.desc()).first()
+        return row.id if row else 0
+    finally:
+        db.close()
+
+
+def prune_events(ttl_seconds=EVENT_TTL_SECONDS):
+    from backend_api import SessionLocal, ChangeEvent
+    db = SessionLocal()
+    try:
+        db.query(ChangeEvent).filter(ChangeEvent.created_at < time.time() - ttl_seconds).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class ChangeFeed:
+    """Per-process poller that broadcasts new change events to subscriber queues"""
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._subscribers = set()
+        self._task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    async def start(self):
+        if self._task is None:
+            self.version = await asyncio.to_thread(latest_version)
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _poll(self):
+        last_prune = time.time()
+        while True:
+            try:
+                while True:
+                    events = await asyncio.to_thread(fetch_events, self.version)
+                    for event in events:
+                        self.version = event[0]
+                        for queue in list(self._subscribers):
+                            queue.put_nowait(event)
+                    if len(events) < REPLAY_LIMIT:
+                        break
+                if time.time() - last_prune > 3600:
+                    await asyncio.to_thread(prune_events)
+                    last_prune = time.time()
+            except Exception as e:
+                print(f"Change feed poll error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def replay(self, since, until):
+        """Events after since up to and including until, fetched in REPLAY_LIMIT pages"""
+        while since < until:
+            events = await asyncio.to_thread(fetch_events, since)
+            for event in events:
+                if event[0] > until:
+                    return
+                yield event
+                since = event[0]
+            if len(events) < REPLAY_LIMIT:
+                return
+
+    async def stream(self, request, since=None):
+        """Server-sent-event stream: replay every event after since, then follow live events"""
+        queue = self.subscribe()
+        try:
+            last_sent = self.version
+            yield f"event: hello\ndata: {json.dumps({'version': last_sent})}\n\n"
+            if since is not None:
+                async for event_id, kind, payload in self.replay(since, last_sent):
+                    yield format_event(event_id, kind, payload)
+            while not await request.is_disconnected():
+                try:
+                    event_id, kind, payload = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event_id > last_sent:
+                    last_sent = event_id
+                    yield format_event(event_id, kind, payload)
+        finally:
+            self.unsubscribe(queue)
+
+
+change_feed = ChangeFeed()
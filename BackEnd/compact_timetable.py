@@ -0,0 +1,173 @@
+"""
+Array-backed timetable representation.
+
+A timetable is stored as three int32 arrays shaped sections x days x slots
+holding interned subject, teacher and room ids. The nested
+timetable[section][day][time_slot] dict used by the API is rebuilt on demand.
+"""
+import json
+import numpy as np
+
+COMPACT_FORMAT = "compact-v1"
+EMPTY = -1
+
+CORE_FIELDS = ("subject", "teacher", "room")
+
+
+class CompactTimetable:
+    """Compact sections x days x slots timetable with a shared string vocabulary"""
+
+    def __init__(self, sections, days, time_slots, vocab=None):
+        self.sections = list(sections)
+        self.days = list(days)
+        self.time_slots = list(time_slots)
+        self.section_index = {s: i for i, s in enumerate(self.sections)}
+        self.day_index = {d: i for i, d in enumerate(self.days)}
+        self.slot_index = {ts: i for i, ts in enumerate(self.time_slots)}
+
+        self.vocab = list(vocab or [])
+        self.vocab_index = {name: i for i, name in enumerate(self.vocab)}
+
+        shape = (len(self.sections), len(self.days), len(self.time_slots))
+        self.subjects = np.full(shape, EMPTY, dtype=np.int32)
+        self.teachers = np.full(shape, EMPTY, dtype=np.int32)
+        self.rooms = np.full(shape, EMPTY, dtype=np.int32)
+
+
+        self.extras = {}
+
+    def intern(self, name):
+        """Return the vocabulary id for a string, or EMPTY for None"""
+        if name is None:
+            return EMPTY
+        if name not in self.vocab_index:
+            self.vocab_index[name] = len(self.vocab)
+            self.vocab.append(name)
+        return self.vocab_index[name]
+
+    def id_of(self, name):
+        """Vocabulary id of a string without interning it (EMPTY if unknown)"""
+        if name is None:
+            return EMPTY
+        return self.vocab_index.get(name, EMPTY)
+
+    def name_of(self, idx):
+        idx = int(idx)
+        return None if idx == EMPTY else self.vocab[idx]
+
+    def set_slot(self, section, day, time_slot, content):
+        """Store one timetable cell given in the nested-dict shape"""
+        i = self.section_index[section]
+        j = self.day_index[day]
+        k = self.slot_index[time_slot]
+        self.subjects[i, j, k] = self.intern(content.get("subject"))
+        self.teachers[i, j, k] = self.intern(content.get("teacher"))
+        self.rooms[i, j, k] = self.intern(content.get("room"))
+        extra = {key: value for key, value in content.items() if key not in CORE_FIELDS}
+        if extra or all(content.get(field) is None for field in CORE_FIELDS):
+            self.extras[(i, j, k)] = extra
+        else:
+            self.extras.pop((i, j, k), None)
+
+    def get_slot(self, section, day, time_slot):
+        """Return one cell in the nested-dict shape, or None if the slot is empty"""
+        i = self.section_index.get(section)
+        j = self.day_index.get(day)
+        k = self.slot_index.get(time_slot)
+        if i is None or j is None or k is None or not self._stored(i, j, k):
+            return None
+        return self._cell(i, j, k)
+
+    def _stored(self, i, j, k):
+        return (
+            self.subjects[i, j, k] != EMPTY or self.teachers[i, j, k] != EMPTY
+            or self.rooms[i, j, k] != EMPTY or (i, j, k) in self.extras
+        )
+
+    def _cell(self, i, j, k):
+        content = {
+            "subject": self.name_of(self.subjects[i, j, k]),
+            "teacher": self.name_of(self.teachers[i, j, k]),
+            "room": self.name_of(self.rooms[i, j, k])
+        }
+        if (i, j, k) in self.extras:
+            content.update(self.extras[(i, j, k)])
+        return content
+
+    def occupied(self):
+        """Boolean mask of stored cells, including ones holding only a teacher, a room or extra keys"""
+        mask = (self.subjects != EMPTY) | (self.teachers != EMPTY) | (self.rooms != EMPTY)
+        for i, j, k in self.extras:
+            mask[i, j, k] = True
+        return mask
+
+    @classmethod
+    def from_dict(cls, timetable, days=None, time_slots=None):
+        """Build from the nested timetable[section][day][time_slot] dict"""
+        days = list(days or [])
+        time_slots = list(time_slots or [])
+        for section_days in timetable.values():
+            for day, slots in section_days.items():
+                if day not in days:
+                    days.append(day)
+                for time_slot in slots:
+                    if time_slot not in time_slots:
+                        time_slots.append(time_slot)
+
+        compact = cls(list(timetable.keys()), days, time_slots)
+        for section, section_days in timetable.items():
+            for day, slots in section_days.items():
+                for time_slot, content in slots.items():
+                    compact.set_slot(section, day, time_slot, content)
+        return compact
+
+    def to_dict(self, sections=None):
+        """Rebuild the nested dict shape served by the API"""
+        timetable = {}
+        filled = self.occupied()
+        for section in (sections if sections is not None else self.sections):
+            i = self.section_index.get(section)
+            if i is None:
+                continue
+            timetable[section] = {}
+            for j, day in enumerate(self.days):
+                timetable[section][day] = {}
+                for k in np.flatnonzero(filled[i, j]):
+                    timetable[section][day][self.time_slots[k]] = self._cell(i, j, int(k))
+        return timetable
+
+    def to_payload(self):
+        return {
+            "format": COMPACT_FORMAT,
+            "sections": self.sections,
+            "days": self.days,
+            "time_slots": self.time_slots,
+            "vocab": self.vocab,
+            "subjects": self.subjects.tolist(),
+            "teachers": self.teachers.tolist(),
+            "rooms": self.rooms.tolist(),
+            "extras": [[i, j, k, extra] for (i, j, k), extra in self.extras.items()]
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        compact = cls(payload["sections"], payload["days"], payload["time_slots"], payload["vocab"])
+        shape = compact.subjects.shape
+        if compact.subjects.size:
+            compact.subjects = np.asarray(payload["subjects"], dtype=np.int32).reshape(shape)
+            compact.teachers = np.asarray(payload["teachers"], dtype=np.int32).reshape(shape)
+            compact.rooms = np.asarray(payload["rooms"], dtype=np.int32).reshape(shape)
+        for i, j, k, extra in payload.get("extras", []):
+            compact.extras[(i, j, k)] = extra
+        return compact
+
+    def to_json(self):
+        return json.dumps(self.to_payload(), separators=(",", ":"))
+
+
+def load_timetable(raw, time_slots=None):
+    """Parse a stored Timetable.data value (compact or legacy nested JSON)"""
+    payload = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    if isinstance(payload, dict) and payload.get("format") == COMPACT_FORMAT:
+        return CompactTimetable.from_payload(payload)
+    return CompactTimetable.from_dict(payload, time_slots=time_slots)
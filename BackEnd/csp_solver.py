@@ -0,0 +1,497 @@
+"""
+Constraint-propagation scheduling engine.
+
+An alternative to the greedy filler in ai_timetable_model. Every lab
+occurrence and every free (section, day, slot) cell is a variable. Static
+domains are filtered up front (teacher availability, teacher_subject_sections,
+preferences, room type/capacity); the remaining constraints (teacher clashes,
+lecture limits, lab pairing, a free room) are checked against the shared
+OccupancyIndex and room bookings. Variables are chosen most-constrained-first
+from a heap of incrementally maintained domain sizes, each assignment is
+forward checked against the variables sharing its teacher or its slots, and
+dead ends trigger bounded
+chronological backtracking. When the backtrack budget runs out, variables
+that cannot be filled are left empty, so a result is always returned in the
+same timetable[section][day][time_slot] shape as generate_timetable.
+"""
+import heapq
+import random
+
+import ai_timetable_model as model
+from ai_timetable_model import (
+    data, OccupancyIndex, MORNING_SLOTS, AFTERNOON_SLOTS, LUNCH_SLOT,
+    check_slot_conflict, is_teacher_available_at_slot, is_room_available,
+    get_course_subjects_and_sections, get_week_days, classify_subjects,
+    place_elective_blocks, update_sections_taught,
+    load_subject_dependencies, load_elective_groups
+)
+from generation_profile import GenerationProfile
+
+DEFAULT_MAX_BACKTRACKS = 500
+AFTERNOON_TRIGGER = 20
+SECTION_TARGET = 25
+
+
+def default_section_size(section):
+    """Same default allocate_room uses when no section sizes are known"""
+    return 60 if section in ["A", "B", "C", "D", "E", "F", "G", "H"] else 30
+
+
+class TimetableCSP:
+    """Variables, domains and undoable assignments for one course timetable"""
+
+    def __init__(self, timetable, sections, days, classrooms, occupancy, room_assignments,
+                 teacher_subject_sections, teacher_lecture_limits, teacher_availability,
+                 teacher_preferences, subject_dependencies, rng, section_sizes=None):
+        self.timetable = timetable
+        self.sections = sections
+        self.days = days
+        self.classrooms = classrooms
+        self.occupancy = occupancy
+        self.room_assignments = room_assignments
+        self.teacher_subject_sections = teacher_subject_sections
+        self.teacher_lecture_limits = teacher_lecture_limits
+        self.teacher_availability = teacher_availability
+        self.teacher_preferences = teacher_preferences
+        self.subject_dependencies = subject_dependencies
+        self.rng = rng
+        self.section_sizes = section_sizes or {}
+
+        self.static_domains = {}
+        self.vars_by_teacher_day = {}
+        self.vars_by_day_slot = {}
+        self.rooms_required = bool(classrooms)
+        self.subject_counts = {section: {} for section in sections}
+        self.lab_days = {}
+        self._room_cache = {}
+
+    def valid_teachers(self, subject, section):
+        return [
+            t for t in model.subject_teacher_mapping.get(subject, [])
+            if self.teacher_availability.get(t, True)
+            and t in self.teacher_subject_sections
+            and subject in self.teacher_subject_sections[t]
+            and section in self.teacher_subject_sections[t][subject]
+        ]
+
+    def candidate_rooms(self, section, subject, room_type):
+        """Rooms of the right type and capacity, subject-designated rooms first"""
+        key = (section, subject, room_type)
+        if key not in self._room_cache:
+            size = self.section_sizes.get(section, default_section_size(section))
+            specific, general = [], []
+            for room in self.classrooms:
+                if room["room_type"] != room_type or room["capacity"] < size:
+                    continue
+                if room.get("subjects"):
+                    if subject in room["subjects"]:
+                        specific.append(room["room_number"])
+                else:
+                    general.append(room["room_number"])
+            self._room_cache[key] = specific + general
+        return self._room_cache[key]
+
+    def has_rooms(self, section, subject, room_type):
+        """Without configured classrooms rooms stay None, as in allocate_room"""
+        return not self.rooms_required or bool(self.candidate_rooms(section, subject, room_type))
+
+    @staticmethod
+    def placement(var, value):
+        """(teacher, day, time slots, room type) a value occupies"""
+        if var[0] == "lab":
+            return value[3], value[0], value[1:3], "lab"
+        return value[1], var[2], (var[3],), "lecture"
+
+    def _index_var(self, var, domain):
+        self.static_domains[var] = domain
+        for value in domain:
+            teacher, day, slots, room_type = self.placement(var, value)
+            self.vars_by_teacher_day.setdefault((teacher, day), set()).add(var)
+            for time_slot in slots:
+                self.vars_by_day_slot.setdefault((day, time_slot, room_type), set()).add(var)
+
+    def add_lab_variables(self, section, lab_subject, occurrences=2):
+        if not self.has_rooms(section, lab_subject, "lab"):
+            return []
+        teachers = self.valid_teachers(lab_subject, section)
+        domain = []
+        for day in self.days:
+            for i, time_slot in enumerate(MORNING_SLOTS[:-1]):
+                next_slot = MORNING_SLOTS[i + 1]
+                for teacher in teachers:
+                    if (is_teacher_available_at_slot(teacher, day, time_slot, self.teacher_preferences)
+                            and is_teacher_available_at_slot(teacher, day, next_slot, self.teacher_preferences)):
+                        domain.append((day, time_slot, next_slot, teacher))
+        if not domain:
+            return []
+        variables = []
+        for k in range(occurrences):
+            var = ("lab", section, lab_subject, k)
+            self._index_var(var, domain)
+            variables.append(var)
+        return variables
+
+    def add_cell_variable(self, section, day, time_slot, subjects):
+        domain = []
+        for subject in subjects:
+            if not self.has_rooms(section, subject, "lecture"):
+                continue
+            for teacher in self.valid_teachers(subject, section):
+                if is_teacher_available_at_slot(teacher, day, time_slot, self.teacher_preferences):
+                    domain.append((subject, teacher))
+        if not domain:
+            return None
+        var = ("cell", section, day, time_slot)
+        self._index_var(var, domain)
+        return var
+
+    def is_active(self, var):
+        """Cell variables drop out once their slot is taken or the section is full"""
+        if var[0] == "cell":
+            _, section, day, time_slot = var
+            if self.occupancy.is_section_busy(section, day, time_slot):
+                return False
+            if time_slot in AFTERNOON_SLOTS and self.occupancy.section_filled(section) >= SECTION_TARGET:
+                return False
+        return True
+
+    def consistent(self, var, value):
+        if var[0] == "lab":
+            _, section, subject, _ = var
+            day, time_slot, next_slot, teacher = value
+            if (self.occupancy.is_section_busy(section, day, time_slot)
+                    or self.occupancy.is_section_busy(section, day, next_slot)):
+                return False
+            if day in self.lab_days.get((section, subject), ()):
+                return False
+            if self.rooms_required and self._pick_room(section, subject, "lab", day, (time_slot, next_slot)) is None:
+                return False
+            return check_slot_conflict(
+                self.timetable, section, day, time_slot, teacher, subject, is_two_hour=True,
+                teacher_subject_sections=self.teacher_subject_sections,
+                teacher_lecture_limits=self.teacher_lecture_limits,
+                teacher_availability=self.teacher_availability,
+                teacher_preferences=self.teacher_preferences,
+                occupancy=self.occupancy
+            )
+        _, section, day, time_slot = var
+        subject, teacher = value
+        if self.rooms_required and self._pick_room(section, subject, "lecture", day, (time_slot,)) is None:
+            return False
+        return check_slot_conflict(
+            self.timetable, section, day, time_slot, teacher, subject, is_two_hour=False,
+            teacher_subject_sections=self.teacher_subject_sections,
+            teacher_lecture_limits=self.teacher_lecture_limits,
+            teacher_availability=self.teacher_availability,
+            teacher_preferences=self.teacher_preferences,
+            occupancy=self.occupancy
+        )
+
+    def domain(self, var):
+        return [value for value in self.static_domains[var] if self.consistent(var, value)]
+
+    def _unsatisfied_prerequisite(self, section, subject):
+        for dep in self.subject_dependencies.get(subject, []):
+            if dep["type"] == "prerequisite" and dep["dependent"] not in self.subject_counts[section]:
+                return True
+        return False
+
+    def order_values(self, var, values):
+        """Least-constraining first: balance subjects per section and load per teacher"""
+        section = var[1]
+        counts = self.subject_counts[section]
+        if var[0] == "lab":
+            key = lambda v: (self.occupancy.weekly_count(v[3]), self.rng.random())
+        else:
+            key = lambda v: (
+                self._unsatisfied_prerequisite(section, v[0]),
+                counts.get(v[0], 0),
+                self.occupancy.weekly_count(v[1]),
+                self.rng.random()
+            )
+        return sorted(values, key=key)
+
+    def _pick_room(self, section, subject, room_type, day, slots):
+        for room in self.candidate_rooms(section, subject, room_type):
+            if all(is_room_available(room, day, ts, self.room_assignments) for ts in slots):
+                return room
+        return None
+
+    def _book_room(self, room, day, slots, section):
+        if room is None:
+            return
+        for ts in slots:
+            self.room_assignments.setdefault(room, {}).setdefault(day, {})[ts] = section
+
+    def _free_room(self, room, day, slots):
+        if room is None:
+            return
+        for ts in slots:
+            self.room_assignments[room][day].pop(ts, None)
+
+    def apply(self, var, value):
+        """Assign a value and return an undo token"""
+        if var[0] == "lab":
+            _, section, subject, _ = var
+            day, time_slot, next_slot, teacher = value
+            slots = (time_slot, next_slot)
+            room = self._pick_room(section, subject, "lab", day, slots)
+            self.lab_days.setdefault((section, subject), set()).add(day)
+        else:
+            _, section, day, time_slot = var
+            subject, teacher = value
+            slots = (time_slot,)
+            room = self._pick_room(section, subject, "lecture", day, slots)
+
+        self._book_room(room, day, slots, section)
+        for ts in slots:
+            self.timetable[section][day][ts] = {"subject": subject, "teacher": teacher, "room": room}
+            self.occupancy.place(section, day, ts, teacher)
+        self.subject_counts[section][subject] = self.subject_counts[section].get(subject, 0) + 1
+        return (var, section, subject, teacher, day, slots, room)
+
+    def undo(self, token):
+        var, section, subject, teacher, day, slots, room = token
+        for ts in slots:
+            del self.timetable[section][day][ts]
+            self.occupancy.remove(section, day, ts, teacher)
+        self._free_room(room, day, slots)
+        self.subject_counts[section][subject] -= 1
+        if not self.subject_counts[section][subject]:
+            del self.subject_counts[section][subject]
+        if var[0] == "lab":
+            self.lab_days[(section, subject)].discard(day)
+
+    def _neighbours(self, teacher, day, slots, room_type):
+        found = set(self.vars_by_teacher_day.get((teacher, day), ()))
+        if self.rooms_required:
+            for time_slot in slots:
+                found.update(self.vars_by_day_slot.get((day, time_slot, room_type), ()))
+        return found
+
+    def neighbours(self, var, value):
+        """Variables whose domains can shrink when var takes value: same teacher and day, or same slots and room type"""
+        return self._neighbours(*self.placement(var, value))
+
+    def may_shrink(self, other, var, value):
+        """False when var taking value provably left other's domain intact: no shared teacher day and a room to spare"""
+        teacher, day, slots, _ = self.placement(var, value)
+        if other in self.vars_by_teacher_day.get((teacher, day), ()):
+            return True
+        if other[0] == "lab":
+            subjects, room_type = (other[2],), "lab"
+            positions = [MORNING_SLOTS.index(ts) for ts in slots]
+            window = MORNING_SLOTS[max(min(positions) - 1, 0):max(positions) + 2]
+        else:
+            subjects, room_type = {v[0] for v in self.static_domains[other]}, "lecture"
+            window = (other[3],)
+        return any(self._pick_room(other[1], subject, room_type, day, window) is None for subject in subjects)
+
+    def released(self, token):
+        """Variables whose domains can grow when an assignment is undone"""
+        var, _, _, teacher, day, slots, _ = token
+        return self._neighbours(teacher, day, slots, "lab" if var[0] == "lab" else "lecture")
+
+
+class BacktrackingSearch:
+    """MRV variable ordering, forward checking and a bounded backtrack budget"""
+
+    def __init__(self, csp, variables, max_backtracks=DEFAULT_MAX_BACKTRACKS):
+        self.csp = csp
+        self.unassigned = set(variables)
+        self.order = {var: i for i, var in enumerate(variables)}
+        self.budget = max_backtracks
+        self.sizes = {}
+        self.heap = []
+        self.dirty = set(variables)
+        self.stack = []
+        self.backtracks = 0
+        self.skipped = 0
+
+    def _resize(self, var, size):
+        self.sizes[var] = size
+        heapq.heappush(self.heap, (size, self.order[var], var))
+
+    def _refresh(self):
+        for var in self.dirty:
+            if var in self.unassigned:
+                self._resize(var, len(self.csp.domain(var)))
+        self.dirty.clear()
+
+    def _select(self):
+        """Smallest current domain; stale heap entries and inactive variables are dropped lazily"""
+        self._refresh()
+        while self.heap:
+            size, _, var = self.heap[0]
+            if var not in self.unassigned or self.sizes[var] != size:
+                heapq.heappop(self.heap)
+            elif not self.csp.is_active(var):
+                heapq.heappop(self.heap)
+                self.unassigned.discard(var)
+            else:
+                return var
+        return None
+
+    def _forward_check(self, var, value):
+        """Refresh neighbour domains; fail if one that had values now has none"""
+        ok = True
+        for other in self.csp.neighbours(var, value):
+            if other is var or other not in self.unassigned or not self.csp.is_active(other):
+                continue
+            if not self.csp.may_shrink(other, var, value):
+                continue
+            before = self.sizes.get(other, 0)
+            after = len(self.csp.domain(other))
+            self._resize(other, after)
+            if before > 0 and after == 0:
+                ok = False
+        return ok
+
+    def _try_values(self, var, values, strict):
+        for n, value in enumerate(values):
+            token = self.csp.apply(var, value)
+            if not strict or self._forward_check(var, value):
+                self.unassigned.discard(var)
+                self.stack.append((var, values[n + 1:], token))
+                return True
+            self.csp.undo(token)
+            self.dirty.update(self.csp.neighbours(var, value))
+        return False
+
+    def _backtrack(self):
+        while self.stack:
+            var, remaining, token = self.stack.pop()
+            if token is not None:
+                self.csp.undo(token)
+                self.dirty.update(self.csp.released(token))
+                self.dirty.update(self.csp.neighbours(var, remaining[0]) if remaining else ())
+            else:
+                self.skipped -= 1
+            self.unassigned.add(var)
+            self.dirty.add(var)
+            if remaining and self._try_values(var, remaining, strict=True):
+                return True
+        return False
+
+    def run(self):
+        while True:
+            var = self._select()
+            if var is None:
+                break
+            values = self.csp.order_values(var, self.csp.domain(var))
+            if self._try_values(var, values, strict=self.budget > 0):
+                continue
+            if self.budget > 0 and self.stack:
+                self.budget -= 1
+                self.backtracks += 1
+                self._backtrack()
+                continue
+            if values and self._try_values(var, values, strict=False):
+                continue
+            self.unassigned.discard(var)
+            self.stack.append((var, [], None))
+            self.skipped += 1
+        return self
+
+
+def record_search(profile, phase, variables, search):
+    profile.count(f"{phase}_variables", len(variables))
+    profile.count(f"{phase}_backtracks", search.backtracks)
+    profile.count(f"{phase}_skipped", search.skipped)
+
+
+def solve_timetable(start_date=None, teacher_subject_sections=None, teacher_sections_taught=None, teacher_lecture_limits=None, teacher_availability=None, teacher_preferences=None, classrooms=None, course="BTech", semester=4, subject_dependencies=None, elective_groups_data=None, subjects=None, sections=None, max_backtracks=DEFAULT_MAX_BACKTRACKS, seed=None, profile=None):
+    """Drop-in replacement for generate_timetable using constraint propagation"""
+    if profile is None:
+        profile = GenerationProfile()
+    if not data["teachers"] or len(data["teachers"]) == 0:
+        raise ValueError("No teachers available in the system. Please add teachers through the Teacher Management UI.")
+
+    teacher_subject_sections = teacher_subject_sections or {}
+    if teacher_sections_taught is None:
+        teacher_sections_taught = {}
+    teacher_lecture_limits = teacher_lecture_limits or {}
+    teacher_availability = teacher_availability or {teacher: True for teacher in data["teachers"]}
+    teacher_preferences = teacher_preferences or {}
+    classrooms = classrooms or []
+    rng = random.Random(seed) if seed is not None else random.Random(random.random())
+
+    subjects, sections = get_course_subjects_and_sections(course, semester, subjects, sections)
+    profile.mark()
+    if subject_dependencies is None:
+        subject_dependencies = load_subject_dependencies()
+    profile.lap("dependency_load")
+    if elective_groups_data is None:
+        elective_groups_data = load_elective_groups()
+    profile.lap("elective_load")
+
+    days = get_week_days(start_date)
+    elective_days = rng.sample([d for d in days if d not in ["Saturday"]], 2)
+    selected_elective_slots = rng.choice([
+        ("11:00-12:00", "12:00-13:00"),
+        ("14:00-15:00", "15:00-16:00")
+    ])
+    lab_subjects, core_subjects_all, exclusive_subjects = classify_subjects(subjects, sections)
+
+    timetable = {section: {day: {} for day in days} for section in sections}
+    room_assignments = {}
+    occupancy = OccupancyIndex(sections, days, data["time_slots"], data["teachers"])
+    place_elective_blocks(timetable, sections, elective_days, selected_elective_slots, elective_groups_data, room_assignments, occupancy)
+    profile.lap("elective_blocks")
+
+    csp = TimetableCSP(
+        timetable, sections, days, classrooms, occupancy, room_assignments,
+        teacher_subject_sections, teacher_lecture_limits, teacher_availability,
+        teacher_preferences, subject_dependencies, rng
+    )
+    core_pools = {
+        section: [s for s in core_subjects_all + exclusive_subjects.get(section, []) if not s.startswith("PCS")]
+        for section in sections
+    }
+
+    lab_vars = []
+    for section in sections:
+        for lab_subject in lab_subjects:
+            lab_vars.extend(csp.add_lab_variables(section, lab_subject))
+    labs = BacktrackingSearch(csp, lab_vars, max_backtracks).run()
+    record_search(profile, "lab", lab_vars, labs)
+    profile.lap("labs")
+
+    morning_vars = []
+    for section in sections:
+        for day in days:
+            for time_slot in MORNING_SLOTS:
+                if occupancy.is_section_busy(section, day, time_slot):
+                    continue
+                var = csp.add_cell_variable(section, day, time_slot, core_pools[section])
+                if var:
+                    morning_vars.append(var)
+    morning = BacktrackingSearch(csp, morning_vars, max_backtracks).run()
+    record_search(profile, "morning", morning_vars, morning)
+    profile.lap("morning_fill")
+
+    afternoon_vars = []
+    for section in sections:
+        if occupancy.section_filled(section, MORNING_SLOTS) >= AFTERNOON_TRIGGER:
+            continue
+        for day in days:
+            timetable[section][day][LUNCH_SLOT] = {"subject": "Lunch", "teacher": None, "room": None}
+        for day in days:
+            for time_slot in AFTERNOON_SLOTS:
+                if occupancy.is_section_busy(section, day, time_slot):
+                    continue
+                var = csp.add_cell_variable(section, day, time_slot, core_pools[section])
+                if var:
+                    afternoon_vars.append(var)
+    afternoon = BacktrackingSearch(csp, afternoon_vars, max_backtracks).run()
+    record_search(profile, "afternoon", afternoon_vars, afternoon)
+    profile.lap("afternoon_fill")
+
+    update_sections_taught(timetable, sections, teacher_sections_taught)
+    profile.lap("sections_taught")
+
+    placed = sum(occupancy.section_filled(section) for section in sections)
+    print(f"CSP solver: {placed} lectures placed, "
+          f"{labs.backtracks + morning.backtracks + afternoon.backtracks} backtracks, "
+          f"{labs.skipped + morning.skipped + afternoon.skipped} variables left empty")
+    return timetable
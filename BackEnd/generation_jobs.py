@@ -0,0 +1,310 @@
+"""
+Background timetable generation jobs.
+
+Jobs run on a bounded process pool so CPU-bound generation does not compete
+with request handling for the GIL. Task state lives in the generation_tasks
+table, so any uvicorn worker can answer /task/{task_id}. A pending or running
+task holds its (course, semester, date) key in the unique active_key column,
+so identical requests are de-duplicated by the database across workers and
+hosts; the key is released when the task finishes. The process that owns a
+task's future heartbeats its updated_at, so a pending or running task whose
+owner died (a restarted uvicorn worker, a lost pool) goes stale and is failed,
+releasing its key, on the next claim. Only finished tasks are evicted by TTL.
+A pool broken by a crashed worker is replaced on the next submission.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from generation_profile import record_profile
+from metrics import GENERATION_JOBS
+
+MAX_WORKERS = int(os.environ.get("GENERATION_WORKERS", "2"))
+MAX_QUEUED = int(os.environ.get("GENERATION_QUEUE_LIMIT", "8"))
+TASK_TTL_SECONDS = int(os.environ.get("GENERATION_TASK_TTL", "3600"))
+HEARTBEAT_SECONDS = float(os.environ.get("GENERATION_HEARTBEAT", "30"))
+STALE_TASK_SECONDS = int(os.environ.get("GENERATION_TASK_STALE", "120"))
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class GenerationQueueFull(Exception):
+    pass
+
+
+def make_dedup_key(date, course, semester):
+    if not date or not str(date).strip():
+        date = datetime.now().strftime("%Y-%m-%d")
+    return f"{course}|{semester}|{date}"
+
+
+def update_task(task_id, **fields):
+    """Write task fields to the shared task table"""
+    from backend_api import SessionLocal, GenerationTask
+    db = SessionLocal()
+    try:
+        task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+        if not task:
+            return
+        for key, value in fields.items():
+            if key == "result":
+                value = json.dumps(value) if value is not None else None
+            setattr(task, key, value)
+        if task.status not in ACTIVE_STATUSES:
+            task.active_key = None
+        task.updated_at = time.time()
+        db.commit()
+    finally:
+        db.close()
+
+
+def task_to_dict(task):
+    return {
+        "task_id": task.id,
+        "status": task.status,
+        "progress": task.progress,
+        "message": task.message,
+        "error": task.error,
+        "result": json.loads(task.result) if task.result else None
+    }
+
+
+def run_generation_task(task_id, date, course, semester, state, restarts=1, time_budget=None, engine="greedy", capture=None):
+    """Process pool entry point: restore the scheduling state and generate. Returns the generation profile"""
+    import backend_api
+    backend_api.restore_generation_state(state)
+    return backend_api.generate_timetable_background(task_id, date, course, semester, restarts, time_budget, engine, capture)
+
+
+class GenerationJobManager:
+    """Bounded process pool plus a task table shared by all API workers"""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queued=MAX_QUEUED, ttl_seconds=TASK_TTL_SECONDS,
+                 heartbeat_seconds=HEARTBEAT_SECONDS, stale_seconds=STALE_TASK_SECONDS):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._heartbeat = None
+        self._stopping = threading.Event()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drop a pool whose worker died so the next submission starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("Generation process pool was broken by a crashed worker; starting a new one")
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        future.add_done_callback(lambda f, executor=executor: self._check_broken(executor, f))
+        return future
+
+    def _check_broken(self, executor, future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard_executor(executor)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="generation-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self):
+        while not self._stopping.wait(self.heartbeat_seconds):
+            try:
+                self.touch(list(self._futures))
+            except Exception as e:
+                print(f"Generation task heartbeat error: {e}")
+
+    def touch(self, task_ids):
+        """Refresh updated_at of this process's pending or running tasks so they are not taken as stale"""
+        if not task_ids:
+            return
+        from backend_api import SessionLocal, GenerationTask
+        db = SessionLocal()
+        try:
+            db.query(GenerationTask).filter(
+                GenerationTask.id.in_(task_ids), GenerationTask.status.in_(ACTIVE_STATUSES)
+            ).update({GenerationTask.updated_at: time.time()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def release_stale(self, db):
+        """Fail pending or running tasks whose owner stopped heartbeating, releasing their active keys"""
+        from backend_api import GenerationTask
+        now = time.time()
+        released = db.query(GenerationTask).filter(
+            GenerationTask.status.in_(ACTIVE_STATUSES), GenerationTask.updated_at < now - self.stale_seconds
+        ).update({
+            GenerationTask.status: "failed",
+            GenerationTask.active_key: None,
+            GenerationTask.error: "Generation worker stopped responding",
+            GenerationTask.message: "Error: generation worker stopped responding",
+            GenerationTask.updated_at: now
+        }, synchronize_session=False)
+        db.commit()
+        if released:
+            print(f"Released {released} stale generation task(s)")
+        return released
+
+    def claim(self, dedup_key):
+        """Insert a pending task holding dedup_key as its active key. Returns (task_id, deduplicated)"""
+        from backend_api import SessionLocal, GenerationTask
+        db = SessionLocal()
+        try:
+            self.release_stale(db)
+            existing = db.query(GenerationTask.id).filter(GenerationTask.active_key == dedup_key).first()
+            if existing:
+                return existing.id, True
+
+            queued = db.query(GenerationTask).filter(GenerationTask.status.in_(ACTIVE_STATUSES)).count()
+            if queued >= self.max_queued:
+                raise GenerationQueueFull(f"Generation queue is full ({queued} jobs). Please try again shortly.")
+
+            task_id = str(uuid.uuid4())
+            now = time.time()
+            db.add(GenerationTask(
+                id=task_id,
+                dedup_key=dedup_key,
+                active_key=dedup_key,
+                status="pending",
+                progress=0,
+                message="Queued for generation...",
+                created_at=now,
+                updated_at=now
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                existing = db.query(GenerationTask.id).filter(GenerationTask.active_key == dedup_key).first()
+                if existing is None:
+                    raise
+                return existing.id, True
+            return task_id, False
+        finally:
+            db.close()
+
+    def submit(self, date, course, semester, state, restarts=1, time_budget=None, engine="greedy", capture=None):
+        """Queue a generation job. Returns (task_id, deduplicated)"""
+        self.evict_expired()
+        task_id, deduplicated = self.claim(make_dedup_key(date, course, semester))
+        if deduplicated:
+            return task_id, True
+
+        try:
+            future = self._submit(run_generation_task, task_id, date, course, semester, state, restarts, time_budget, engine, capture)
+        except Exception as e:
+            update_task(task_id, status="failed", error=str(e), message=f"Error: {e}")
+            raise
+        self._futures[task_id] = future
+        future.add_done_callback(lambda f, task_id=task_id: self._on_done(task_id, f))
+        self._start_heartbeat()
+        return task_id, False
+
+    def submit_call(self, fn, *args):
+        """Run a single call on the shared pool and return its future"""
+        return self._submit(fn, *args)
+
+    def map(self, fn, *iterables):
+        """Run fn over iterables on the shared pool, yielding results in order"""
+        futures = [self._submit(fn, *args) for args in zip(*iterables)]
+        return self._results(futures)
+
+    def _results(self, futures):
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _on_done(self, task_id, future):
+        self._futures.pop(task_id, None)
+        if future.cancelled():
+            GENERATION_JOBS.inc(status="cancelled")
+            update_task(task_id, status="failed", error="Cancelled", message="Generation was cancelled")
+            return
+        error = future.exception()
+        if error is not None:
+            GENERATION_JOBS.inc(status="failed")
+            update_task(task_id, status="failed", error=str(error), message=f"Error: {error}")
+        elif future.result() is not None:
+            GENERATION_JOBS.inc(status="completed")
+            record_profile(future.result())
+        else:
+            GENERATION_JOBS.inc(status="failed")
+
+    def get(self, task_id):
+        from backend_api import SessionLocal, GenerationTask
+        db = SessionLocal()
+        try:
+            task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+            return task_to_dict(task) if task else None
+        finally:
+            db.close()
+
+    def in_flight(self):
+        return len(self._futures)
+
+    def queue_depth(self):
+        from backend_api import SessionLocal, GenerationTask
+        db = SessionLocal()
+        try:
+            return db.query(GenerationTask).filter(GenerationTask.status.in_(ACTIVE_STATUSES)).count()
+        finally:
+            db.close()
+
+    def evict_expired(self):
+        """Delete finished task records not updated within the TTL; stale active tasks are failed by claim first"""
+        from backend_api import SessionLocal, GenerationTask
+        cutoff = time.time() - self.ttl_seconds
+        db = SessionLocal()
+        try:
+            db.query(GenerationTask).filter(
+                GenerationTask.status.notin_(ACTIVE_STATUSES), GenerationTask.updated_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def shutdown(self):
+        self._stopping.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+generation_jobs = GenerationJobManager()
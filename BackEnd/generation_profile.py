@@ -0,0 +1,157 @@
+"""
+Generation instrumentation.
+
+A GenerationProfile collects per-phase wall times and placement counters
+(attempts, placements and rejections by reason) for one generation run. It is
+cheap enough to stay on for every run: phases are timed with perf_counter
+laps and counters are dict increments. A cProfile or pyinstrument capture can
+be requested per run. Finished profiles are kept in a small in-process ring
+buffer that backs /generation_metrics.
+"""
+import cProfile
+import importlib.util
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import GENERATION_SECONDS
+
+PROFILE_HISTORY = int(os.environ.get("GENERATION_PROFILE_HISTORY", "50"))
+CAPTURE_MODES = ("cprofile", "pyinstrument")
+CAPTURE_TOP_FUNCTIONS = 25
+
+
+class GenerationProfile:
+    """Phase timers, attempt counters and an optional profiler capture for one run"""
+
+    def __init__(self, capture=None, **labels):
+        if capture and capture not in CAPTURE_MODES:
+            raise ValueError(f"Unknown profile capture '{capture}'. Choose one of: {', '.join(CAPTURE_MODES)}")
+        if capture == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+            raise ValueError("pyinstrument is not installed; use profile=cprofile instead")
+        self.capture = capture or None
+        self.labels = labels
+        self.phases = {}
+        self.counters = {}
+        self.rejections = {}
+        self.report = None
+        self.total_seconds = None
+        self._mark = time.perf_counter()
+
+    def mark(self):
+        """Start timing the next phase from now"""
+        self._mark = time.perf_counter()
+
+    def lap(self, phase):
+        """Add the time since the last mark or lap to phase"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reject(self, reason):
+        self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+    def attempt(self, phase, reason):
+        """Record one placement attempt in phase; reason is None when it was placed"""
+        self.count(f"{phase}_attempts")
+        if reason is None:
+            self.count(f"{phase}_placed")
+        else:
+            self.reject(reason)
+
+    @contextmanager
+    def run(self):
+        """Time the whole run, under the requested profiler if any"""
+        started = time.perf_counter()
+        if self.capture == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield self
+            finally:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(CAPTURE_TOP_FUNCTIONS)
+                self.report = out.getvalue()
+                self.total_seconds = time.perf_counter() - started
+        elif self.capture == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield self
+            finally:
+                profiler.stop()
+                self.report = profiler.output_text()
+                self.total_seconds = time.perf_counter() - started
+        else:
+            try:
+                yield self
+            finally:
+                self.total_seconds = time.perf_counter() - started
+
+    def summary(self):
+        phases = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+        rejections = ", ".join(f"{reason}={count}" for reason, count in sorted(self.rejections.items()))
+        return f"phases[{phases}] rejections[{rejections or 'none'}]"
+
+    def to_dict(self):
+        return {
+            **self.labels,
+            "total_seconds": round(self.total_seconds, 6) if self.total_seconds is not None else None,
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+            "rejections": dict(self.rejections),
+            "capture": self.capture,
+            "report": self.report
+        }
+
+
+_recent_profiles = deque(maxlen=PROFILE_HISTORY)
+_recent_lock = threading.Lock()
+
+
+def record_profile(profile):
+    """Keep a finished profile (a GenerationProfile.to_dict() result) for /generation_metrics"""
+    if profile.get("total_seconds") is not None:
+        GENERATION_SECONDS.observe(profile["total_seconds"], engine=profile.get("engine") or "greedy")
+    with _recent_lock:
+        _recent_profiles.append(profile)
+
+
+def recent_profiles(limit=None):
+    """Most recent profiles first"""
+    with _recent_lock:
+        profiles = list(_recent_profiles)
+    profiles.reverse()
+    return profiles[:limit] if limit else profiles
+
+
+def aggregate_profiles():
+    """Totals and per-run means of phase times, counters and rejections over the recent profiles"""
+    profiles = recent_profiles()
+    phases = {}
+    counters = {}
+    rejections = {}
+    for profile in profiles:
+        for name, seconds in profile["phases"].items():
+            phases[name] = phases.get(name, 0.0) + seconds
+        for name, value in profile["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+        for reason, value in profile["rejections"].items():
+            rejections[reason] = rejections.get(reason, 0) + value
+    runs = len(profiles)
+    return {
+        "runs": runs,
+        "total_seconds_mean": round(sum(p["total_seconds"] or 0 for p in profiles) / runs, 6) if runs else None,
+        "phase_seconds_mean": {name: round(seconds / runs, 6) for name, seconds in phases.items()},
+        "counters": counters,
+        "rejections": rejections
+    }
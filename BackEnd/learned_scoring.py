@@ -0,0 +1,177 @@
+"""
+Learned candidate scoring for the greedy scheduler.
+
+A small Keras network is trained on the lectures of the stored timetables:
+every placed (section, day, time slot, subject, teacher) is a positive
+example, and the same slot paired with other (subject, teacher) pairs seen in
+history gives the negatives. With engine=learned the greedy filler scores all
+teaching slots of a section-day against every candidate pair in one batched
+predict call and tries candidates best first instead of drawing one at random.
+
+TensorFlow is imported here only, on first use.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from compact_timetable import load_timetable
+
+SCORER_MODEL_PATH = os.environ.get("TIMETABLE_SCORER_MODEL", "timetable_scorer.keras")
+SCORER_VOCAB_PATH = os.path.splitext(SCORER_MODEL_PATH)[0] + ".json"
+TRAINING_EPOCHS = int(os.environ.get("TIMETABLE_SCORER_EPOCHS", "10"))
+NEGATIVES_PER_LECTURE = 4
+PREDICT_BATCH_SIZE = 1024
+
+FIELDS = ("section", "day", "time_slot", "subject", "teacher")
+PLACEHOLDERS = ("respective teacher", "Elective Faculty")
+
+
+class FeatureEncoder:
+    """One-hot features for (section, day, time slot, subject, teacher) rows; code 0 means unseen"""
+
+    def __init__(self, vocab):
+        self.vocab = {field: list(vocab[field]) for field in FIELDS}
+        self.index = {field: {value: i + 1 for i, value in enumerate(values)} for field, values in self.vocab.items()}
+        sizes = [len(self.vocab[field]) + 1 for field in FIELDS]
+        self.offsets = np.cumsum([0] + sizes[:-1])
+        self.width = int(sum(sizes))
+
+    def codes(self, field, values):
+        index = self.index[field]
+        return np.fromiter((index.get(value, 0) for value in values), dtype=np.int64, count=len(values))
+
+    def encode(self, codes):
+        """(n, 5) array of field codes to an (n, width) float32 one-hot matrix"""
+        features = np.zeros((len(codes), self.width), dtype=np.float32)
+        features[np.arange(len(codes))[:, None], codes + self.offsets] = 1.0
+        return features
+
+
+class CandidateScorer:
+    def __init__(self, model, encoder):
+        self.model = model
+        self.encoder = encoder
+
+    def rank_day(self, section, day, time_slots, pairs):
+        """Candidate (subject, teacher) pairs for each slot of one section-day, best first.
+
+        All slots and pairs are scored with a single batched predict call.
+        """
+        if not time_slots or not pairs:
+            return {time_slot: [] for time_slot in time_slots}
+        n_slots, n_pairs = len(time_slots), len(pairs)
+        codes = np.empty((n_slots * n_pairs, len(FIELDS)), dtype=np.int64)
+        codes[:, 0] = self.encoder.codes("section", [section])[0]
+        codes[:, 1] = self.encoder.codes("day", [day])[0]
+        codes[:, 2] = np.repeat(self.encoder.codes("time_slot", time_slots), n_pairs)
+        codes[:, 3] = np.tile(self.encoder.codes("subject", [subject for subject, _ in pairs]), n_slots)
+        codes[:, 4] = np.tile(self.encoder.codes("teacher", [teacher for _, teacher in pairs]), n_slots)
+        scores = self.model.predict(self.encoder.encode(codes), batch_size=PREDICT_BATCH_SIZE, verbose=0)
+        order = np.argsort(-np.asarray(scores).reshape(n_slots, n_pairs), axis=1, kind="stable")
+        return {time_slot: [pairs[j] for j in order[i]] for i, time_slot in enumerate(time_slots)}
+
+
+def collect_lectures(timetables):
+    """(section, day, time_slot, subject, teacher) for every staffed lecture in nested timetables"""
+    lectures = []
+    for timetable in timetables:
+        for section, days in timetable.items():
+            for day, slots in days.items():
+                for time_slot, content in slots.items():
+                    subject = content.get("subject")
+                    teacher = content.get("teacher")
+                    if not subject or not teacher or teacher in PLACEHOLDERS or "elective_subjects" in content:
+                        continue
+                    lectures.append((section, day, time_slot, subject, teacher))
+    return lectures
+
+
+def load_stored_timetables(db, time_slots=None):
+    from backend_api import Timetable
+    return [load_timetable(raw, time_slots).to_dict() for (raw,) in db.query(Timetable.data).all()]
+
+
+def build_training_set(lectures, seed=0):
+    """Encoder, feature matrix and labels with NEGATIVES_PER_LECTURE sampled negatives per lecture"""
+    vocab = {field: sorted({lecture[i] for lecture in lectures}) for i, field in enumerate(FIELDS)}
+    encoder = FeatureEncoder(vocab)
+    positives = np.column_stack([
+        encoder.codes(field, [lecture[i] for lecture in lectures]) for i, field in enumerate(FIELDS)
+    ])
+
+    pairs = np.unique(positives[:, 3:], axis=0)
+    rng = np.random.default_rng(seed)
+    negatives = np.repeat(positives, NEGATIVES_PER_LECTURE, axis=0)
+    negatives[:, 3:] = pairs[rng.integers(len(pairs), size=len(negatives))]
+    negatives = negatives[(negatives[:, 3:] != np.repeat(positives[:, 3:], NEGATIVES_PER_LECTURE, axis=0)).any(axis=1)]
+
+    codes = np.vstack([positives, negatives])
+    labels = np.concatenate([np.ones(len(positives)), np.zeros(len(negatives))]).astype(np.float32)
+    return encoder, encoder.encode(codes), labels
+
+
+def build_model(width):
+    from tensorflow import keras
+    inputs = keras.Input(shape=(width,))
+    x = keras.layers.Dense(32, activation="relu")(inputs)
+    x = keras.layers.Dense(16, activation="relu")(x)
+    outputs = keras.layers.Dense(1, activation="sigmoid")(x)
+    model = keras.Model(inputs=inputs, outputs=outputs)
+    model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+    return model
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def train_scorer(db, time_slots=None, epochs=TRAINING_EPOCHS):
+    """Train on every stored timetable, save the model and vocabulary, and make it the active scorer"""
+    global _scorer
+    lectures = collect_lectures(load_stored_timetables(db, time_slots))
+    if not lectures:
+        raise ValueError("Cannot train the candidate scorer: no stored timetables with staffed lectures. Generate a timetable first.")
+    encoder, features, labels = build_training_set(lectures)
+
+    model = build_model(encoder.width)
+    history = model.fit(features, labels, epochs=epochs, batch_size=64, shuffle=True, verbose=0)
+    model.save(SCORER_MODEL_PATH)
+    with open(SCORER_VOCAB_PATH, "w") as f:
+        json.dump(encoder.vocab, f)
+
+    with _scorer_lock:
+        _scorer = CandidateScorer(model, encoder)
+    stats = {
+        "lectures": len(lectures),
+        "examples": len(labels),
+        "epochs": epochs,
+        "accuracy": round(float(history.history["accuracy"][-1]), 4),
+        "model_path": SCORER_MODEL_PATH
+    }
+    print(f"Trained candidate scorer on {stats['lectures']} lectures ({stats['examples']} examples), accuracy {stats['accuracy']}")
+    return stats
+
+
+def load_scorer():
+    """The active scorer: cached, else loaded from disk, else trained on the stored timetables"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is not None:
+            return _scorer
+        if os.path.exists(SCORER_MODEL_PATH) and os.path.exists(SCORER_VOCAB_PATH):
+            from tensorflow import keras
+            with open(SCORER_VOCAB_PATH) as f:
+                encoder = FeatureEncoder(json.load(f))
+            _scorer = CandidateScorer(keras.models.load_model(SCORER_MODEL_PATH), encoder)
+            print(f"Loaded candidate scorer from {SCORER_MODEL_PATH}")
+            return _scorer
+
+    from backend_api import SessionLocal, data
+    db = SessionLocal()
+    try:
+        train_scorer(db, data["time_slots"])
+    finally:
+        db.close()
+    return _scorer
@@ -0,0 +1,278 @@
+"""
+In-process Prometheus-style metrics.
+
+A small registry of counters, gauges and histograms rendered in the
+Prometheus text exposition format by /metrics, so a local scraper can read
+it without any external service. Values are per API process; with several
+uvicorn workers each one reports its own series.
+
+Database queries are timed with SQLAlchemy cursor events and attributed to
+the HTTP request that issued them through a context variable.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+GENERATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.label_names, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Gauge set directly or read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """function() returns a number, or a dict of label-value tuples to numbers"""
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            return super().samples()
+        try:
+            value = self._function()
+        except Exception as e:
+            print(f"Metrics gauge {self.name} failed: {e}")
+            return []
+        if isinstance(value, dict):
+            return [(self.name, tuple(map(str, key)), None, v) for key, v in value.items()]
+        return [(self.name, (), None, value)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+            samples.append((f"{self.name}_bucket", key, 'le="+Inf"', count))
+            samples.append((f"{self.name}_sum", key, None, total))
+            samples.append((f"{self.name}_count", key, None, count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to produce the response headers", ("method", "route")))
+HTTP_RESPONSE_BYTES = registry.register(Histogram(
+    "http_response_size_bytes", "Response body size where Content-Length is known", ("route",), SIZE_BUCKETS))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled"))
+
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", (), QUERY_BUCKETS))
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "SQL statements by originating route (none outside requests)", ("route",)))
+DB_QUERY_SECONDS_TOTAL = registry.register(Counter(
+    "db_query_seconds_total", "SQL execution time by originating route", ("route",)))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements issued per request", ("route",), COUNT_BUCKETS))
+
+CACHE_REQUESTS = registry.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")))
+
+GENERATION_SECONDS = registry.register(Histogram(
+    "generation_duration_seconds", "Timetable generation wall time", ("engine",), GENERATION_BUCKETS))
+GENERATION_JOBS = registry.register(Counter(
+    "generation_jobs_total", "Finished background generation jobs by status", ("status",)))
+GENERATION_QUEUE_DEPTH = registry.register(Gauge(
+    "generation_queue_depth", "Pending and running generation tasks across all workers"))
+GENERATION_IN_FLIGHT = registry.register(Gauge(
+    "generation_jobs_in_flight", "Generation jobs submitted by this process and not yet finished"))
+
+TIMETABLE_DOCUMENT_BYTES = registry.register(Histogram(
+    "timetable_document_bytes", "Stored timetable documents and revisions by kind", ("kind",), SIZE_BUCKETS))
+
+CHANGE_FEED_SUBSCRIBERS = registry.register(Gauge(
+    "change_feed_subscribers", "Open /events streams in this process"))
+
+STARTUP_SECONDS = registry.register(Gauge(
+    "process_startup_seconds", "Worker startup time by phase (import, load_data, startup total)", ("phase",)))
+ML_MODULES_LOADED = registry.register(Gauge(
+    "ml_module_loaded", "1 once an ML library has been imported by this process", ("module",)))
+
+
+def cache_lookup(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+_request_stats = contextvars.ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Time every statement on engine and attribute it to the current request"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        DB_QUERY_SECONDS.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is None:
+            DB_QUERIES.inc(route="none")
+            DB_QUERY_SECONDS_TOTAL.inc(elapsed, route="none")
+        else:
+            stats["queries"] += 1
+            stats["seconds"] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+async def observe_request(request, call_next):
+    """HTTP middleware body: latency, status, size and per-request query counts"""
+    stats = {"queries": 0, "seconds": 0.0}
+    token = _request_stats.set(stats)
+    HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    response = None
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        HTTP_IN_FLIGHT.dec()
+        _request_stats.reset(token)
+        route = request.scope.get("route")
+        route = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+        HTTP_LATENCY.observe(elapsed, method=request.method, route=route)
+        DB_QUERIES.inc(stats["queries"], route=route)
+        DB_QUERY_SECONDS_TOTAL.inc(stats["seconds"], route=route)
+        DB_QUERIES_PER_REQUEST.observe(stats["queries"], route=route)
+        length = response.headers.get("content-length") if response is not None else None
+        if length is not None:
+            HTTP_RESPONSE_BYTES.observe(int(length), route=route)
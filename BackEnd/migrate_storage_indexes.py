@@ -0,0 +1,41 @@
+"""
+Migration script to add the lookup indexes declared on the models to an
+existing database (batches by type/semester, sections/subjects/elective groups
+by batch, enrollments by group, dependencies by subject code) and switch it to
+WAL. Safe to run repeatedly: indexes that already exist are skipped. The same
+step is migration 6 in schema_migrations.py.
+Run this script to update the database schema.
+"""
+
+import sys
+
+from backend_api import Base, engine
+from storage import ensure_indexes, storage_settings
+
+def migrate_database():
+    """Create missing indexes and report the effective storage settings."""
+    try:
+        created = ensure_indexes(engine, Base.metadata)
+        if created:
+            for name in created:
+                print(f"Created index {name}")
+        else:
+            print("All indexes already exist, skipping...")
+
+        settings = storage_settings(engine)
+        if settings["dialect"] == "sqlite":
+            print(f"Journal mode: {settings['journal_mode']}, synchronous: {settings['synchronous']}")
+
+        print("\n✅ Migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return False
+
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,70 @@
+"""
+Migration script to add date-range and course columns to the timetables table.
+Adds start_date, end_date, course and semester, backfills start_date/end_date
+from the existing date key and creates the range lookup index. course and
+semester record which course the stored week was generated for; they are not
+part of the key, so lookups are by date range only.
+Run this script to update the database schema.
+"""
+
+from sqlalchemy import create_engine, text
+from datetime import datetime, timedelta
+import sys
+
+DATABASE_URL = "sqlite:///database.db"
+
+def migrate_database():
+    """Add and backfill timetable range columns if they don't exist."""
+    engine = create_engine(DATABASE_URL)
+
+    try:
+        with engine.connect() as conn:
+
+            columns_to_add = [
+                ("start_date", "VARCHAR"),
+                ("end_date", "VARCHAR"),
+                ("course", "VARCHAR"),
+                ("semester", "INTEGER")
+            ]
+
+            for col_name, col_type in columns_to_add:
+                try:
+
+                    conn.execute(text(f"SELECT {col_name} FROM timetables LIMIT 1"))
+                    print(f"Column {col_name} already exists, skipping...")
+                except Exception:
+
+                    print(f"Adding column {col_name}...")
+                    conn.execute(text(f"ALTER TABLE timetables ADD COLUMN {col_name} {col_type}"))
+                    conn.commit()
+                    print(f"Successfully added column {col_name}")
+
+
+            rows = conn.execute(text("SELECT date FROM timetables WHERE start_date IS NULL OR end_date IS NULL")).fetchall()
+            for (date,) in rows:
+                end_date = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
+                conn.execute(
+                    text("UPDATE timetables SET start_date = :start_date, end_date = :end_date WHERE date = :date"),
+                    {"start_date": date, "end_date": end_date, "date": date}
+                )
+            conn.commit()
+            print(f"Backfilled date range for {len(rows)} timetables")
+
+
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_timetables_range ON timetables (start_date, end_date)"))
+            conn.commit()
+            print("Ensured range lookup index")
+
+        print("\n✅ Migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return False
+
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
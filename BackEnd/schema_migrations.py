@@ -0,0 +1,210 @@
+"""
+Versioned schema migrations for SQLite and PostgreSQL.
+
+The one-off migrate_*.py scripts only ran against database.db; their steps are
+ported here as numbered migrations recorded in the schema_migrations table, so
+every database (and every backend node sharing one) is upgraded once, in
+order. Each migration runs in its own transaction and is idempotent: columns
+and indexes that already exist are skipped, so databases created by
+create_all() or patched by the old scripts upgrade cleanly. On PostgreSQL an
+advisory lock keeps two nodes from migrating at the same time.
+
+    python3 schema_migrations.py                      # apply pending migrations
+    python3 schema_migrations.py --status             # list applied and pending
+    python3 schema_migrations.py --copy-from sqlite:///database.db
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, func, inspect, select, text, update
+
+from storage import create_missing_indexes, create_storage_engine
+
+MIGRATION_LOCK_KEY = 4207
+COPY_BATCH = 500
+SEEDED_TABLES = {"scheduling_revision"}
+
+schema_versions = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", Float, nullable=False)
+)
+
+
+def add_missing_columns(conn, table, names):
+    """ALTER TABLE ... ADD COLUMN for each named model column the table lacks (always nullable)"""
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    added = []
+    for name in names:
+        if name in existing:
+            continue
+        column_type = table.c[name].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+        added.append(name)
+    return added
+
+
+def create_tables(conn, metadata):
+    metadata.create_all(bind=conn)
+
+
+def add_teacher_preferences(conn, metadata):
+    add_missing_columns(conn, metadata.tables["teacher_data"],
+                        ["earliest_time", "latest_time", "preferred_days", "preferred_slots", "unavailable_days"])
+
+
+def add_classroom_subjects(conn, metadata):
+    classrooms = metadata.tables["classrooms"]
+    add_missing_columns(conn, classrooms, ["subjects"])
+    conn.execute(update(classrooms).where(classrooms.c.subjects.is_(None)).values(subjects=[]))
+
+
+def add_batch_type(conn, metadata):
+    batches = metadata.tables["batches"]
+    add_missing_columns(conn, batches, ["batch_type"])
+    conn.execute(update(batches).where(batches.c.batch_type.is_(None)).values(batch_type="B.Tech"))
+
+
+def add_timetable_ranges(conn, metadata):
+    timetables = metadata.tables["timetables"]
+    add_missing_columns(conn, timetables, ["start_date", "end_date", "course", "semester"])
+    rows = conn.execute(
+        select(timetables.c.date).where(timetables.c.start_date.is_(None) | timetables.c.end_date.is_(None))
+    ).fetchall()
+    for (date,) in rows:
+        end_date = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=5)).strftime("%Y-%m-%d")
+        conn.execute(update(timetables).where(timetables.c.date == date).values(start_date=date, end_date=end_date))
+
+
+def add_lookup_indexes(conn, metadata):
+    create_missing_indexes(conn, metadata)
+
+
+def add_generation_task_active_key(conn, metadata):
+    add_missing_columns(conn, metadata.tables["generation_tasks"], ["active_key"])
+    create_missing_indexes(conn, metadata)
+
+
+def create_institute_timetables(conn, metadata):
+    metadata.tables["institute_timetables"].create(bind=conn, checkfirst=True)
+    create_missing_indexes(conn, metadata)
+
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "teacher preference columns", add_teacher_preferences),
+    (3, "classroom subjects column", add_classroom_subjects),
+    (4, "batch type column", add_batch_type),
+    (5, "timetable date range and course columns", add_timetable_ranges),
+    (6, "lookup indexes", add_lookup_indexes),
+    (7, "generation task in-flight key", add_generation_task_active_key),
+    (8, "institute timetables table", create_institute_timetables)
+]
+
+
+def lock_migrations(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def applied_versions(conn):
+    schema_versions.create(bind=conn, checkfirst=True)
+    return {row.version: row for row in conn.execute(select(schema_versions))}
+
+
+def upgrade(engine, metadata, target=None):
+    """Apply pending migrations up to target (default: all); returns the versions applied"""
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            lock_migrations(conn)
+            if version in applied_versions(conn):
+                continue
+            migrate(conn, metadata)
+            conn.execute(schema_versions.insert().values(version=version, name=name, applied_at=time.time()))
+        print(f"Applied migration {version}: {name}")
+        applied.append(version)
+    return applied
+
+
+def migration_status(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [
+        {"version": version, "name": name, "applied_at": done[version].applied_at if version in done else None}
+        for version, name, _ in MIGRATIONS
+    ]
+
+
+def copy_database(source_url, engine, metadata):
+    """Copy every row from source_url into the (empty, migrated) database behind engine"""
+    source = create_storage_engine(source_url)
+    copied = {}
+    try:
+        with source.connect() as src, engine.begin() as dst:
+            source_tables = set(inspect(src).get_table_names())
+            for table in metadata.sorted_tables:
+                if table.name not in source_tables:
+                    continue
+                if table.name in SEEDED_TABLES:
+                    dst.execute(table.delete())
+                elif dst.execute(select(func.count()).select_from(table)).scalar():
+                    raise ValueError(f"Target table {table.name} is not empty")
+                source_columns = {column["name"] for column in inspect(src).get_columns(table.name)}
+                columns = [column for column in table.c if column.name in source_columns]
+                result = src.execute(select(*columns))
+                copied[table.name] = 0
+                while True:
+                    rows = [dict(row) for row in result.mappings().fetchmany(COPY_BATCH)]
+                    if not rows:
+                        break
+                    dst.execute(table.insert(), rows)
+                    copied[table.name] += len(rows)
+                if dst.dialect.name == "postgresql":
+                    for column in table.primary_key.columns:
+                        if isinstance(column.type, Integer):
+                            dst.execute(text(
+                                f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column.name}'), "
+                                f"COALESCE((SELECT MAX({column.name}) FROM {table.name}), 0) + 1, false)"
+                            ))
+                print(f"Copied {copied[table.name]} rows into {table.name}")
+    finally:
+        source.dispose()
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations to DATABASE_URL")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--target", type=int, help="stop after this migration version")
+    parser.add_argument("--copy-from", help="after migrating, copy all rows from this database URL")
+    args = parser.parse_args()
+
+    from backend_api import Base, engine
+    try:
+        if args.status:
+            for migration in migration_status(engine):
+                state = "applied" if migration["applied_at"] else "pending"
+                print(f"{migration['version']:>3}  {state:<8} {migration['name']}")
+            return 0
+
+        applied = upgrade(engine, Base.metadata, args.target)
+        print(f"✅ {len(applied)} migration(s) applied" if applied else "✅ Schema is up to date")
+        if args.copy_from:
+            copy_database(args.copy_from, engine, Base.metadata)
+        return 0
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return 1
+
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Dirty tracking and write-behind for the in-memory teacher maps.
+
+teacher_subject_sections, teacher_sections_taught, teacher_availability and
+teacher_lecture_limits are TrackedMaps sharing one DirtySet: assigning,
+deleting or popping a teacher's entry marks that teacher. Edits inside an
+entry (teacher_subject_sections[teacher][subject] = ...) must call mark()
+themselves. A save writes only the marked teachers' TeacherData rows; with
+TEACHER_DATA_FLUSH_DELAY seconds > 0 saves are coalesced and committed
+together by a timer instead of on every edit.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+TEACHER_DATA_FLUSH_DELAY = float(os.environ.get("TEACHER_DATA_FLUSH_DELAY", "0"))
+
+
+class DirtySet:
+    """Teacher names changed since the last flush"""
+
+    def __init__(self):
+        self._names = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def mark(self, *names):
+        if getattr(self._local, "paused", 0):
+            return
+        with self._lock:
+            self._names.update(names)
+
+    def take(self):
+        with self._lock:
+            names, self._names = self._names, set()
+        return names
+
+    def __len__(self):
+        with self._lock:
+            return len(self._names)
+
+    @contextmanager
+    def untracked(self):
+        """Changes made by this thread inside the block are not marked (e.g. loading from the database)"""
+        self._local.paused = getattr(self._local, "paused", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.paused -= 1
+
+
+class TrackedMap(dict):
+    """dict keyed by teacher that marks a key in dirty whenever its entry is replaced or removed"""
+
+    def __init__(self, dirty, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = dirty
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.dirty.mark(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.dirty.mark(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.dirty.mark(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.dirty.mark(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.dirty.mark(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.dirty.mark(*self)
+        super().clear()
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class TeacherDataWriter:
+    """Flushes dirty teachers through write(names), immediately or after flush_delay seconds"""
+
+    def __init__(self, dirty, write, flush_delay=TEACHER_DATA_FLUSH_DELAY):
+        self.dirty = dirty
+        self.write = write
+        self.flush_delay = flush_delay
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def save(self):
+        """Write the dirty rows now, or schedule a coalesced flush when a delay is configured"""
+        if self.flush_delay <= 0:
+            return self.flush()
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        return 0
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Deferred TeacherData flush failed: {e}")
+
+    def flush(self):
+        """Write every dirty teacher's row in one transaction; returns the number of teachers flushed"""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        with self._flush_lock:
+            names = self.dirty.take()
+            if not names:
+                return 0
+            try:
+                self.write(names)
+            except Exception:
+                self.dirty.mark(*names)
+                raise
+            return len(names)
@@ -0,0 +1,65 @@
+from batch_generation import lecture_blocks, merge_course_timetables
+
+TIME_SLOTS = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-1:00"]
+CLASSROOMS = [
+    {"room_number": "CR1", "room_type": "lecture"},
+    {"room_number": "CR2", "room_type": "lecture"},
+    {"room_number": "LAB1", "room_type": "lab"},
+    {"room_number": "LAB2", "room_type": "lab"}
+]
+
+
+def lecture(subject, teacher, room):
+    return {"subject": subject, "teacher": teacher, "room": room}
+
+
+def lab_day(teacher, room):
+    return {
+        "Monday": {
+            "9:00-10:00": lecture("PCS-401", teacher, room),
+            "10:00-11:00": lecture("PCS-401", teacher, room),
+            "11:00-12:00": lecture("TCS-401", "T-core", "CR1")
+        }
+    }
+
+
+def test_lab_hours_form_one_block():
+    slots = lab_day("T1", "LAB1")["Monday"]
+    assert lecture_blocks(slots, TIME_SLOTS) == [["9:00-10:00", "10:00-11:00"], ["11:00-12:00"]]
+
+
+def test_teacher_clash_on_one_lab_hour_drops_the_whole_block():
+    first = {"A": {"Monday": {"10:00-11:00": lecture("TCS-402", "T1", "CR2")}}}
+    second = {"A": lab_day("T1", "LAB1")}
+    merged, conflicts = merge_course_timetables([("BTech", 4, first), ("MCA", 2, second)], CLASSROOMS, TIME_SLOTS)
+
+    assert set(merged["MCA-S2-A"]["Monday"]) == {"11:00-12:00"}
+    assert [c["time_slot"] for c in conflicts["teacher_conflicts"]] == ["9:00-10:00", "10:00-11:00"]
+
+
+def test_room_clash_moves_both_lab_hours_to_one_free_room():
+    first = {"A": {"Monday": {"10:00-11:00": lecture("PCS-402", "T2", "LAB1")}}}
+    second = {"A": lab_day("T1", "LAB1")}
+    merged, conflicts = merge_course_timetables([("BTech", 4, first), ("MCA", 2, second)], CLASSROOMS, TIME_SLOTS)
+
+    monday = merged["MCA-S2-A"]["Monday"]
+    assert monday["9:00-10:00"]["room"] == monday["10:00-11:00"]["room"] == "LAB2"
+    assert {c["reassigned_to"] for c in conflicts["room_conflicts"]} == {"LAB2"}
+
+
+def test_institute_run_does_not_replace_the_course_week():
+    from backend_api import SessionLocal, Timetable, InstituteTimetable, save_timetable_version, save_institute_timetable
+    course_week = {"A": lab_day("T1", "LAB1")}
+    db = SessionLocal()
+    try:
+        save_timetable_version(db, "2030-01-07", course_week, "BTech", 4)
+        course_data = db.get(Timetable, "2030-01-07").data
+
+        merged, conflicts = merge_course_timetables([("BTech", 4, course_week)], CLASSROOMS, TIME_SLOTS)
+        save_institute_timetable(db, "2030-01-07", [("BTech", 4)], merged, conflicts)
+
+        db.expire_all()
+        assert db.get(Timetable, "2030-01-07").data == course_data
+        assert "BTech-S4-A" in db.get(InstituteTimetable, "2030-01-07").data
+    finally:
+        db.close()
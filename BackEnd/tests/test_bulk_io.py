@@ -0,0 +1,36 @@
+import io
+import json
+
+import pytest
+
+from bulk_io import BulkImportError, iter_json_array, iter_records, validate_records
+
+DOCUMENT = '[ {"name": "T1", "courses": ["BTech", "MCA"]}, {"name": "a,]b\\"c", "lecture_limit": 12345},\n{"name": "T3"} ]\n'
+
+
+def parse(document, chunk_size):
+    text = io.StringIO(document)
+    assert text.read(1) == "["
+    return list(iter_json_array(text, chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 4096])
+def test_array_elements_decode_across_chunk_boundaries(chunk_size):
+    assert parse(DOCUMENT, chunk_size) == json.loads(DOCUMENT)
+    assert parse("[ ]", chunk_size) == []
+
+
+def test_first_record_arrives_before_the_body_is_read():
+    body = ("[" + ",".join(json.dumps({"name": f"T{n}"}) for n in range(200000)) + "]").encode()
+    stream = io.BytesIO(body)
+    records = iter_records(stream, "json")
+    assert next(records) == {"name": "T0"}
+    assert stream.tell() < len(body) // 10
+    assert sum(1 for _ in records) == 199999
+
+
+@pytest.mark.parametrize("document", ['[{"name": "T1"}', '[{"name": "T1"} {"name": "T2"}]', '[{"name": }]', '[{"name": "T1"}] trailing'])
+def test_malformed_arrays_are_reported_as_parse_errors(document):
+    with pytest.raises(BulkImportError) as raised:
+        validate_records("teachers", iter_records(io.BytesIO(document.encode()), "json"), "json")
+    assert "Could not parse json" in raised.value.errors[-1]["error"]
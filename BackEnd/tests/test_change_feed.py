@@ -0,0 +1,44 @@
+import asyncio
+
+import backend_api
+from change_feed import ChangeFeed, REPLAY_LIMIT, TEACHER_CHANGED, latest_version, record_event
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+def test_replay_pages_past_the_limit_until_the_feed_version():
+    since = latest_version()
+    with backend_api.engine.begin() as connection:
+        for n in range(2 * REPLAY_LIMIT + 10):
+            record_event(connection, TEACHER_CHANGED, {"teacher": f"T{n}"})
+    feed = ChangeFeed()
+    feed.version = latest_version() - 5
+
+    async def collect():
+        return [chunk async for chunk in feed.stream(DisconnectedRequest(), since)]
+
+    chunks = asyncio.run(collect())
+    replayed = [int(chunk.split("\n")[0][len("id: "):]) for chunk in chunks if chunk.startswith("id: ")]
+    assert replayed == list(range(since + 1, feed.version + 1))
+
+
+def test_poller_drains_a_backlog_in_one_pass():
+    since = latest_version()
+    with backend_api.engine.begin() as connection:
+        for n in range(REPLAY_LIMIT + 1):
+            record_event(connection, TEACHER_CHANGED, {"teacher": f"T{n}"})
+    feed = ChangeFeed(poll_interval=60)
+    feed.version = since
+
+    async def one_poll():
+        queue = feed.subscribe()
+        task = asyncio.create_task(feed._poll())
+        while feed.version < since + REPLAY_LIMIT + 1:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return queue.qsize()
+
+    assert asyncio.run(asyncio.wait_for(one_poll(), timeout=30)) == REPLAY_LIMIT + 1
@@ -0,0 +1,58 @@
+import json
+
+from compact_timetable import COMPACT_FORMAT, CompactTimetable, load_timetable
+
+TIME_SLOTS = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-1:00"]
+
+
+def cell(subject=None, teacher=None, room=None, **extra):
+    return {"subject": subject, "teacher": teacher, "room": room, **extra}
+
+
+TIMETABLE = {
+    "A": {
+        "Monday": {
+            "9:00-10:00": cell("TCS-401", "T1", "CR1"),
+            "10:00-11:00": cell(teacher="T2"),
+            "11:00-12:00": cell(room="LAB1"),
+            "12:00-1:00": cell("Lunch")
+        },
+        "Tuesday": {
+            "9:00-10:00": cell("Elective", "Elective Faculty", None, elective_subjects=["X", "Y"]),
+            "10:00-11:00": cell()
+        }
+    },
+    "B": {
+        "Monday": {"9:00-10:00": cell("TCS-402", "T2", "CR2")},
+        "Tuesday": {}
+    }
+}
+
+
+def test_to_dict_round_trips_every_stored_cell():
+    compact = CompactTimetable.from_dict(TIMETABLE, time_slots=TIME_SLOTS)
+    assert compact.to_dict() == TIMETABLE
+
+
+def test_payload_round_trip_keeps_partial_cells():
+    compact = CompactTimetable.from_dict(TIMETABLE, time_slots=TIME_SLOTS)
+    raw = compact.to_json()
+    assert json.loads(raw)["format"] == COMPACT_FORMAT
+    assert load_timetable(raw).to_dict() == TIMETABLE
+
+
+def test_get_slot_returns_teacher_only_cell_and_none_for_unset():
+    compact = CompactTimetable.from_dict(TIMETABLE, time_slots=TIME_SLOTS)
+    assert compact.get_slot("A", "Monday", "10:00-11:00") == cell(teacher="T2")
+    assert compact.get_slot("A", "Tuesday", "10:00-11:00") == cell()
+    assert compact.get_slot("B", "Monday", "10:00-11:00") is None
+
+
+def test_overwriting_a_cell_clears_its_extras():
+    compact = CompactTimetable.from_dict(TIMETABLE, time_slots=TIME_SLOTS)
+    compact.set_slot("A", "Tuesday", "9:00-10:00", cell("TCS-403", "T3", "CR1"))
+    assert compact.get_slot("A", "Tuesday", "9:00-10:00") == cell("TCS-403", "T3", "CR1")
+
+
+def test_legacy_nested_json_loads():
+    assert load_timetable(json.dumps(TIMETABLE), TIME_SLOTS).to_dict() == TIMETABLE
@@ -0,0 +1,78 @@
+import random
+
+import ai_timetable_model as model
+import batch_generation
+from ai_timetable_model import OccupancyIndex
+from csp_solver import TimetableCSP, BacktrackingSearch
+
+DAYS = ["Monday"]
+SLOT = "9:00-10:00"
+
+
+def lecture_room(number, capacity=60):
+    return {"room_number": number, "room_type": "lecture", "capacity": capacity}
+
+
+def build_csp(monkeypatch, sections, classrooms, teachers):
+    """One lecture subject per teacher, each teacher teaching every section"""
+    monkeypatch.setattr(model, "subject_teacher_mapping", {f"S-{t}": [t] for t in teachers})
+    timetable = {section: {day: {} for day in DAYS} for section in sections}
+    occupancy = OccupancyIndex(sections, DAYS, model.data["time_slots"], teachers)
+    teacher_subject_sections = {t: {f"S-{t}": list(sections)} for t in teachers}
+    return TimetableCSP(
+        timetable, sections, DAYS, classrooms, occupancy, {},
+        teacher_subject_sections, {}, {}, {}, {}, random.Random(1)
+    )
+
+
+def test_lecture_is_never_committed_without_a_room(monkeypatch):
+    csp = build_csp(monkeypatch, ["A", "B"], [lecture_room("CR1")], ["T1", "T2"])
+    variables = [csp.add_cell_variable(section, "Monday", SLOT, ["S-T1", "S-T2"]) for section in ["A", "B"]]
+    search = BacktrackingSearch(csp, variables).run()
+
+    placed = [csp.timetable[section]["Monday"][SLOT] for section in ["A", "B"] if SLOT in csp.timetable[section]["Monday"]]
+    assert [cell["room"] for cell in placed] == ["CR1"]
+    assert search.skipped == 1
+
+
+def test_subjects_without_a_fitting_room_are_pruned_up_front(monkeypatch):
+    csp = build_csp(monkeypatch, ["A"], [lecture_room("CR1", capacity=20)], ["T1"])
+    assert csp.add_cell_variable("A", "Monday", SLOT, ["S-T1"]) is None
+    assert csp.add_lab_variables("A", "S-T1") == []
+
+
+def test_no_configured_classrooms_leaves_rooms_empty_like_the_greedy_engine(monkeypatch):
+    csp = build_csp(monkeypatch, ["A", "B"], [], ["T1", "T2"])
+    variables = [csp.add_cell_variable(section, "Monday", SLOT, ["S-T1", "S-T2"]) for section in ["A", "B"]]
+    BacktrackingSearch(csp, variables).run()
+    assert [csp.timetable[section]["Monday"][SLOT]["room"] for section in ["A", "B"]] == [None, None]
+
+
+def test_selection_does_not_rescan_every_variable(monkeypatch):
+    teachers = [f"T{i}" for i in range(40)]
+    sections = [f"S{i}" for i in range(40)]
+    csp = build_csp(monkeypatch, sections, [], teachers)
+    variables = [csp.add_cell_variable(section, "Monday", SLOT, [f"S-{t}"]) for section, t in zip(sections, teachers)]
+
+    calls = []
+    is_active = csp.is_active
+    monkeypatch.setattr(csp, "is_active", lambda var: calls.append(var) or is_active(var))
+    BacktrackingSearch(csp, variables).run()
+
+    assert all(SLOT in csp.timetable[section]["Monday"] for section in sections)
+    assert len(calls) <= 2 * len(variables)
+
+
+def test_generate_all_passes_the_engine_to_every_course():
+    class RecordingJobs:
+        def __init__(self):
+            self.calls = []
+
+        def map(self, fn, *iterables):
+            self.calls = list(zip(*iterables))
+            return [(course, semester, {}) for course, semester, *_ in self.calls]
+
+    jobs = RecordingJobs()
+    combinations = [("BTech", 4), ("MCA", 2)]
+    batch_generation.generate_institute_timetables("2025-01-06", combinations, {"classrooms": []}, jobs, engine="csp")
+    assert [args[-1] for args in jobs.calls] == ["csp", "csp"]
@@ -0,0 +1,94 @@
+import os
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from generation_jobs import GenerationJobManager, update_task
+
+
+@pytest.fixture
+def tasks():
+    from backend_api import SessionLocal, GenerationTask
+    db = SessionLocal()
+    db.query(GenerationTask).delete()
+    db.commit()
+    db.close()
+    yield
+
+
+def test_pool_is_replaced_after_a_worker_crash():
+    manager = GenerationJobManager(max_workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            manager.submit_call(os._exit, 1).result(timeout=60)
+        assert manager.submit_call(abs, -3).result(timeout=60) == 3
+    finally:
+        manager.shutdown()
+
+
+def test_identical_requests_share_one_task_across_managers(tasks):
+    first, second = GenerationJobManager(), GenerationJobManager()
+    task_id, deduplicated = first.claim("BTech|4|2025-01-06")
+    assert not deduplicated
+    assert second.claim("BTech|4|2025-01-06") == (task_id, True)
+    assert second.claim("MCA|2|2025-01-06")[1] is False
+
+
+def test_finished_task_releases_its_key(tasks):
+    manager = GenerationJobManager()
+    task_id, _ = manager.claim("BTech|4|2025-01-13")
+    update_task(task_id, status="completed", progress=100)
+    new_id, deduplicated = manager.claim("BTech|4|2025-01-13")
+    assert not deduplicated and new_id != task_id
+    assert manager.get(task_id)["status"] == "completed"
+
+
+def add_task(task_id, status, updated_at, key=None):
+    from backend_api import SessionLocal, GenerationTask
+    db = SessionLocal()
+    db.add(GenerationTask(
+        id=task_id, dedup_key=key or task_id, active_key=key if status in ("pending", "running") else None,
+        status=status, progress=0, created_at=updated_at, updated_at=updated_at
+    ))
+    db.commit()
+    db.close()
+
+
+def test_stale_active_task_releases_its_key(tasks):
+    add_task("dead", "running", time.time() - 600, key="BTech|4|2025-01-20")
+    manager = GenerationJobManager(stale_seconds=120)
+
+    task_id, deduplicated = manager.claim("BTech|4|2025-01-20")
+
+    assert not deduplicated and task_id != "dead"
+    assert manager.get("dead")["status"] == "failed"
+
+
+def test_eviction_keeps_active_tasks_and_drops_old_finished_ones(tasks):
+    old = time.time() - 7200
+    add_task("queued", "pending", old, key="MCA|2|2025-01-20")
+    add_task("done", "completed", old)
+    manager = GenerationJobManager(ttl_seconds=3600)
+
+    manager.evict_expired()
+
+    assert manager.get("queued")["status"] == "pending"
+    assert manager.get("done") is None
+
+
+def test_heartbeat_keeps_live_tasks_fresh(tasks):
+    from backend_api import SessionLocal, GenerationTask
+    add_task("live", "pending", time.time() - 600, key="BTech|4|2025-01-27")
+    manager = GenerationJobManager(heartbeat_seconds=0.05, stale_seconds=120)
+    manager._futures["live"] = Future()
+    try:
+        manager._start_heartbeat()
+        time.sleep(0.5)
+        assert manager.claim("BTech|4|2025-01-27") == ("live", True)
+    finally:
+        manager.shutdown()
+    db = SessionLocal()
+    assert db.get(GenerationTask, "live").updated_at > time.time() - 60
+    db.close()
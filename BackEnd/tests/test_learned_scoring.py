@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+import backend_api
+import learned_scoring
+
+
+@pytest.mark.parametrize("error, status", [
+    (ValueError("Cannot train the candidate scorer: no stored timetables"), 400),
+    (ImportError("No module named 'tensorflow'"), 503)
+])
+def test_learned_engine_failures_map_to_error_responses(monkeypatch, error, status):
+    def load_scorer():
+        raise error
+    monkeypatch.setattr(learned_scoring, "load_scorer", load_scorer)
+
+    response = backend_api.learned_scorer_error("learned")
+
+    assert response.status_code == status
+    assert str(error) in json.loads(response.body)["error"]
+    assert backend_api.learned_scorer_error("greedy") is None
@@ -0,0 +1,175 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import Session
+
+from backend_api import Base, ChangeEvent, TeacherData, Timetable
+from compact_timetable import COMPACT_FORMAT, CompactTimetable, load_timetable
+from schema_migrations import MIGRATIONS, copy_database, lock_migrations, migration_status, schema_versions, upgrade
+from storage import create_storage_engine, normalize_database_url
+
+ALL_VERSIONS = [version for version, _, _ in MIGRATIONS]
+TIMETABLE = {"A": {"Monday": {"9:00-10:00": {"subject": "TCS-401", "teacher": "T1", "room": "CR1"}}}}
+
+
+def schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted((column["name"], str(column["type"])) for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table))
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def store_rows(engine):
+    with Session(engine) as db:
+        db.add(Timetable(
+            date="2025-01-06", start_date="2025-01-06", end_date="2025-01-11", course="BTech", semester=4,
+            data=CompactTimetable.from_dict(TIMETABLE).to_json()
+        ))
+        db.add(TeacherData(id="T1", subject_sections={"TCS-401": ["A", "B"]}, sections_taught=["A"], availability=False))
+        db.add(ChangeEvent(kind="timetable_stored", payload='{"dates": ["2025-01-06"]}', created_at=1.0))
+        db.commit()
+
+
+def check_rows(engine):
+    with Session(engine) as db:
+        stored = db.get(Timetable, "2025-01-06")
+        assert isinstance(stored.data, str)
+        assert load_timetable(stored.data).to_dict() == TIMETABLE
+        teacher = db.get(TeacherData, "T1")
+        assert (teacher.subject_sections, teacher.sections_taught, teacher.availability) == ({"TCS-401": ["A", "B"]}, ["A"], False)
+
+
+def sqlite_source(tmp_path):
+    url = f"sqlite:///{tmp_path / 'source.db'}"
+    engine = create_storage_engine(url)
+    upgrade(engine, Base.metadata)
+    store_rows(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.mark.parametrize("url", [
+    "postgres://timetable:s3cret@db:5432/timetable",
+    "postgresql://timetable:s3cret@db/timetable",
+    "postgresql+psycopg://timetable@db/timetable",
+    "sqlite:///database.db"
+])
+def test_normalize_database_url_is_idempotent(url):
+    normalized = normalize_database_url(url)
+    assert normalize_database_url(normalized) == normalized
+    assert normalized.startswith("postgresql+psycopg://") or normalized == url
+    assert "s3cret" in normalized or "s3cret" not in url
+
+
+def test_sqlite_migrations_can_be_reapplied_without_changes(tmp_path):
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    try:
+        assert upgrade(engine, Base.metadata) == ALL_VERSIONS
+        migrated = schema(engine)
+
+        assert upgrade(engine, Base.metadata) == []
+        with engine.begin() as conn:
+            for _, _, migrate in MIGRATIONS:
+                migrate(conn, Base.metadata)
+        assert schema(engine) == migrated
+        assert all(migration["applied_at"] for migration in migration_status(engine))
+    finally:
+        engine.dispose()
+
+
+def test_sqlite_legacy_timetables_are_upgraded(tmp_path):
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE timetables (date VARCHAR PRIMARY KEY, data TEXT NOT NULL)"))
+            conn.execute(text("INSERT INTO timetables (date, data) VALUES ('2025-01-06', '{}')"))
+        upgrade(engine, Base.metadata)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT start_date, end_date FROM timetables")).one() == ("2025-01-06", "2025-01-11")
+        assert "ix_timetables_range" in schema(engine)["timetables"][1]
+    finally:
+        engine.dispose()
+
+
+def test_copy_from_sqlite_into_a_migrated_database(tmp_path):
+    source_url = sqlite_source(tmp_path)
+    target = create_storage_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    try:
+        upgrade(target, Base.metadata)
+        copied = copy_database(source_url, target, Base.metadata)
+        assert (copied["timetables"], copied["teacher_data"], copied["change_events"]) == (1, 1, 1)
+        check_rows(target)
+        with pytest.raises(ValueError, match="not empty"):
+            copy_database(source_url, target, Base.metadata)
+    finally:
+        target.dispose()
+
+
+@pytest.fixture
+def postgres():
+    """Engine for TEST_DATABASE_URL with every table dropped before and after; skipped when unset"""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    pytest.importorskip("psycopg")
+    engine = create_storage_engine(url)
+    if engine.dialect.name != "postgresql":
+        pytest.skip("TEST_DATABASE_URL is not a PostgreSQL URL")
+
+    def reset():
+        Base.metadata.drop_all(engine)
+        schema_versions.drop(engine, checkfirst=True)
+
+    reset()
+    yield engine
+    reset()
+    engine.dispose()
+
+
+def test_postgres_migrations_use_jsonb_and_can_be_reapplied(postgres):
+    assert upgrade(postgres, Base.metadata) == ALL_VERSIONS
+    migrated = schema(postgres)
+    assert upgrade(postgres, Base.metadata) == []
+    assert schema(postgres) == migrated
+    columns = {column["name"]: str(column["type"]) for column in inspect(postgres).get_columns("timetables")}
+    assert columns["data"] == "JSONB"
+    columns = {column["name"]: str(column["type"]) for column in inspect(postgres).get_columns("teacher_data")}
+    assert columns["subject_sections"] == columns["availability"] == "JSONB"
+
+
+def test_postgres_timetable_round_trip(postgres):
+    upgrade(postgres, Base.metadata)
+    store_rows(postgres)
+    check_rows(postgres)
+    with postgres.connect() as conn:
+        assert conn.execute(text("SELECT data->>'format' FROM timetables")).scalar() == COMPACT_FORMAT
+
+
+def test_postgres_advisory_lock_serializes_migrations(postgres):
+    applied = []
+    with postgres.connect() as holder:
+        transaction = holder.begin()
+        lock_migrations(holder)
+        runner = threading.Thread(target=lambda: applied.append(upgrade(postgres, Base.metadata)))
+        runner.start()
+        runner.join(1.0)
+        assert runner.is_alive() and not applied
+        transaction.rollback()
+    runner.join(60)
+    assert applied == [ALL_VERSIONS]
+
+
+def test_postgres_copy_from_sqlite(postgres, tmp_path):
+    upgrade(postgres, Base.metadata)
+    copy_database(sqlite_source(tmp_path), postgres, Base.metadata)
+    check_rows(postgres)
+    with Session(postgres) as db:
+        db.add(ChangeEvent(kind="teacher_changed", payload="{}", created_at=2.0))
+        db.commit()
+        assert db.scalars(select(ChangeEvent.id).order_by(ChangeEvent.id)).all() == [1, 2]
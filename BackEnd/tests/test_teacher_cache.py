@@ -0,0 +1,24 @@
+import backend_api
+
+
+def test_refresh_loads_stored_availability_without_marking_teachers_dirty():
+    db = backend_api.SessionLocal()
+    try:
+        db.add(backend_api.Teacher(id="cache-T1", name="cache-T1", is_active=True))
+        db.add(backend_api.Teacher(id="cache-T2", name="cache-T2", is_active=True))
+        backend_api.write_teacher_data(db, [
+            {**backend_api.default_teacher_data("cache-T1"), "availability": False, "lecture_limit": 3},
+            backend_api.default_teacher_data("cache-T2")
+        ])
+        db.commit()
+    finally:
+        db.close()
+    backend_api.teacher_availability["cache-T1"] = True
+    backend_api.teacher_changes.take()
+
+    backend_api.refresh_teacher_cache()
+
+    assert backend_api.teacher_availability["cache-T1"] is False
+    assert backend_api.teacher_availability["cache-T2"] is True
+    assert backend_api.teacher_lecture_limits["cache-T1"] == 3
+    assert not backend_api.teacher_changes.take()
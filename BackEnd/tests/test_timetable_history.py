@@ -0,0 +1,78 @@
+import copy
+
+import backend_api
+import timetable_history
+from compact_timetable import CompactTimetable
+from timetable_history import BASE, DELTA, apply_delta, diff_timetables, list_revisions, load_revision
+
+SLOTS = ["8:00-9:00", "9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00"]
+EMPTY = {"set": [], "clear": []}
+
+
+def normalized(timetable):
+    """Compact documents give every section the same days, so compare through one"""
+    return CompactTimetable.from_dict(timetable).to_dict()
+
+
+def week():
+    return {
+        section: {
+            day: {ts: {"subject": f"TCS-40{n % 4 + 1}", "teacher": f"T{n % 7}", "room": f"CR{n % 3}"} for n, ts in enumerate(SLOTS)}
+            for day in ["Monday", "Tuesday"]
+        }
+        for section in "ABCD"
+    }
+
+
+def edit(timetable, n):
+    """Replace one cell, clear another and fill a new one"""
+    timetable = copy.deepcopy(timetable)
+    timetable["A"]["Monday"][SLOTS[n % 5]] = {"subject": "TCS-409", "teacher": f"T-new{n}", "room": "CR9"}
+    timetable["B"]["Tuesday"].pop(SLOTS[n % 5], None)
+    timetable["C"].setdefault("Wednesday", {})[SLOTS[n % 5]] = {"subject": "Lunch", "teacher": None, "room": None}
+    return timetable
+
+
+def test_apply_delta_replaces_clears_and_sets_cells():
+    old = week()
+    new = edit(old, 1)
+    assert apply_delta(copy.deepcopy(old), diff_timetables(old, new)) == new
+
+
+def test_every_revision_rebuilds_across_a_rebase(monkeypatch):
+    monkeypatch.setattr(timetable_history, "REBASE_INTERVAL", 3)
+    date = "2036-01-07"
+    versions = [week()]
+    for n in range(1, 6):
+        versions.append(edit(versions[-1], n))
+    db = backend_api.SessionLocal()
+    try:
+        for timetable in versions:
+            backend_api.save_timetable_version(db, date, timetable)
+
+        assert [r["kind"] for r in list_revisions(db, date)] == [BASE, DELTA, DELTA, BASE, DELTA, DELTA]
+        for version, timetable in enumerate(versions, start=1):
+            assert normalized(load_revision(db, date, version, backend_api.data["time_slots"])) == normalized(timetable)
+    finally:
+        db.close()
+
+
+def test_diff_defaults_with_one_revision_and_with_none():
+    db = backend_api.SessionLocal()
+    try:
+        backend_api.save_timetable_version(db, "2036-02-04", week())
+        db.add(backend_api.Timetable(
+            date="2036-02-11", start_date="2036-02-11", end_date="2036-02-16",
+            data=CompactTimetable.from_dict(week()).to_json()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    single = backend_api.get_timetable_diff("2036-02-04", None, None)
+    assert (single["from"], single["to"], single["changes"]) == (None, 1, EMPTY)
+    assert backend_api.get_timetable_diff("2036-02-04", 1, 1)["changes"] == EMPTY
+
+    unversioned = backend_api.get_timetable_diff("2036-02-11", None, None)
+    assert (unversioned["from"], unversioned["to"], unversioned["changes"]) == (None, 0, EMPTY)
+    assert "No revisions" in backend_api.get_timetable_diff("2036-02-11", 1, None)["error"]
@@ -0,0 +1,60 @@
+import backend_api
+from ai_timetable_model import MORNING_SLOTS
+from timetable_repair import repair_timetable
+
+
+def lecture(subject, teacher, room=None):
+    return {"subject": subject, "teacher": teacher, "room": room}
+
+
+def full_week(first):
+    """Every morning slot of Monday and Tuesday filled; first opens Monday"""
+    week = {"Monday": {}, "Tuesday": {}}
+    n = 0
+    for day in week:
+        for time_slot in MORNING_SLOTS:
+            week[day][time_slot] = lecture(f"TCS-40{n % 4 + 2}", f"T{n + 2}", f"CR{n}")
+            n += 1
+    week["Monday"][MORNING_SLOTS[0]] = first
+    return week
+
+
+def test_swap_uses_a_lecture_from_another_day():
+    timetable = {"A": full_week(lecture("TCS-401", "T1", "CR-T1"))}
+    displaced = timetable["A"]["Tuesday"][MORNING_SLOTS[0]]
+    preferences = {"T1": {"unavailable_days": ["Monday"]}}
+
+    timetable, report = repair_timetable(
+        timetable, "T1", {"TCS-401": ["T1"]}, {"T1": {"TCS-401": ["A"]}}, {}, {"T1": True}, preferences, []
+    )
+
+    assert report["unplaced"] == []
+    assert report["changes"][0]["action"] == "swapped"
+    assert report["changes"][0]["to_day"] == "Tuesday"
+    assert timetable["A"]["Tuesday"][MORNING_SLOTS[0]]["teacher"] == "T1"
+    assert timetable["A"]["Monday"][MORNING_SLOTS[0]]["teacher"] == displaced["teacher"]
+
+
+def test_every_week_from_today_on_is_repaired(monkeypatch):
+    monkeypatch.setattr(backend_api, "teacher_availability", {"T1": False})
+    monkeypatch.setattr(backend_api, "teacher_subject_sections", {"T1": {"TCS-401": ["A"]}})
+    weeks = ["2040-12-24", "2041-01-07", "2041-01-14"]
+    db = backend_api.SessionLocal()
+    try:
+        for start_date in weeks:
+            backend_api.save_timetable_version(db, start_date, {"A": full_week(lecture("TCS-401", "T1"))}, "BTech", 4)
+        past = db.get(backend_api.Timetable, weeks[0]).data
+
+        timetable, report = backend_api.repair_stored_timetable("T1", date="2041-01-01")
+
+        db.expire_all()
+        assert db.get(backend_api.Timetable, weeks[0]).data == past
+        assert [week["date"] for week in report["weeks"]] == weeks[1:]
+        assert report["invalidated"] == 2
+        assert {cell["date"] for cell in report["unplaced"]} == set(weeks[1:])
+        for start_date in weeks[1:]:
+            stored = backend_api.load_timetable(db.get(backend_api.Timetable, start_date).data).to_dict()
+            assert MORNING_SLOTS[0] not in stored["A"]["Monday"]
+        assert MORNING_SLOTS[0] not in timetable["A"]["Monday"]
+    finally:
+        db.close()
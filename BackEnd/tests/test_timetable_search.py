@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import timetable_search
+from batch_generation import generate_course_timetable
+
+TIME_SLOTS = ["9:00-10:00", "10:00-11:00"]
+SNAPSHOT = {
+    "teacher_preferences": {},
+    "subject_dependencies": {},
+    "state": {"teacher_subject_sections": {"T1": {}}}
+}
+
+
+class ThreadJobs:
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit_call(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+
+def slow_generation(delay, calls):
+    def generate(course, semester, start_date, snapshot, seed=None, engine="greedy", deadline=None):
+        if deadline is not None and time.time() >= deadline:
+            calls.append(("skipped", seed))
+            return course, semester, None
+        calls.append(("ran", seed))
+        time.sleep(delay)
+        return course, semester, {"A": {"Monday": {"9:00-10:00": {"subject": "S", "teacher": "T1", "room": None}}}}
+    return generate
+
+
+def test_waits_without_spinning_after_the_deadline(monkeypatch):
+    calls = []
+    monkeypatch.setattr(timetable_search, "generate_course_timetable", slow_generation(0.3, calls))
+    jobs = ThreadJobs(workers=1)
+    cpu_started = time.process_time()
+
+    best, report = timetable_search.search_best_timetable(
+        "2025-01-06", "BTech", 4, SNAPSHOT, TIME_SLOTS, restarts=4, time_budget=0.01, seed=1, job_manager=jobs
+    )
+
+    assert best is not None and report["restarts_completed"] == 1
+    assert time.process_time() - cpu_started < 0.2
+    jobs.executor.shutdown(wait=True)
+    assert calls[0] == ("ran", 1)
+    assert all(state == "skipped" for state, _ in calls[1:])
+
+
+def test_restarts_are_capped(monkeypatch):
+    monkeypatch.setattr(timetable_search, "generate_course_timetable", slow_generation(0, []))
+    monkeypatch.setattr(timetable_search, "MAX_RESTARTS", 3)
+    _, report = timetable_search.search_best_timetable("2025-01-06", "BTech", 4, SNAPSHOT, TIME_SLOTS, restarts=1000, seed=1)
+    assert report["restarts_requested"] == 3
+
+
+def test_restart_started_after_its_deadline_is_skipped():
+    assert generate_course_timetable("BTech", 4, "2025-01-06", SNAPSHOT, 1, "greedy", time.time() - 1) == ("BTech", 4, None)
+
+
+def test_preferred_slot_misses_cost_less_than_hard_violations():
+    prefs = {"T1": {"preferred_slots": ["10:00-11:00"], "unavailable_days": ["Tuesday"]}}
+    timetable = {"A": {
+        "Monday": {"9:00-10:00": {"subject": "S", "teacher": "T1", "room": None}},
+        "Tuesday": {"10:00-11:00": {"subject": "S", "teacher": "T1", "room": None}}
+    }}
+    _, breakdown = timetable_search.score_timetable(timetable, TIME_SLOTS, prefs)
+    assert (breakdown["preference_violations"], breakdown["preference_misses"]) == (1, 1)
+    assert timetable_search.SCORE_WEIGHTS["preference_misses"] < timetable_search.SCORE_WEIGHTS["preference_violations"]
+
+
+def test_restart_winner_updates_sections_taught(monkeypatch):
+    import backend_api
+    from generation_profile import GenerationProfile
+    winner = {"A": {"Monday": {"9:00-10:00": {"subject": "S", "teacher": "search-T1", "room": None}}}}
+    monkeypatch.setattr(backend_api, "build_scheduling_snapshot", lambda: SNAPSHOT)
+    monkeypatch.setattr(backend_api, "search_best_timetable", lambda *args, **kwargs: (winner, {"score": 0}))
+    backend_api.teacher_sections_taught["search-T1"] = ["B"]
+
+    profile = GenerationProfile()
+    assert backend_api.run_scheduler(profile, None, "2025-01-06", "BTech", 4, restarts=2) is winner
+    assert backend_api.teacher_sections_taught["search-T1"] == ["A"]
+    assert "search-T1" in backend_api.teacher_changes.take()
+    with backend_api.teacher_changes.untracked():
+        del backend_api.teacher_sections_taught["search-T1"]
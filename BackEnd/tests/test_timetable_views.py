@@ -0,0 +1,65 @@
+from sqlalchemy import event
+
+import backend_api
+from compact_timetable import CompactTimetable
+from timetable_views import TimetableViewCache
+
+TIMETABLE = {"A": {"Monday": {"9:00-10:00": {"subject": "TCS-401", "teacher": "T1", "room": "CR1"}}}}
+
+
+def test_document_is_loaded_only_on_a_miss():
+    raw = CompactTimetable.from_dict(TIMETABLE).to_json()
+    loads = []
+    load = lambda: loads.append(1) or raw
+    cache = TimetableViewCache()
+
+    first = cache.get("2025-01-06", "2025-01-11", load, revision=1)
+    assert cache.get("2025-01-06", "2025-01-11", load, revision=1) is first
+    assert len(loads) == 1
+    assert cache.get("2025-01-06", "2025-01-11", load, revision=2) is not first
+    assert len(loads) == 2
+
+
+def test_revalidation_does_not_read_the_stored_document():
+    db = backend_api.SessionLocal()
+    statements = []
+    capture = lambda conn, cursor, statement, *args: statements.append(statement)
+    try:
+        backend_api.save_timetable_version(db, "2035-01-08", TIMETABLE)
+        backend_api.find_timetable_views(db, "2035-01-09").full()
+
+        event.listen(backend_api.engine, "before_cursor_execute", capture)
+        etag, _ = backend_api.find_timetable_views(db, "2035-01-09").full()
+        response = backend_api.cached_json_response(etag, b"", etag)
+    finally:
+        event.remove(backend_api.engine, "before_cursor_execute", capture)
+        db.close()
+
+    assert response.status_code == 304
+    assert statements and not any("timetables.data" in statement for statement in statements)
+
+
+def test_room_analytics_reload_only_for_a_new_revision():
+    clash = {"A": TIMETABLE["A"], "B": TIMETABLE["A"]}
+    db = backend_api.SessionLocal()
+    try:
+        backend_api.save_timetable_version(db, "2099-01-05", TIMETABLE)
+    finally:
+        db.close()
+    assert backend_api.get_room_conflicts() == {"conflicts": []}
+
+    statements = []
+    capture = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(backend_api.engine, "before_cursor_execute", capture)
+    try:
+        backend_api.get_room_conflicts()
+    finally:
+        event.remove(backend_api.engine, "before_cursor_execute", capture)
+    assert statements and not any("timetables.data" in statement for statement in statements)
+
+    db = backend_api.SessionLocal()
+    try:
+        backend_api.save_timetable_version(db, "2099-01-05", clash)
+    finally:
+        db.close()
+    assert len(backend_api.get_room_conflicts()["conflicts"]) == 1
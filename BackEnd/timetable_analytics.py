@@ -0,0 +1,65 @@
+"""
+Whole-array analytics over CompactTimetable instances.
+"""
+import numpy as np
+from compact_timetable import EMPTY
+
+
+def analyze_rooms(compact):
+    """Group every booked cell by (room, day, slot) in one sweep.
+
+    Returns per-room used slot counts, per-room schedules and the list of
+    double-booked (day, time_slot, room) cells.
+    """
+    n_days = len(compact.days)
+    n_slots = len(compact.time_slots)
+
+    sec_idx, day_idx, slot_idx = np.nonzero(compact.rooms != EMPTY)
+    room_ids = compact.rooms[sec_idx, day_idx, slot_idx]
+    subject_ids = compact.subjects[sec_idx, day_idx, slot_idx]
+    teacher_ids = compact.teachers[sec_idx, day_idx, slot_idx]
+
+    used_slots = {}
+    if room_ids.size:
+        present, counts = np.unique(room_ids, return_counts=True)
+        used_slots = {compact.name_of(r): int(c) for r, c in zip(present, counts)}
+
+
+    schedules = {}
+    order = np.argsort(room_ids, kind="stable")
+    for n in order:
+        room = compact.name_of(room_ids[n])
+        day = compact.days[day_idx[n]]
+        schedules.setdefault(room, {}).setdefault(day, []).append({
+            "time_slot": compact.time_slots[slot_idx[n]],
+            "section": compact.sections[sec_idx[n]],
+            "subject": compact.name_of(subject_ids[n]),
+            "teacher": compact.name_of(teacher_ids[n])
+        })
+
+    conflicts = []
+    if room_ids.size:
+        keys = (room_ids.astype(np.int64) * n_days + day_idx) * n_slots + slot_idx
+        _, first_seen, group, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+        clashing = np.flatnonzero(counts > 1)
+        if clashing.size:
+            members = np.argsort(group, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            for g in clashing[np.argsort(first_seen[clashing])]:
+                cells = members[starts[g]:starts[g] + counts[g]]
+                n = cells[0]
+                conflicts.append({
+                    "day": compact.days[day_idx[n]],
+                    "time_slot": compact.time_slots[slot_idx[n]],
+                    "room": compact.name_of(room_ids[n]),
+                    "conflicting_classes": [
+                        {
+                            "section": compact.sections[sec_idx[c]],
+                            "subject": compact.name_of(subject_ids[c]),
+                            "teacher": compact.name_of(teacher_ids[c])
+                        }
+                        for c in cells
+                    ]
+                })
+
+    return {"used_slots": used_slots, "schedules": schedules, "conflicts": conflicts}
@@ -0,0 +1,160 @@
+"""
+Versioned timetable history.
+
+Every stored timetable keeps its revisions in the timetable_revisions table.
+A revision is either a full compact base document or a slot-level delta
+against the previous revision; a new base is written every REBASE_INTERVAL
+versions, or whenever the delta would be larger than the full document, so
+rebuilding any version replays a bounded number of deltas.
+Regenerations that change nothing write no revision at all. The full head
+document stays in the timetables table and is rewritten on every change, so
+reads never replay deltas; history is kept alongside it, not instead of it.
+"""
+import json
+import os
+import time
+
+from compact_timetable import CompactTimetable, load_timetable
+from metrics import TIMETABLE_DOCUMENT_BYTES
+
+REBASE_INTERVAL = int(os.environ.get("TIMETABLE_REBASE_INTERVAL", "20"))
+
+BASE = "base"
+DELTA = "delta"
+
+
+def diff_timetables(old, new):
+    """Slot-level delta turning nested timetable old into new"""
+    changes = {"set": [], "clear": []}
+    for section, days in new.items():
+        old_days = old.get(section, {})
+        for day, slots in days.items():
+            old_slots = old_days.get(day, {})
+            for time_slot, content in slots.items():
+                if old_slots.get(time_slot) != content:
+                    changes["set"].append([section, day, time_slot, content])
+    for section, days in old.items():
+        new_days = new.get(section, {})
+        for day, slots in days.items():
+            new_slots = new_days.get(day, {})
+            for time_slot in slots:
+                if time_slot not in new_slots:
+                    changes["clear"].append([section, day, time_slot])
+    return changes
+
+
+def is_empty_delta(changes):
+    return not changes["set"] and not changes["clear"]
+
+
+def apply_delta(timetable, changes):
+    """Apply a delta from diff_timetables in place and return timetable"""
+    for section, day, time_slot in changes["clear"]:
+        timetable.get(section, {}).get(day, {}).pop(time_slot, None)
+    for section, day, time_slot, content in changes["set"]:
+        timetable.setdefault(section, {}).setdefault(day, {})[time_slot] = content
+    return timetable
+
+
+def latest_revision(db, date):
+    """Newest revision number stored for a timetable, or 0"""
+    from backend_api import TimetableRevision
+    row = (
+        db.query(TimetableRevision.version)
+        .filter(TimetableRevision.date == date)
+        .order_by(TimetableRevision.version.desc())
+        .first()
+    )
+    return row[0] if row else 0
+
+
+def _add_revision(db, date, version, kind, payload):
+    from backend_api import TimetableRevision
+    TIMETABLE_DOCUMENT_BYTES.observe(len(payload), kind=kind)
+    db.add(TimetableRevision(date=date, version=version, kind=kind, data=payload, created_at=time.time()))
+
+
+def record_revision(db, date, previous_raw, timetable, time_slots=None):
+    """Add the revision for a new timetable document to the session.
+
+    previous_raw is the currently stored document (None for a new date). A
+    stored document that predates history becomes version 1. Returns the new
+    version, or None when timetable is identical to the stored document.
+    """
+    version = latest_revision(db, date)
+    changes = None
+    if previous_raw is not None:
+        previous = load_timetable(previous_raw, time_slots).to_dict()
+        changes = diff_timetables(previous, timetable)
+        if is_empty_delta(changes):
+            return None
+        if version == 0:
+            version = 1
+            _add_revision(db, date, version, BASE, previous_raw)
+
+    version += 1
+    base = CompactTimetable.from_dict(timetable, time_slots=time_slots).to_json()
+    if changes is not None and (version - 1) % REBASE_INTERVAL != 0:
+        delta = json.dumps(changes, separators=(",", ":"))
+        if len(delta) < len(base):
+            _add_revision(db, date, version, DELTA, delta)
+            return version
+    _add_revision(db, date, version, BASE, base)
+    return version
+
+
+def load_revision(db, date, version, time_slots=None):
+    """Rebuild one version of a timetable from its nearest base and the deltas after it"""
+    from backend_api import TimetableRevision
+    base = (
+        db.query(TimetableRevision)
+        .filter(TimetableRevision.date == date, TimetableRevision.kind == BASE, TimetableRevision.version <= version)
+        .order_by(TimetableRevision.version.desc())
+        .first()
+    )
+    if base is None:
+        return None
+    timetable = load_timetable(base.data, time_slots).to_dict()
+    deltas = (
+        db.query(TimetableRevision)
+        .filter(
+            TimetableRevision.date == date,
+            TimetableRevision.version > base.version,
+            TimetableRevision.version <= version
+        )
+        .order_by(TimetableRevision.version)
+        .all()
+    )
+    if len(deltas) != version - base.version:
+        return None
+    for revision in deltas:
+        apply_delta(timetable, json.loads(revision.data))
+    return timetable
+
+
+def list_revisions(db, date):
+    from backend_api import TimetableRevision
+    rows = (
+        db.query(TimetableRevision.version, TimetableRevision.kind, TimetableRevision.created_at)
+        .filter(TimetableRevision.date == date)
+        .order_by(TimetableRevision.version)
+        .all()
+    )
+    return [{"version": version, "kind": kind, "created_at": created_at} for version, kind, created_at in rows]
+
+
+def diff_revisions(db, date, from_version, to_version, time_slots=None, view=None):
+    """Delta between two stored versions, or None if either is missing.
+
+    view, when given, is applied to both versions before diffing (e.g. the
+    placeholder filter used by the read endpoints).
+    """
+    old = load_revision(db, date, from_version, time_slots)
+    if old is None:
+        return None
+    new = load_revision(db, date, to_version, time_slots)
+    if new is None:
+        return None
+    if view is not None:
+        old, new = view(old), view(new)
+    return diff_timetables(old, new)
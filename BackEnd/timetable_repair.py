@@ -0,0 +1,200 @@
+"""
+Incremental timetable repair after a single teacher's constraints change.
+
+Only the lectures the teacher can no longer give are touched. Each one is
+re-placed, in order of preference, in the same slot with another qualified
+teacher, in a free slot of the same section, or by swapping with one other
+single-hour lecture anywhere in that section's week. Every other cell is left
+as it was.
+"""
+from ai_timetable_model import (
+    OccupancyIndex, MORNING_SLOTS, AFTERNOON_SLOTS, LUNCH_SLOT,
+    check_slot_conflict, is_teacher_available_at_slot, is_lab_subject
+)
+from batch_generation import PLACEHOLDER_TEACHERS
+
+
+def section_letter(section_key):
+    """Section letter for plain ("A") and batch ("BTech-S4-A") section keys"""
+    return section_key.rsplit("-", 1)[-1]
+
+
+def is_movable(content):
+    teacher = content.get("teacher")
+    return bool(teacher) and teacher not in PLACEHOLDER_TEACHERS and content.get("subject") != "Lunch"
+
+
+def find_invalid_lectures(timetable, teacher, teacher_availability, teacher_preferences):
+    """Lectures of a teacher that break their current availability or preferences.
+
+    Returns (section, day, slots) groups; a two-hour lab is one group.
+    """
+    unavailable = not teacher_availability.get(teacher, True)
+    invalid = []
+    for section, days in timetable.items():
+        for day, slots in days.items():
+            ordered = [ts for ts in MORNING_SLOTS + AFTERNOON_SLOTS if ts in slots]
+            taken = set()
+            for i, time_slot in enumerate(ordered):
+                content = slots[time_slot]
+                if time_slot in taken or content.get("teacher") != teacher:
+                    continue
+                group = [time_slot]
+                if is_lab_subject(content["subject"]) and i + 1 < len(ordered):
+                    next_content = slots[ordered[i + 1]]
+                    if next_content.get("teacher") == teacher and next_content.get("subject") == content["subject"]:
+                        group.append(ordered[i + 1])
+                taken.update(group)
+                if unavailable or not all(is_teacher_available_at_slot(teacher, day, ts, teacher_preferences) for ts in group):
+                    invalid.append((section, day, group))
+    return invalid
+
+
+class TimetableRepair:
+    """Occupancy, room bookings and move helpers over one stored timetable"""
+
+    def __init__(self, timetable, subject_teacher_mapping, teacher_subject_sections, teacher_lecture_limits,
+                 teacher_availability, teacher_preferences, classrooms, time_slots=None):
+        self.timetable = timetable
+        self.subject_teacher_mapping = subject_teacher_mapping
+        self.teacher_subject_sections = teacher_subject_sections
+        self.teacher_lecture_limits = teacher_lecture_limits
+        self.teacher_availability = teacher_availability
+        self.teacher_preferences = teacher_preferences
+        self.classrooms = classrooms
+        self.occupancy = OccupancyIndex.from_timetable(timetable, time_slots=time_slots)
+        self.rooms_booked = set()
+        for section, days in timetable.items():
+            for day, slots in days.items():
+                for time_slot, content in slots.items():
+                    if isinstance(content.get("room"), str):
+                        self.rooms_booked.add((content["room"], day, time_slot))
+
+    def qualified_teachers(self, subject, section):
+        letter = section_letter(section)
+        teachers = [
+            t for t in self.subject_teacher_mapping.get(subject, [])
+            if self.teacher_availability.get(t, True)
+            and letter in self.teacher_subject_sections.get(t, {}).get(subject, [])
+        ]
+        return sorted(teachers, key=self.occupancy.weekly_count)
+
+    def fits(self, section, day, slots, teacher, subject):
+        if any(self.occupancy.is_section_busy(section, day, ts) for ts in slots):
+            return False
+        return check_slot_conflict(
+            self.timetable, section, day, slots[0], teacher, subject, is_two_hour=len(slots) == 2,
+            teacher_lecture_limits=self.teacher_lecture_limits,
+            teacher_availability=self.teacher_availability,
+            teacher_preferences=self.teacher_preferences,
+            occupancy=self.occupancy
+        )
+
+    def pick_room(self, subject, day, slots, preferred=None):
+        if isinstance(preferred, str) and all((preferred, day, ts) not in self.rooms_booked for ts in slots):
+            return preferred
+        room_type = "lab" if is_lab_subject(subject) else "lecture"
+        for room in self.classrooms:
+            if room["room_type"] == room_type and all((room["room_number"], day, ts) not in self.rooms_booked for ts in slots):
+                return room["room_number"]
+        return None
+
+    def take(self, section, day, slots):
+        """Remove a lecture group and return its content"""
+        content = self.timetable[section][day][slots[0]]
+        for ts in slots:
+            del self.timetable[section][day][ts]
+            self.occupancy.remove(section, day, ts, content.get("teacher"))
+            if isinstance(content.get("room"), str):
+                self.rooms_booked.discard((content["room"], day, ts))
+        return content
+
+    def put(self, section, day, slots, subject, teacher, room):
+        for ts in slots:
+            self.timetable[section][day][ts] = {"subject": subject, "teacher": teacher, "room": room}
+            self.occupancy.place(section, day, ts, teacher)
+            if room is not None:
+                self.rooms_booked.add((room, day, ts))
+
+    def open_positions(self, section, width):
+        """Free (day, slots) positions of a section, labs restricted to the morning"""
+        for day, slots in self.timetable[section].items():
+            usable = list(MORNING_SLOTS)
+            if width == 1 and LUNCH_SLOT in slots:
+                usable += AFTERNOON_SLOTS
+            for i in range(len(usable) - width + 1):
+                group = usable[i:i + width]
+                if width == 2 and group[1] not in MORNING_SLOTS:
+                    continue
+                if not any(self.occupancy.is_section_busy(section, day, ts) for ts in group):
+                    yield day, group
+
+    def reassign(self, section, day, slots, content, exclude):
+        for teacher in self.qualified_teachers(content["subject"], section):
+            if teacher != exclude and self.fits(section, day, slots, teacher, content["subject"]):
+                self.put(section, day, slots, content["subject"], teacher, self.pick_room(content["subject"], day, slots, content.get("room")))
+                return {"action": "reassigned", "teacher": teacher}
+        return None
+
+    def move(self, section, content, width):
+        teachers = self.qualified_teachers(content["subject"], section)
+        for day, slots in self.open_positions(section, width):
+            for teacher in teachers:
+                if self.fits(section, day, slots, teacher, content["subject"]):
+                    self.put(section, day, slots, content["subject"], teacher, self.pick_room(content["subject"], day, slots, content.get("room")))
+                    return {"action": "moved", "teacher": teacher, "to_day": day, "to_time_slot": slots[0]}
+        return None
+
+    def swap(self, section, day, time_slot, content):
+        """Move one other single-hour lecture of the section, from any day, into the vacated cell and take its slot"""
+        teachers = self.qualified_teachers(content["subject"], section)
+        for other_day, slots in list(self.timetable[section].items()):
+            for other_slot, other in list(slots.items()):
+                if not is_movable(other) or is_lab_subject(other["subject"]):
+                    continue
+                if (other_day, other_slot) == (day, time_slot):
+                    continue
+                self.take(section, other_day, [other_slot])
+                if self.fits(section, day, [time_slot], other["teacher"], other["subject"]):
+                    self.put(section, day, [time_slot], other["subject"], other["teacher"], self.pick_room(other["subject"], day, [time_slot], other.get("room")))
+                    for teacher in teachers:
+                        if self.fits(section, other_day, [other_slot], teacher, content["subject"]):
+                            self.put(section, other_day, [other_slot], content["subject"], teacher, self.pick_room(content["subject"], other_day, [other_slot], content.get("room")))
+                            return {"action": "swapped", "teacher": teacher, "to_day": other_day, "to_time_slot": other_slot, "displaced_subject": other["subject"]}
+                    self.take(section, day, [time_slot])
+                self.put(section, other_day, [other_slot], other["subject"], other["teacher"], self.pick_room(other["subject"], other_day, [other_slot], other.get("room")))
+        return None
+
+
+def repair_timetable(timetable, teacher, subject_teacher_mapping, teacher_subject_sections, teacher_lecture_limits, teacher_availability, teacher_preferences, classrooms, time_slots=None):
+    """Re-place only the lectures a changed teacher can no longer give. Mutates and returns timetable"""
+    invalid = find_invalid_lectures(timetable, teacher, teacher_availability, teacher_preferences)
+    repair = TimetableRepair(
+        timetable, subject_teacher_mapping, teacher_subject_sections, teacher_lecture_limits,
+        teacher_availability, teacher_preferences, classrooms, time_slots
+    )
+
+    changes = []
+    unplaced = []
+    for section, day, slots in invalid:
+        content = repair.take(section, day, slots)
+        outcome = repair.reassign(section, day, slots, content, exclude=teacher)
+        if outcome is None:
+            outcome = repair.move(section, content, len(slots))
+        if outcome is None and len(slots) == 1:
+            outcome = repair.swap(section, day, slots[0], content)
+
+        cell = {"section": section, "day": day, "time_slot": slots[0], "subject": content["subject"]}
+        if outcome is None:
+            unplaced.append(cell)
+        else:
+            changes.append({**cell, **outcome})
+
+    report = {
+        "teacher": teacher,
+        "invalidated": len(invalid),
+        "changes": changes,
+        "unplaced": unplaced
+    }
+    print(f"Repaired timetable for {teacher}: {len(invalid)} invalidated, {len(changes)} re-placed, {len(unplaced)} left empty")
+    return timetable, report
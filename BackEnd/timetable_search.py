@@ -0,0 +1,177 @@
+"""
+Multi-start randomized search over a scheduling engine.
+
+Runs independent seeded restarts (in parallel on the generation pool when
+available), scores every result and keeps the best one within a wall-clock
+budget. The budget stops new restarts: queued ones are cancelled or skip
+themselves once the deadline has passed, but a restart that is already
+running finishes, so a search can overrun the budget by about one restart.
+Restarts are capped at GENERATION_MAX_RESTARTS.
+"""
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from batch_generation import generate_course_timetable, PLACEHOLDER_TEACHERS
+
+LUNCH_SLOT = "13:00-14:00"
+MAX_RESTARTS = int(os.environ.get("GENERATION_MAX_RESTARTS", "32"))
+
+SCORE_WEIGHTS = {
+    "unfilled_slots": 1.0,
+    "teacher_load_variance": 0.5,
+    "preference_violations": 2.0,
+    "preference_misses": 0.25,
+    "dependency_violations": 3.0
+}
+
+
+def _violates_preferences(prefs, day, time_slot):
+    """Hard preferences: unavailable days and the earliest/latest teaching time"""
+    if not prefs:
+        return False
+    if prefs.get("unavailable_days") and day in prefs["unavailable_days"]:
+        return True
+    slot_start = time_slot.split("-")[0]
+    if prefs.get("earliest_time") and slot_start < prefs["earliest_time"]:
+        return True
+    if prefs.get("latest_time") and slot_start >= prefs["latest_time"]:
+        return True
+    return False
+
+
+def _misses_preferences(prefs, day, time_slot):
+    """Soft preferences: a lecture outside the preferred days or slots"""
+    if not prefs:
+        return False
+    if prefs.get("preferred_days") and day not in prefs["preferred_days"]:
+        return True
+    if prefs.get("preferred_slots") and time_slot not in prefs["preferred_slots"]:
+        return True
+    return False
+
+
+def score_timetable(timetable, time_slots, teacher_preferences=None, subject_dependencies=None, teachers=None):
+    """Score a timetable (lower is better) and return the score with its breakdown"""
+    teacher_preferences = teacher_preferences or {}
+    subject_dependencies = subject_dependencies or {}
+
+    unfilled = 0
+    preference_violations = 0
+    preference_misses = 0
+    dependency_violations = 0
+    weekly_load = {teacher: 0 for teacher in (teachers or [])}
+
+    for section, days in timetable.items():
+        day_order = {day: i for i, day in enumerate(days)}
+        first_day = {}
+        subject_days = {}
+        for day, slots in days.items():
+            for time_slot in time_slots:
+                if time_slot == LUNCH_SLOT:
+                    continue
+                content = slots.get(time_slot)
+                if not content:
+                    unfilled += 1
+                    continue
+                subject = content.get("subject")
+                teacher = content.get("teacher")
+                if teacher and teacher not in PLACEHOLDER_TEACHERS:
+                    weekly_load[teacher] = weekly_load.get(teacher, 0) + 1
+                    prefs = teacher_preferences.get(teacher)
+                    if _violates_preferences(prefs, day, time_slot):
+                        preference_violations += 1
+                    elif _misses_preferences(prefs, day, time_slot):
+                        preference_misses += 1
+                if subject:
+                    first_day.setdefault(subject, day_order[day])
+                    subject_days.setdefault(subject, set()).add(day)
+
+        for subject, deps in subject_dependencies.items():
+            if subject not in first_day:
+                continue
+            for dep in deps:
+                other = dep["dependent"]
+                if dep["type"] == "prerequisite":
+                    if other not in first_day or first_day[other] > first_day[subject]:
+                        dependency_violations += 1
+                elif dep.get("same_day") and other in subject_days:
+                    if not subject_days[subject] & subject_days[other]:
+                        dependency_violations += 1
+
+    load_variance = float(np.var(list(weekly_load.values()))) if weekly_load else 0.0
+    breakdown = {
+        "unfilled_slots": unfilled,
+        "teacher_load_variance": round(load_variance, 3),
+        "preference_violations": preference_violations,
+        "preference_misses": preference_misses,
+        "dependency_violations": dependency_violations
+    }
+    score = sum(SCORE_WEIGHTS[key] * value for key, value in breakdown.items())
+    return round(score, 3), breakdown
+
+
+def search_best_timetable(start_date, course, semester, snapshot, time_slots, restarts=8, time_budget=None, seed=None, job_manager=None, engine="greedy"):
+    """Run seeded restarts and return (best_timetable, quality_report)"""
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    seeds = [seed + i for i in range(min(max(restarts, 1), MAX_RESTARTS))]
+    deadline = time.monotonic() + time_budget if time_budget else None
+    wall_deadline = time.time() + time_budget if time_budget else None
+
+    def score(timetable):
+        return score_timetable(
+            timetable,
+            time_slots,
+            snapshot["teacher_preferences"],
+            snapshot["subject_dependencies"],
+            list(snapshot["state"]["teacher_subject_sections"].keys())
+        )
+
+    results = []
+
+
+    if job_manager is not None and multiprocessing.parent_process() is None:
+        futures = {
+            job_manager.submit_call(
+                generate_course_timetable, course, semester, start_date, snapshot, s, engine,
+                None if i == 0 else wall_deadline
+            ): s
+            for i, s in enumerate(seeds)
+        }
+        pending = set(futures)
+        while pending:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                if results:
+                    break
+                remaining = None
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                timetable = future.result()[2]
+                if timetable is not None:
+                    results.append((score(timetable), futures[future], timetable))
+        for future in pending:
+            future.cancel()
+    else:
+        for s in seeds:
+            timetable = generate_course_timetable(course, semester, start_date, snapshot, s, engine)[2]
+            results.append((score(timetable), s, timetable))
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+    (best_score, breakdown), best_seed, best = min(results, key=lambda r: r[0][0])
+    report = {
+        "score": best_score,
+        "breakdown": breakdown,
+        "seed": best_seed,
+        "restarts_completed": len(results),
+        "restarts_requested": len(seeds),
+        "scores": sorted(r[0][0] for r in results)
+    }
+    print(f"Multi-start search: best score {best_score} (seed {best_seed}) from {len(results)}/{len(seeds)} restarts")
+    return best, report
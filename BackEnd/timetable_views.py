@@ -0,0 +1,197 @@
+"""
+Pre-rendered, filtered timetable views.
+
+A stored timetable is parsed and filtered once per stored version. The full
+view and every section and teacher view are serialized on first use and kept
+in an LRU cache keyed by the timetable's start date and latest history
+revision, so repeated reads and ETag revalidations skip loading the stored
+document as well as the JSON parse and the rebuild. The teacher load
+matrix behind /teacher_load is built from the same parse.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from compact_timetable import load_timetable
+from batch_generation import PLACEHOLDER_TEACHERS
+from metrics import cache_lookup
+
+VIEW_CACHE_SIZE = int(os.environ.get("TIMETABLE_VIEW_CACHE_SIZE", "16"))
+
+
+def document_version(raw):
+    """Short content hash of a stored Timetable.data value"""
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+def filter_timetable(timetable):
+    """Drop placeholder and empty-teacher cells, keeping real lectures and lunch"""
+    filtered_timetable = {}
+    for section, days in timetable.items():
+        filtered_timetable[section] = {}
+        for day, time_slots in days.items():
+            filtered_timetable[section][day] = {}
+            for time_slot, content in time_slots.items():
+                teacher = content.get("teacher", "")
+
+                if teacher and teacher not in PLACEHOLDER_TEACHERS:
+                    filtered_timetable[section][day][time_slot] = content
+
+                elif content.get("subject") == "Lunch":
+                    filtered_timetable[section][day][time_slot] = content
+    return filtered_timetable
+
+
+def build_teacher_index(timetable, time_slots=None):
+    """Per-teacher list of lectures in day then slot order"""
+    slot_order = {ts: i for i, ts in enumerate(time_slots or [])}
+    index = {}
+    for section, days in timetable.items():
+        for day_number, (day, slots) in enumerate(days.items()):
+            for time_slot, content in slots.items():
+                teacher = content.get("teacher")
+                if not teacher or teacher in PLACEHOLDER_TEACHERS:
+                    continue
+                index.setdefault(teacher, []).append((day_number, slot_order.get(time_slot, 0), {
+                    "section": section,
+                    "day": day,
+                    "time_slot": time_slot,
+                    "subject": content.get("subject"),
+                    "room": content.get("room")
+                }))
+    return {teacher: [entry for _, _, entry in sorted(entries, key=lambda e: (e[0], e[1]))] for teacher, entries in index.items()}
+
+
+def build_teacher_load(teacher_index, teachers, days, time_slots):
+    """Lecture counts as teacher x day x slot nested lists plus weekly totals, in the given orders"""
+    teacher_rows = {teacher: i for i, teacher in enumerate(teachers)}
+    day_columns = {day: i for i, day in enumerate(days)}
+    slot_columns = {ts: i for i, ts in enumerate(time_slots)}
+    load = np.zeros((len(teachers), len(days), len(time_slots)), dtype=np.int32)
+    cells = [
+        (teacher_rows[teacher], day_columns[lecture["day"]], slot_columns[lecture["time_slot"]])
+        for teacher, lectures in teacher_index.items() if teacher in teacher_rows
+        for lecture in lectures if lecture["day"] in day_columns and lecture["time_slot"] in slot_columns
+    ]
+    if cells:
+        np.add.at(load, tuple(np.array(cells).T), 1)
+    return {
+        "teachers": list(teachers),
+        "days": list(days),
+        "time_slots": list(time_slots),
+        "load": load.tolist(),
+        "totals": load.sum(axis=(1, 2)).tolist()
+    }
+
+
+class TimetableViews:
+    """Filtered views of one stored timetable version, each serialized at most once"""
+
+    def __init__(self, start_date, end_date, raw, time_slots=None, version=None, revision=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.version = version or document_version(raw)
+        self.revision = revision
+        compact = load_timetable(raw, time_slots)
+        self.days = compact.days
+        self.time_slots = compact.time_slots
+        self.timetable = filter_timetable(compact.to_dict())
+        self.teacher_index = build_teacher_index(self.timetable, time_slots)
+        self._rendered = {}
+        self._teacher_load = {}
+        self._lock = threading.Lock()
+
+    def etag(self, key):
+        return f'"{self.version}-{hashlib.blake2b(key.encode(), digest_size=4).hexdigest()}"'
+
+    def _render(self, key, build):
+        with self._lock:
+            cache_lookup("timetable_render", key in self._rendered)
+            if key not in self._rendered:
+                self._rendered[key] = (self.etag(key), json.dumps(build()).encode())
+            return self._rendered[key]
+
+    def full(self):
+        """(etag, body) for the whole filtered timetable"""
+        return self._render("full", lambda: {
+            "date": self.start_date,
+            "end_date": self.end_date,
+            "version": self.revision,
+            "timetable": self.timetable
+        })
+
+    def section(self, section):
+        """(etag, body) for one section, or None if the section is not in this timetable"""
+        if section not in self.timetable:
+            return None
+        return self._render(f"section:{section}", lambda: {
+            "date": self.start_date,
+            "end_date": self.end_date,
+            "version": self.revision,
+            "section": section,
+            "timetable": {section: self.timetable[section]}
+        })
+
+    def teacher(self, teacher):
+        """(etag, body) for one teacher's lectures, or None if they teach nothing this week"""
+        if teacher not in self.teacher_index:
+            return None
+        return self._render(f"teacher:{teacher}", lambda: {
+            "date": self.start_date,
+            "end_date": self.end_date,
+            "version": self.revision,
+            "teacher": teacher,
+            "lectures": self.teacher_index[teacher]
+        })
+
+
+    def teacher_load(self, teachers=()):
+        """build_teacher_load for every teacher in this timetable plus teachers, built once per roster"""
+        roster = tuple(sorted(set(self.teacher_index) | set(teachers)))
+        with self._lock:
+            cache_lookup("teacher_load", roster in self._teacher_load)
+            if roster not in self._teacher_load:
+                self._teacher_load[roster] = build_teacher_load(self.teacher_index, roster, self.days, self.time_slots)
+            return self._teacher_load[roster]
+
+
+class TimetableViewCache:
+    """LRU of TimetableViews keyed by start date and history revision"""
+
+    def __init__(self, max_entries=VIEW_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, start_date, end_date, raw, time_slots=None, revision=None):
+        """Views for a stored timetable row, building them on a miss.
+
+        raw is the stored document or a callable returning it, called only on a miss.
+        """
+        key = (start_date, revision)
+        with self._lock:
+            views = self._entries.get(key)
+            cache_lookup("timetable_views", views is not None)
+            if views is not None:
+                self._entries.move_to_end(key)
+                return views
+
+        if callable(raw):
+            raw = raw()
+        views = TimetableViews(start_date, end_date, raw, time_slots, revision=revision)
+        with self._lock:
+            self._entries[key] = views
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return views
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
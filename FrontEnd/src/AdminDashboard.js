@@ -530,7 +530,6 @@ function AdminDashboard() {
       const response = await axios.get(`${API_URL}/timetable/${backendDate}`, { timeout: 60000 });
       return response.data.timetable || {};
     },
-    refetchInterval: 45000,
     enabled: !!date,
     staleTime: 20000,
   });
@@ -542,7 +541,6 @@ function AdminDashboard() {
       const response = await axios.get(`${API_URL}/teacher_availability`);
       return response.data;
     },
-    refetchInterval: 30000,
     staleTime: 15000,
   });
 
@@ -551,12 +549,14 @@ function AdminDashboard() {
     interval: 45000,
     enabled: true,
     showNotifications: true,
+    events: ['timetable_stored'],
   });
 
   const { NotificationComponent: AvailabilityNotification } = useAutoRefresh(refetchAvailability, {
     interval: 30000,
     enabled: true,
     showNotifications: false,
+    events: ['teacher_changed'],
   });
 
   useEffect(() => {
@@ -668,7 +668,7 @@ function AdminDashboard() {
           }
           
 
-          if (task.status === "running") {
+          if (task.status === "running" || task.status === "pending") {
 
             pollCount++;
             if (pollCount >= maxPolls) {
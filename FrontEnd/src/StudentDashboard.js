@@ -256,13 +256,13 @@ function StudentDashboard() {
     setMessage("");
     const backendDate = parseDate(date);
     try {
-      const response = await axios.get(`${API_URL}/timetable/${backendDate}`, { timeout: 60000 });
+      const response = await axios.get(`${API_URL}/timetable/${backendDate}/section/${encodeURIComponent(section)}`, { timeout: 60000 });
       if (response.data.error) {
         setMessage(response.data.error);
         setTimetable(null);
       } else {
-        const fullTimetable = response.data.timetable || {};
-        setTimetable(fullTimetable[section] || {});
+        const sectionTimetable = response.data.timetable || {};
+        setTimetable(sectionTimetable[section] || {});
         setWeekDates(calculateWeekDates(date));
         setMessage("");
       }
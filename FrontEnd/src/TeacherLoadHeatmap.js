@@ -116,20 +116,9 @@ const HeatmapCell = styled(Box)(({ intensity }) => {
 });
 
 const DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"];
-const TIME_SLOTS = [
-  "08:00-09:00",
-  "09:00-10:00",
-  "10:00-11:00",
-  "11:00-12:00",
-  "12:00-13:00",
-  "13:00-14:00",
-  "14:00-15:00",
-  "15:00-16:00",
-];
 
 function TeacherLoadHeatmap() {
   const navigate = useNavigate();
-  const [timetable, setTimetable] = useState(null);
   const [teacherLoad, setTeacherLoad] = useState({});
   const [teacherAvailability, setTeacherAvailability] = useState({});
   const [teacherPreferences, setTeacherPreferences] = useState({});
@@ -148,19 +137,20 @@ function TeacherLoadHeatmap() {
 
       const today = new Date();
       const dateStr = `${today.getFullYear()}-${String(today.getMonth() + 1).padStart(2, "0")}-${String(today.getDate()).padStart(2, "0")}`;
-      
-      const [timetableResponse, availabilityResponse, preferencesResponse] = await Promise.all([
-        axios.get(`${API_URL}/timetable/${dateStr}`),
-        axios.get(`${API_URL}/teacher_availability`),
-        axios.get(`${API_URL}/all_teacher_preferences`),
-      ]);
-
-      setTimetable(timetableResponse.data.timetable || {});
-      setTeacherAvailability(availabilityResponse.data || {});
-      setTeacherPreferences(preferencesResponse.data || {});
-      
-
-      calculateTeacherLoad(timetableResponse.data.timetable || {});
+
+      const response = await axios.get(`${API_URL}/teacher_load`, { params: { date: dateStr } });
+      if (response.data.error) {
+        throw new Error(response.data.error);
+      }
+
+      const availability = {};
+      response.data.teachers.forEach((teacher, i) => {
+        availability[teacher] = response.data.available[i];
+      });
+      setTeacherAvailability(availability);
+      setTeacherPreferences(response.data.constraints || {});
+
+      buildTeacherLoad(response.data);
       setMessage("");
     } catch (error) {
       setMessage("Error fetching data: " + (error.response?.data?.detail || error.message));
@@ -169,46 +159,26 @@ function TeacherLoadHeatmap() {
     }
   };
 
-  const calculateTeacherLoad = (timetableData) => {
+  const buildTeacherLoad = ({ teachers, days, time_slots: timeSlots, load: matrix, totals }) => {
     const load = {};
-    
 
-    Object.keys(teacherAvailability).forEach(teacher => {
+    teachers.forEach((teacher, t) => {
       load[teacher] = {
-        total: 0,
+        total: totals[t],
         byDay: {},
-        bySlot: {},
         schedule: {},
       };
-      DAYS.forEach(day => {
-        load[teacher].byDay[day] = 0;
+      days.forEach((day, d) => {
+        load[teacher].byDay[day] = matrix[t][d].reduce((sum, count) => sum + count, 0);
         load[teacher].schedule[day] = {};
-        TIME_SLOTS.forEach(slot => {
-          load[teacher].schedule[day][slot] = 0;
-        });
-      });
-      TIME_SLOTS.forEach(slot => {
-        load[teacher].bySlot[slot] = 0;
-      });
-    });
-
-
-    Object.entries(timetableData).forEach(([section, days]) => {
-      Object.entries(days).forEach(([day, slots]) => {
-        Object.entries(slots).forEach(([timeSlot, content]) => {
-          const teacher = content.teacher;
-          if (teacher && teacher !== "respective teacher" && load[teacher]) {
-            load[teacher].total += 1;
-            load[teacher].byDay[day] = (load[teacher].byDay[day] || 0) + 1;
-            load[teacher].bySlot[timeSlot] = (load[teacher].bySlot[timeSlot] || 0) + 1;
-            load[teacher].schedule[day][timeSlot] = (load[teacher].schedule[day][timeSlot] || 0) + 1;
-          }
+        timeSlots.forEach((slot, s) => {
+          load[teacher].schedule[day][slot] = matrix[t][d][s];
         });
       });
     });
 
     setTeacherLoad(load);
-    
+
 
     setFilteredTeachers(Object.entries(load).sort((a, b) => b[1].total - a[1].total));
   };
@@ -119,7 +119,6 @@ function TeacherManagementPage() {
       const response = await axios.get(`${API_URL}/teachers`);
       return response.data.teachers || [];
     },
-    refetchInterval: 30000,
     refetchOnWindowFocus: true,
     staleTime: 10000,
   });
@@ -129,6 +128,7 @@ function TeacherManagementPage() {
     interval: 30000,
     enabled: true,
     showNotifications: true,
+    events: ['teacher_changed'],
   });
 
 
@@ -0,0 +1,61 @@
+const API_URL = "http://localhost:8000";
+
+const listeners = new Set();
+let source = null;
+let connected = false;
+
+const EVENT_KINDS = ['timetable_stored', 'teacher_changed', 'room_changed'];
+
+const openSource = () => {
+  if (source || typeof EventSource === 'undefined') return;
+  source = new EventSource(`${API_URL}/events`);
+  source.onopen = () => {
+    connected = true;
+  };
+  source.onerror = () => {
+    connected = false;
+  };
+  EVENT_KINDS.forEach((kind) => {
+    source.addEventListener(kind, (event) => {
+      let payload = {};
+      try {
+        payload = JSON.parse(event.data);
+      } catch (error) {
+        console.error('Change feed parse error:', error);
+      }
+      listeners.forEach((listener) => {
+        if (listener.kinds.includes(kind)) {
+          listener.handler(kind, payload);
+        }
+      });
+    });
+  });
+};
+
+const closeSource = () => {
+  if (source) {
+    source.close();
+    source = null;
+    connected = false;
+  }
+};
+
+/**
+ * Subscribe to server change events over one shared EventSource
+ * @param {string[]} kinds - Event kinds to receive
+ * @param {Function} handler - Called with (kind, payload) for each matching event
+ * @returns {Function} Unsubscribe function
+ */
+export const subscribeToChanges = (kinds, handler) => {
+  const listener = { kinds, handler };
+  listeners.add(listener);
+  openSource();
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) {
+      closeSource();
+    }
+  };
+};
+
+export const isChangeFeedConnected = () => connected;
@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { Alert, Snackbar } from '@mui/material';
 import { styled } from '@mui/system';
+import { subscribeToChanges, isChangeFeedConnected } from './changeFeed';
 
 const UpdateNotification = styled(Snackbar)(({ theme }) => ({
   '& .MuiSnackbar-root': {
@@ -19,6 +20,7 @@ const UpdateNotification = styled(Snackbar)(({ theme }) => ({
  * @param {boolean} options.enabled - Whether auto-refresh is enabled (default: true)
  * @param {boolean} options.showNotifications - Show update notifications (default: true)
  * @param {Function} options.onUpdate - Callback when data updates
+ * @param {string[]} options.events - Server change events that trigger a refetch; polling only runs while the change feed is disconnected
  */
 export const useAutoRefresh = (refetchFn, options = {}) => {
   const {
@@ -26,6 +28,7 @@ export const useAutoRefresh = (refetchFn, options = {}) => {
     enabled = true,
     showNotifications = true,
     onUpdate,
+    events,
   } = options;
 
   const [showUpdateNotification, setShowUpdateNotification] = useState(false);
@@ -33,11 +36,12 @@ export const useAutoRefresh = (refetchFn, options = {}) => {
   const intervalRef = useRef(null);
   const previousDataRef = useRef(null);
 
+  const eventKey = events ? events.join(',') : '';
+
   useEffect(() => {
     if (!enabled) return;
 
-
-    intervalRef.current = setInterval(async () => {
+    const refresh = async () => {
       try {
         if (refetchFn) {
           await refetchFn();
@@ -59,6 +63,19 @@ export const useAutoRefresh = (refetchFn, options = {}) => {
       } catch (error) {
         console.error('Auto-refresh error:', error);
       }
+    };
+
+    const unsubscribe = eventKey
+      ? subscribeToChanges(eventKey.split(','), () => {
+          previousDataRef.current = previousDataRef.current ?? Date.now();
+          refresh();
+        })
+      : null;
+
+
+    intervalRef.current = setInterval(() => {
+      if (eventKey && isChangeFeedConnected()) return;
+      refresh();
     }, interval);
 
 
@@ -66,8 +83,11 @@ export const useAutoRefresh = (refetchFn, options = {}) => {
       if (intervalRef.current) {
         clearInterval(intervalRef.current);
       }
+      if (unsubscribe) {
+        unsubscribe();
+      }
     };
-  }, [refetchFn, interval, enabled, showNotifications]);
+  }, [refetchFn, interval, enabled, showNotifications, eventKey]);
 
 
   useEffect(() => {